@@ -0,0 +1,61 @@
+import random
+import threading
+from functools import wraps
+
+from django.conf import settings
+
+_state = threading.local()
+
+
+def reset_state(pinned=False):
+    _state.pinned = pinned
+    _state.wrote = False
+
+
+def pin_to_primary():
+    _state.pinned = True
+
+
+def is_pinned():
+    return getattr(_state, "pinned", False)
+
+
+def has_written():
+    return getattr(_state, "wrote", False)
+
+
+def use_primary(view):
+    """Вся обработка запроса (и чтение тоже) идёт в основную базу."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        pin_to_primary()
+        return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+    """Чтение — с реплик из DATABASE_REPLICAS, запись — в default.
+
+    После первой записи в потоке чтение до конца запроса тоже идёт в
+    default, чтобы пользователь видел собственные изменения.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or is_pinned():
+            return "default"
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _state.pinned = True
+        _state.wrote = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и default.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return True
@@ -0,0 +1,63 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+from posts.sampledata import sample_data
+
+from ...middleware import ENCODERS
+
+
+class Command(BaseCommand):
+    help = "Сравнивает затраты CPU на сжатие страниц ленты с экономией трафика."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def pages(self, data):
+        post = data["posts"][-1]
+        author = data["users"][0].username
+        return {
+            "index": reverse("posts:posts_index"),
+            "group_posts": reverse("posts:group_posts", args=[data["group"].slug]),
+            "profile": reverse("posts:profile", args=[author]),
+            "post_detail": reverse("posts:post_detail", args=[post.pk]),
+        }
+
+    def measure(self, encoder_class, body, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            compressed = encoder_class().compress(body)
+        return (time.perf_counter() - started) / repeat, len(compressed)
+
+    def handle(self, *args, **options):
+        client = Client()
+        with sample_data() as data:
+            bodies = {
+                name: client.get(url).content for name, url in self.pages(data).items()
+            }
+        levels = {"gzip": (1, 6, 9), "br": (1, 4, 11)}
+        self.stdout.write(
+            f"{'страница':<12}{'кодировка':<10}{'байт':>9}{'сжато':>9}"
+            f"{'экономия':>10}{'мкс/запрос':>12}"
+        )
+        for name, body in bodies.items():
+            for encoder_class in ENCODERS:
+                for level in levels[encoder_class.name]:
+                    with override_settings(
+                        COMPRESSION_GZIP_LEVEL=level, COMPRESSION_BROTLI_QUALITY=level
+                    ):
+                        seconds, size = self.measure(
+                            encoder_class, body, options["repeat"]
+                        )
+                    label = f"{encoder_class.name}-{level}"
+                    self.stdout.write(
+                        f"{name:<12}{label:<10}{len(body):>9}{size:>9}"
+                        f"{1 - size / len(body):>10.0%}{seconds * 1e6:>12.0f}"
+                    )
+        self.stdout.write(
+            f"Текущие настройки: gzip-{settings.COMPRESSION_GZIP_LEVEL}, "
+            f"br-{settings.COMPRESSION_BROTLI_QUALITY}, "
+            f"порог {settings.COMPRESSION_MIN_SIZE} байт"
+        )
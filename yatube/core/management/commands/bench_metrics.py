@@ -0,0 +1,116 @@
+import re
+import time
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.template import engines
+from django.template.backends.django import Template
+from django.test import Client, RequestFactory
+from django.urls import reverse
+from posts.sampledata import sample_data
+
+from ... import metrics
+
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+CACHE_RE = re.compile(r'desc="hit=(\d+) miss=(\d+)"')
+# Отрисовок шаблона на страницу с запасом: сама страница и дыры.
+RENDERS_PER_PAGE = 5
+
+
+def view(request):
+    return HttpResponse()
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет накладные расходы замеров запроса: постоянную часть "
+        "и цену каждого SQL-запроса, обращения к кешу и отрисовки шаблона, — "
+        "и сверяет оценку для страницы поста с METRICS_OVERHEAD_BUDGET_US."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20000)
+
+    def timed(self, func, total):
+        started = time.perf_counter()
+        for _ in range(total):
+            func()
+        return (time.perf_counter() - started) / total
+
+    def overhead(self, plain, measured, total, context=None):
+        """Насколько вызов внутри замеряемого запроса дороже обычного."""
+        self.timed(plain, total // 10)
+        plain_time = self.timed(plain, total)
+        metrics._state.timings = metrics.RequestTimings()
+        try:
+            with context or nullcontext():
+                return self.timed(measured, total) - plain_time
+        finally:
+            metrics._state.timings = None
+
+    def page_counts(self):
+        """Число SQL-запросов и обращений к кешу страницы поста без кеша."""
+        with sample_data(authors=5, posts=20) as data:
+            cache.clear()
+            url = reverse("posts:post_detail", args=[data["posts"][0].pk])
+            header = Client().get(url)["Server-Timing"]
+        hits, misses = CACHE_RE.search(header).groups()
+        return int(QUERIES_RE.search(header).group(1)), int(hits) + int(misses)
+
+    def handle(self, *args, **options):
+        total = options["repeat"]
+        budget = settings.METRICS_OVERHEAD_BUDGET_US
+
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+        middleware = metrics.MetricsMiddleware(view)
+        per_request = self.timed(lambda: middleware(request), total) - self.timed(
+            lambda: view(request), total
+        )
+
+        cursor = connection.cursor()
+        query = lambda: cursor.execute("SELECT 1")  # noqa: E731
+        per_query = self.overhead(
+            query, query, total, connection.execute_wrapper(metrics.record_query)
+        )
+
+        template = engines["django"].from_string("{{ value }}")
+        per_render = self.overhead(
+            lambda: Template.render(template, {"value": 1}),
+            lambda: template.render({"value": 1}),
+            total,
+        )
+        backend = caches["default"]
+        per_get = self.overhead(
+            lambda: LocMemCache.get(backend, "bench"),
+            lambda: backend.get("bench"),
+            total,
+        )
+        metrics.reset()
+
+        queries, cache_calls = self.page_counts()
+        estimate = (
+            per_request
+            + queries * per_query
+            + cache_calls * per_get
+            + RENDERS_PER_PAGE * per_render
+        ) * 1e6
+        self.stdout.write(
+            f"запрос {per_request * 1e6:6.2f} мкс, SQL {per_query * 1e6:6.2f} мкс, "
+            f"кеш {per_get * 1e6:6.2f} мкс, шаблон {per_render * 1e6:6.2f} мкс"
+        )
+        self.stdout.write(
+            f"страница поста ({queries} SQL, {cache_calls} обращений к кешу): "
+            f"~{estimate:.1f} мкс при бюджете {budget} мкс"
+        )
+        metrics.reset()
+        if estimate > budget:
+            raise CommandError(
+                f"Накладные расходы {estimate:.1f} мкс больше бюджета {budget} мкс."
+            )
@@ -0,0 +1,85 @@
+import random
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+from posts.sampledata import sample_data
+
+from ...page_cache import stats
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))] if values else 0
+
+
+class Command(BaseCommand):
+    help = "Замеряет долю попаданий и задержку общего кеша страниц."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--logged-in-share", type=float, default=0.3)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def urls(self, data):
+        urls = [reverse("posts:posts_index")]
+        urls += [f"{reverse('posts:posts_index')}?page={page}" for page in (2, 3)]
+        urls.append(reverse("posts:group_posts", args=[data["group"].slug]))
+        urls += [reverse("posts:profile", args=[user]) for user in data["users"]]
+        urls += [reverse("posts:post_detail", args=[post.pk]) for post in data["posts"]]
+        return urls
+
+    def run(self, clients, urls, total, logged_in_share, rng):
+        timings = {"hit": [], "miss": []}
+        stats.clear()
+        for _ in range(total):
+            # Популярные страницы запрашивают чаще: распределение Ципфа.
+            url = urls[min(len(urls) - 1, int(rng.paretovariate(1.2)) - 1)]
+            if rng.random() < logged_in_share:
+                client = rng.choice(clients[1:])
+            else:
+                client = clients[0]
+            misses = stats["misses"]
+            started = time.perf_counter()
+            client.get(url)
+            elapsed = time.perf_counter() - started
+            timings["miss" if stats["misses"] > misses else "hit"].append(elapsed)
+        return timings
+
+    def report(self, label, timings):
+        total = len(timings["hit"]) + len(timings["miss"])
+        self.stdout.write(f"{label}: попаданий {len(timings['hit']) / total:.0%}")
+        for kind, values in timings.items():
+            if values:
+                self.stdout.write(
+                    f"  {kind:<5} n={len(values):<6}"
+                    f"p50={statistics.median(values) * 1000:6.2f} мс  "
+                    f"p95={percentile(values, 0.95) * 1000:6.2f} мс"
+                )
+        everything = timings["hit"] + timings["miss"]
+        self.stdout.write(
+            f"  всего: среднее {statistics.mean(everything) * 1000:.2f} мс"
+        )
+
+    def handle(self, *args, **options):
+        with sample_data(authors=10, posts=200) as data:
+            clients = [Client()]
+            for user in data["users"]:
+                client = Client()
+                client.force_login(user)
+                clients.append(client)
+            urls = self.urls(data)
+            for label, timeout in (("без кеша", 0), ("с кешем", 60)):
+                cache.clear()
+                with override_settings(PAGE_CACHE_TIMEOUT=timeout):
+                    timings = self.run(
+                        clients,
+                        urls,
+                        options["requests"],
+                        options["logged_in_share"],
+                        random.Random(options["seed"]),
+                    )
+                self.report(label, timings)
@@ -0,0 +1,63 @@
+import threading
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from ...ratelimit import consume, ratelimit
+
+
+def view(request):
+    return HttpResponse()
+
+
+class Command(BaseCommand):
+    help = "Замеряет накладные расходы ограничения частоты запросов."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=20000)
+        parser.add_argument("--threads", type=int, default=8)
+
+    def timed(self, func, total):
+        started = time.perf_counter()
+        for _ in range(total):
+            func()
+        return (time.perf_counter() - started) / total
+
+    def handle(self, *args, **options):
+        total = options["requests"]
+        cache.clear()
+        request = RequestFactory().post("/")
+        request.user = AnonymousUser()
+        limited = ratelimit("bench")(view)
+        with override_settings(RATELIMITS={"bench": f"{total * 10}/h"}):
+            plain_time = self.timed(lambda: view(request), total)
+            limited_time = self.timed(lambda: limited(request), total)
+        self.stdout.write(
+            f"view без лимита {plain_time * 1e6:7.2f} мкс, "
+            f"с лимитом {limited_time * 1e6:7.2f} мкс, "
+            f"накладные расходы {(limited_time - plain_time) * 1e6:.2f} мкс"
+        )
+
+        cache.clear()
+        limit = total // 2
+        allowed = []
+
+        def worker():
+            for _ in range(total // options["threads"]):
+                allowed.append(consume("bench-threads", limit, 3600)[0])
+
+        threads = [threading.Thread(target=worker) for _ in range(options["threads"])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{options['threads']} потоков: {len(allowed) / elapsed:.0f} проверок/с, "
+            f"разрешено {allowed.count(True)} из {len(allowed)} при лимите {limit}"
+        )
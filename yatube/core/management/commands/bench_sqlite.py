@@ -0,0 +1,169 @@
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from itertools import chain
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...sqlite import apply_pragmas, backoff_delays, is_locked
+
+SCHEMA = """
+CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT);
+CREATE TABLE comment (
+    id INTEGER PRIMARY KEY,
+    post_id INTEGER REFERENCES post (id),
+    text TEXT,
+    created REAL
+);
+CREATE INDEX comment_post ON comment (post_id, created);
+"""
+
+
+class Worker(threading.Thread):
+    def __init__(self, path, tuned, deadline, options, seed):
+        super().__init__()
+        self.path = path
+        self.tuned = tuned
+        self.deadline = deadline
+        self.options = options
+        self.rng = random.Random(seed)
+        self.connection = None
+        self.reads = self.writes = self.errors = 0
+        self.write_times = []
+
+    def connect(self):
+        if self.connection is not None:
+            return self.connection
+        # Как Django: автокоммит, транзакции открываем явно.
+        connection = sqlite3.connect(
+            self.path,
+            timeout=(
+                settings.DATABASES["default"]["OPTIONS"]["timeout"] if self.tuned else 5
+            ),
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        if self.tuned:
+            apply_pragmas(connection.cursor(), settings.SQLITE_PRAGMAS)
+            self.connection = connection
+        return connection
+
+    def release(self, connection):
+        # Без CONN_MAX_AGE Django закрывает соединение после каждого запроса.
+        if not self.tuned:
+            connection.close()
+
+    def read(self, connection, post_id):
+        connection.execute(
+            "SELECT text FROM comment WHERE post_id = ? ORDER BY created DESC LIMIT 10",
+            (post_id,),
+        ).fetchall()
+        connection.execute(
+            "SELECT COUNT(*) FROM comment WHERE post_id = ?", (post_id,)
+        ).fetchone()
+
+    def write(self, connection, post_id):
+        # Как add_comment: сначала читаем пост, затем пишем комментарий.
+        connection.execute("BEGIN")
+        try:
+            connection.execute(
+                "SELECT id FROM post WHERE id = ?", (post_id,)
+            ).fetchone()
+            connection.execute(
+                "INSERT INTO comment (post_id, text, created) VALUES (?, ?, ?)",
+                (post_id, "x" * 200, time.time()),
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def write_with_retry(self, connection, post_id):
+        pauses = chain(backoff_delays(), [None]) if self.tuned else [None]
+        for pause in pauses:
+            try:
+                return self.write(connection, post_id)
+            except sqlite3.OperationalError as exc:
+                if pause is None or not is_locked(exc):
+                    raise
+            time.sleep(pause)
+
+    def run(self):
+        while time.monotonic() < self.deadline:
+            post_id = self.rng.randint(1, self.options["posts"])
+            writing = self.rng.random() < self.options["write_share"]
+            started = time.perf_counter()
+            try:
+                connection = self.connect()
+                try:
+                    if writing:
+                        self.write_with_retry(connection, post_id)
+                    else:
+                        self.read(connection, post_id)
+                finally:
+                    self.release(connection)
+            except sqlite3.OperationalError:
+                self.errors += 1
+                continue
+            if writing:
+                self.writes += 1
+                self.write_times.append(time.perf_counter() - started)
+            else:
+                self.reads += 1
+        if self.connection is not None:
+            self.connection.close()
+
+
+class Command(BaseCommand):
+    help = "Сравнивает SQLite по умолчанию и с WAL под параллельной нагрузкой."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--seconds", type=float, default=5)
+        parser.add_argument("--write-share", type=float, default=0.2)
+        parser.add_argument("--posts", type=int, default=100)
+
+    def prepare(self, path, posts):
+        connection = sqlite3.connect(path)
+        connection.executescript(SCHEMA)
+        connection.executemany(
+            "INSERT INTO post (id, text) VALUES (?, ?)",
+            [(number, "текст") for number in range(1, posts + 1)],
+        )
+        connection.commit()
+        connection.close()
+
+    def run(self, label, tuned, options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bench.sqlite3")
+            self.prepare(path, options["posts"])
+            deadline = time.monotonic() + options["seconds"]
+            workers = [
+                Worker(path, tuned, deadline, options, seed)
+                for seed in range(options["threads"])
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        reads = sum(worker.reads for worker in workers)
+        writes = sum(worker.writes for worker in workers)
+        errors = sum(worker.errors for worker in workers)
+        write_times = sorted(chain.from_iterable(w.write_times for w in workers))
+        p95 = write_times[int(len(write_times) * 0.95)] if write_times else 0
+        self.stdout.write(
+            f"{label}: {(reads + writes) / options['seconds']:8.0f} оп/с  "
+            f"записей {writes / options['seconds']:7.0f}/с  "
+            f"ошибок {errors}  "
+            f"p50 записи {statistics.median(write_times or [0]) * 1000:6.2f} мс  "
+            f"p95 {p95 * 1000:6.2f} мс"
+        )
+
+    def handle(self, *args, **options):
+        self.run("по умолчанию", False, options)
+        self.run("WAL и прагмы ", True, options)
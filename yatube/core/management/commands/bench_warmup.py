@@ -0,0 +1,103 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from posts.models import Group, Post
+
+# Выполняется в отдельном процессе: загрузка yatube.wsgi (с прогревом или
+# без) и первые запросы прямо к WSGI-приложению, как у настоящего воркера.
+CHILD = """
+import json, sys, time
+from wsgiref.util import setup_testing_defaults
+
+started = time.perf_counter()
+from yatube.wsgi import application
+boot = time.perf_counter() - started
+
+host, urls = sys.argv[1], json.loads(sys.argv[2])
+timings = {}
+for url in urls:
+    environ = {"PATH_INFO": url, "HTTP_HOST": host, "SERVER_NAME": host}
+    setup_testing_defaults(environ)
+    started = time.perf_counter()
+    result = application(environ, lambda status, headers: None)
+    b"".join(result)
+    result.close()
+    timings[url] = time.perf_counter() - started
+print(json.dumps({"boot": boot, "requests": timings}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает запуск воркера и первые запросы к нему без прогрева "
+        "и с прогревом (core.warmup) в отдельных процессах."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=3)
+
+    def urls(self):
+        post = Post.objects.visible().order_by("-pub_date").first()
+        if post is None:
+            raise CommandError("В базе нет постов: первые запросы нечего мерить.")
+        urls = [
+            reverse("posts:posts_index"),
+            reverse("posts:post_detail", args=[post.pk]),
+            reverse("posts:profile", args=[post.author.username]),
+            reverse("users:login"),
+        ]
+        group = Group.objects.filter(is_deleted=False).first()
+        if group is not None:
+            urls.insert(1, reverse("posts:group_posts", args=[group.slug]))
+        return urls
+
+    def run_child(self, urls, warm):
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": "yatube.settings",
+            "YATUBE_WARMUP": "1" if warm else "0",
+        }
+        output = subprocess.run(
+            [sys.executable, "-c", CHILD, settings.WARMUP_HOST, json.dumps(urls)],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        urls = self.urls()
+        results = {}
+        for warm in (False, True):
+            runs = [self.run_child(urls, warm) for _ in range(options["runs"])]
+            results[warm] = {
+                "boot": statistics.median(run["boot"] for run in runs),
+                "requests": {
+                    url: statistics.median(run["requests"][url] for run in runs)
+                    for url in urls
+                },
+            }
+        cold, warm = results[False], results[True]
+        self.stdout.write(f"{'':<28}{'без прогрева':>14}{'с прогревом':>14}")
+        self.stdout.write(
+            f"{'загрузка yatube.wsgi':<28}{cold['boot'] * 1000:11.1f} мс"
+            f"{warm['boot'] * 1000:11.1f} мс"
+        )
+        for url in urls:
+            self.stdout.write(
+                f"{url:<28}{cold['requests'][url] * 1000:11.1f} мс"
+                f"{warm['requests'][url] * 1000:11.1f} мс"
+            )
+        self.stdout.write(
+            f"{'все первые запросы':<28}"
+            f"{sum(cold['requests'].values()) * 1000:11.1f} мс"
+            f"{sum(warm['requests'].values()) * 1000:11.1f} мс"
+        )
@@ -0,0 +1,450 @@
+import http.client
+import multiprocessing
+import os
+import random
+import secrets
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+from django.urls import reverse
+from posts.models import Group, Post, User
+
+# Вес сценария в смеси по умолчанию; сценарии со звёздочкой — для вошедших.
+DEFAULT_MIX = (
+    "index=30,group=10,profile=10,detail=20,*follow_feed=10,*comment=10,*follow=10"
+)
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# Пароль учёток loadtest_N; без переменной создаваемым учёткам выдаётся
+# случайный пароль на один запуск.
+PASSWORD_ENV = "YATUBE_LOADTEST_PASSWORD"
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.strip().partition("=")
+        mix[name.lstrip("*")] = (float(weight or 1), name.startswith("*"))
+    return mix
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class HttpSession:
+    """HTTP-клиент одного посетителя: свои куки, без перехода по редиректам."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.cookies = {}
+        self.location = ""
+
+    def request(self, method, path, data=None):
+        headers = {}
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        body = None
+        if data is not None:
+            data = {**data, "csrfmiddlewaretoken": self.cookies.get("csrftoken", "")}
+            body = urlencode(data)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        try:
+            connection.request(method, path, body, headers)
+            response = connection.getresponse()
+            response.read()
+        finally:
+            connection.close()
+        self.location = response.getheader("Location", "")
+        for header in response.headers.get_all("Set-Cookie") or []:
+            name, _, value = header.split(";", 1)[0].partition("=")
+            # Пустое значение — сервер удаляет куку.
+            if value and value != '""':
+                self.cookies[name.strip()] = value
+            else:
+                self.cookies.pop(name.strip(), None)
+        return response.status
+
+    def login(self, username, password):
+        path = reverse("users:login")
+        self.request("GET", path)
+        status = self.request(
+            "POST", path, {"username": username, "password": password}
+        )
+        return status == 302
+
+
+class Worker:
+    """Один виртуальный посетитель: выбирает сценарии по весам до deadline."""
+
+    def __init__(self, target, plan, mix, seed):
+        self.target = target
+        self.plan = plan
+        self.mix = mix
+        self.rng = random.Random(seed)
+        self.username = plan["users"][seed % len(plan["users"])]
+        self.logged_in = HttpSession(*target)
+        self.following = set()
+
+    def scenario(self, name):
+        plan, rng = self.plan, self.rng
+        if name == "index":
+            page = rng.choice(["", "?page=2", "?page=3"])
+            return "GET", reverse("posts:posts_index") + page, None
+        if name == "group":
+            return "GET", reverse("posts:group_posts", args=[plan["group"]]), None
+        if name == "profile":
+            return (
+                "GET",
+                reverse("posts:profile", args=[rng.choice(plan["users"])]),
+                None,
+            )
+        if name == "detail":
+            return (
+                "GET",
+                reverse("posts:post_detail", args=[rng.choice(plan["posts"])]),
+                None,
+            )
+        if name == "follow_feed":
+            return "GET", reverse("posts:follow_index"), None
+        if name == "comment":
+            path = reverse("posts:add_comment", args=[rng.choice(plan["posts"])])
+            return "POST", path, {"text": "Комментарий нагрузочного теста"}
+        if name == "follow":
+            author = rng.choice(plan["users"])
+            view = "profile_unfollow" if author in self.following else "profile_follow"
+            self.following ^= {author}
+            return "GET", reverse(f"posts:{view}", args=[author]), None
+        raise CommandError(f"Неизвестный сценарий: {name}")
+
+    def run(self, deadline):
+        names = list(self.mix)
+        weights = [weight for weight, _ in self.mix.values()]
+        anonymous = HttpSession(*self.target)
+        records = []
+        if any(logged for _, logged in self.mix.values()):
+            self.logged_in.login(self.username, self.plan["password"])
+        while time.monotonic() < deadline:
+            name = self.rng.choices(names, weights)[0]
+            session = self.logged_in if self.mix[name][1] else anonymous
+            method, path, data = self.scenario(name)
+            started = time.perf_counter()
+            try:
+                status = session.request(method, path, data)
+            except OSError:
+                status = 0
+            if redirects_to_login(status, session.location):
+                # Сценарий не дошёл до view: без входа это ошибка, а не ответ.
+                status = 401
+            records.append((time.time(), name, status, time.perf_counter() - started))
+        return records
+
+
+def run_in_process(args, queue):
+    queue.put(Worker(*args[:-1]).run(args[-1]))
+
+
+def redirects_to_login(status, location):
+    return 300 <= status < 400 and urlsplit(location).path == reverse("users:login")
+
+
+def classify(status):
+    if status == 429:
+        return "throttled"
+    if 200 <= status < 400:
+        return "ok"
+    return "error"
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))] if values else 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест: смесь анонимных и авторизованных запросов из многих "
+        "потоков или процессов к приложению в этом процессе или к --url."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url", help="Адрес запущенного сервера; по умолчанию свой сервер."
+        )
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--duration", type=float, default=10)
+        parser.add_argument(
+            "--processes",
+            action="store_true",
+            help="Посетители — процессы, а не потоки (без общего GIL с сервером).",
+        )
+        parser.add_argument("--mix", default=DEFAULT_MIX)
+        parser.add_argument("--interval", type=float, default=1)
+        parser.add_argument(
+            "--ramp",
+            help="Ступени числа посетителей через запятую, например 1,2,4,8,16.",
+        )
+        parser.add_argument("--slo-p95-ms", type=float, default=500)
+        parser.add_argument("--max-error-rate", type=float, default=0.01)
+        parser.add_argument(
+            "--keep-ratelimit",
+            action="store_true",
+            help="Не отключать ограничение частоты во встроенном сервере.",
+        )
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument(
+            "--create-users",
+            action="store_true",
+            help=(
+                "Создать в локальной базе учётки loadtest_N (пароль из "
+                f"{PASSWORD_ENV} или случайный), группу и посты."
+            ),
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Запустить при DEBUG=False, то есть, возможно, на боевой базе.",
+        )
+
+    def create_users(self, users, password):
+        """Учётки loadtest_N с паролем этого запуска, группа и посты."""
+        names = []
+        for number in range(users):
+            user, _ = User.objects.get_or_create(username=f"loadtest_{number}")
+            user.set_password(password)
+            user.save()
+            names.append(user.username)
+        group, _ = Group.objects.get_or_create(
+            slug="loadtest", defaults={"title": "Нагрузка", "description": "loadtest"}
+        )
+        if not Post.objects.filter(group=group).exists():
+            for number in range(50):
+                Post.objects.create(
+                    author=User.objects.get(username=names[number % users]),
+                    group=group,
+                    text=f"Пост нагрузочного теста {number}",
+                )
+
+    def prepare(self, options, mix):
+        """План сценариев по локальной базе; учётки — только по --create-users."""
+        users = options["users"]
+        password = os.environ.get(PASSWORD_ENV, "")
+        needs_login = any(logged for _, logged in mix.values())
+        if options["create_users"]:
+            if options["url"]:
+                raise CommandError(
+                    "--create-users создаёт учётки в локальной базе, а не на --url: "
+                    f"заведите их на сервере и передайте пароль в {PASSWORD_ENV}."
+                )
+            password = password or secrets.token_urlsafe(16)
+            self.create_users(users, password)
+        elif needs_login and not password:
+            raise CommandError(
+                "Сценариям со звёздочкой нужны учётки loadtest_N: добавьте "
+                f"--create-users или задайте {PASSWORD_ENV} для существующих."
+            )
+        posts = Post.objects.visible().order_by("-pub_date")
+        group = Group.objects.filter(is_deleted=False).order_by("-pk").first()
+        if needs_login:
+            names = [f"loadtest_{number}" for number in range(users)]
+        else:
+            names = list(
+                posts.exclude(author=None)
+                .values_list("author__username", flat=True)
+                .distinct()[:users]
+            )
+        return {
+            "users": names,
+            "password": password,
+            "group": group.slug if group else "",
+            "posts": list(posts.values_list("pk", flat=True)[:500]),
+        }
+
+    def check_logins(self, target, plan):
+        """Без входа сценарии со звёздочкой упираются в редирект на вход,
+        и прогон мерил бы его, а не страницы."""
+        failed = [
+            username
+            for username in plan["users"]
+            if not HttpSession(*target).login(username, plan["password"])
+        ]
+        if failed:
+            raise CommandError(
+                f"Не удалось войти как {', '.join(failed)}: проверьте пароль "
+                f"в {PASSWORD_ENV} или добавьте --create-users."
+            )
+
+    def start_server(self):
+        server = ThreadedWSGIServer(("127.0.0.1", 0), QuietHandler)
+        server.set_app(get_wsgi_application())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def run_step(self, target, plan, mix, workers, duration, processes):
+        deadline = time.monotonic() + duration
+        args = [(target, plan, mix, seed, deadline) for seed in range(workers)]
+        records = []
+        if processes:
+            # Серверные потоки живут только в родителе, детям они не нужны.
+            context = multiprocessing.get_context("fork")
+            queue = context.Queue()
+            children = [
+                context.Process(target=run_in_process, args=(arg, queue))
+                for arg in args
+            ]
+            for child in children:
+                child.start()
+            for _ in children:
+                records += queue.get()
+            for child in children:
+                child.join()
+        else:
+            results = [None] * workers
+
+            def run(index):
+                results[index] = Worker(*args[index][:-1]).run(deadline)
+
+            threads = [threading.Thread(target=run, args=(i,)) for i in range(workers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            for result in results:
+                records += result
+        return records
+
+    def summarize(self, records, duration):
+        latencies = [record[3] for record in records]
+        kinds = Counter(classify(record[2]) for record in records)
+        total = len(records) or 1
+        return {
+            "rps": kinds["ok"] / duration,
+            "p50": statistics.median(latencies) * 1000 if latencies else 0,
+            "p95": percentile(latencies, 0.95) * 1000,
+            "p99": percentile(latencies, 0.99) * 1000,
+            "errors": kinds["error"] / total,
+            "throttled": kinds["throttled"] / total,
+        }
+
+    def report_timeline(self, records, interval):
+        if not records:
+            return
+        start = min(record[0] for record in records)
+        buckets = defaultdict(list)
+        for record in records:
+            buckets[int((record[0] - start) // interval)].append(record)
+        self.stdout.write("  время    зап/с    p50 мс   p95 мс  ошибки  лимит")
+        for index in sorted(buckets):
+            stats = self.summarize(buckets[index], interval)
+            self.stdout.write(
+                f"  {index * interval:5.0f}s {stats['rps']:8.1f} {stats['p50']:9.1f}"
+                f"{stats['p95']:9.1f} {stats['errors']:7.1%} {stats['throttled']:6.1%}"
+            )
+
+    def report_histogram(self, records):
+        counts = Counter()
+        for record in records:
+            milliseconds = record[3] * 1000
+            bucket = next((b for b in LATENCY_BUCKETS_MS if milliseconds <= b), None)
+            counts[bucket] += 1
+        total = len(records) or 1
+        self.stdout.write("  задержка        доля")
+        for bucket in (*LATENCY_BUCKETS_MS, None):
+            label = f"<= {bucket} мс" if bucket else f">  {LATENCY_BUCKETS_MS[-1]} мс"
+            share = counts[bucket] / total
+            self.stdout.write(f"  {label:<13} {share:6.1%} {'#' * round(share * 50)}")
+
+    def report_scenarios(self, records, duration):
+        by_name = defaultdict(list)
+        for record in records:
+            by_name[record[1]].append(record)
+        for name, items in sorted(by_name.items()):
+            stats = self.summarize(items, duration)
+            self.stdout.write(
+                f"  {name:<12} {len(items):7} запр. {stats['rps']:8.1f} зап/с "
+                f"p95 {stats['p95']:7.1f} мс ошибки {stats['errors']:.1%}"
+            )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options["force"]:
+            raise CommandError(
+                "DEBUG=False: похоже на боевую базу. Запустите с --force, "
+                "если это действительно нужно."
+            )
+        mix = parse_mix(options["mix"])
+        plan = self.prepare(options, mix)
+        if not plan["posts"] or not plan["users"]:
+            raise CommandError("В базе нет постов для сценариев.")
+        if "group" in mix and not plan["group"]:
+            raise CommandError("В базе нет групп для сценария group.")
+        server = None
+        overrides = {}
+        if options["url"]:
+            parts = urlsplit(options["url"])
+            target = (parts.hostname, parts.port or 80)
+        else:
+            if not options["keep_ratelimit"]:
+                overrides["RATELIMIT_ENABLE"] = False
+            server = self.start_server()
+            target = server.server_address[:2]
+        levels = (
+            [int(level) for level in options["ramp"].split(",")]
+            if options["ramp"]
+            else [options["workers"]]
+        )
+        best = None
+        try:
+            with override_settings(**overrides):
+                if any(logged for _, logged in mix.values()):
+                    self.check_logins(target, plan)
+                for workers in levels:
+                    records = self.run_step(
+                        target,
+                        plan,
+                        mix,
+                        workers,
+                        options["duration"],
+                        options["processes"],
+                    )
+                    stats = self.summarize(records, options["duration"])
+                    self.stdout.write(
+                        f"Посетителей {workers}: {stats['rps']:.1f} зап/с, "
+                        f"p50 {stats['p50']:.1f} мс, p95 {stats['p95']:.1f} мс, "
+                        f"p99 {stats['p99']:.1f} мс, ошибки {stats['errors']:.1%}, "
+                        f"лимит {stats['throttled']:.1%}"
+                    )
+                    self.report_timeline(records, options["interval"])
+                    sustainable = (
+                        stats["errors"] <= options["max_error_rate"]
+                        and stats["p95"] <= options["slo_p95_ms"]
+                    )
+                    if sustainable and (best is None or stats["rps"] > best[1]):
+                        best = (workers, stats["rps"])
+                    if not options["ramp"]:
+                        self.report_histogram(records)
+                        self.report_scenarios(records, options["duration"])
+                    elif not sustainable:
+                        break
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+        if options["ramp"]:
+            if best is None:
+                self.stdout.write("Ни одна ступень не уложилась в ограничения.")
+            else:
+                self.stdout.write(
+                    f"Максимум без нарушения ограничений: {best[1]:.1f} зап/с "
+                    f"при {best[0]} посетителях (p95 <= {options['slo_p95_ms']} мс, "
+                    f"ошибок <= {options['max_error_rate']:.0%})."
+                )
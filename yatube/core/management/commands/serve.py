@@ -0,0 +1,114 @@
+import os
+import socket
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import get_internal_wsgi_application
+from django.test.utils import override_settings
+
+from ...prefork import PreforkServer, memory_usage, standalone_memory
+from ...warmup import warm_up
+
+MB = 1024 * 1024
+
+
+def local_caches():
+    """Кеши, которые живут в памяти процесса и у каждого воркера свои."""
+    return [
+        alias for alias in settings.CACHES if isinstance(caches[alias], LocMemCache)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Сервер с предварительным fork: приложение импортируется и "
+        "прогревается один раз, воркеры делят его память копированием "
+        "при записи и перезапускаются после --max-requests запросов. "
+        "Несколько воркеров требуют общего кеша (memcached, redis): с "
+        "LocMemCache сброс кеша страниц и сводок видит только воркер, "
+        "сделавший запись, а лимиты запросов умножаются на число воркеров."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bind", default="127.0.0.1:8000")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--max-requests", type=int, default=1000)
+        parser.add_argument("--max-requests-jitter", type=int, default=100)
+        parser.add_argument("--no-warmup", action="store_true")
+        parser.add_argument(
+            "--allow-local-cache",
+            action="store_true",
+            help="Запустить несколько воркеров и с кешем в памяти процесса.",
+        )
+        parser.add_argument(
+            "--report-memory",
+            action="store_true",
+            help="Сравнить память воркеров с отдельно импортированным процессом.",
+        )
+
+    def report_memory(self, pids, warm):
+        time.sleep(0.5)
+        for pid in pids:
+            usage = memory_usage(pid)
+            self.stdout.write(
+                f"воркер {pid}: RSS {usage['rss'] / MB:6.1f} МБ, "
+                f"PSS {usage['pss'] / MB:6.1f} МБ, "
+                f"собственная {usage['private'] / MB:6.1f} МБ"
+            )
+        forked = [memory_usage(pid) for pid in pids]
+        parent = memory_usage(os.getpid())
+        alone = standalone_memory(warm)
+        self.stdout.write(
+            f"отдельный процесс: RSS {alone['rss'] / MB:6.1f} МБ, "
+            f"собственная {alone['private'] / MB:6.1f} МБ"
+        )
+        total_forked = parent["pss"] + sum(usage["pss"] for usage in forked)
+        self.stdout.write(
+            f"{len(pids)} воркеров: с fork всего {total_forked / MB:.1f} МБ (PSS "
+            f"с главным процессом), по отдельности ~"
+            f"{alone['rss'] * len(pids) / MB:.1f} МБ"
+        )
+
+    def handle(self, *args, **options):
+        if not hasattr(os, "fork"):
+            raise CommandError("serve работает только там, где есть os.fork().")
+        local = local_caches()
+        if options["workers"] > 1 and local and not options["allow_local_cache"]:
+            raise CommandError(
+                f"Кеш {', '.join(local)} живёт в памяти процесса: у "
+                f"{options['workers']} воркеров он разойдётся. Настройте общий "
+                "кеш в CACHES, запустите --workers=1 или --allow-local-cache."
+            )
+        host, _, port = options["bind"].rpartition(":")
+        started = time.perf_counter()
+        # Приложение из WSGI_APPLICATION (yatube.wsgi) с его хуками, как у
+        # любого сервера; прогрев ниже — с закрытием соединений перед fork.
+        with override_settings(WARMUP_ON_BOOT=False):
+            app = get_internal_wsgi_application()
+        warm = not options["no_warmup"]
+        if warm:
+            warm_up(close_connections=True)
+        # Сокет открыт до сообщения о готовности: подключаться уже можно.
+        listener = socket.create_server((host, int(port)), backlog=1024)
+        self.stdout.write(
+            f"Приложение загружено за {time.perf_counter() - started:.2f} с, "
+            f"{options['workers']} воркеров на http://{host}:{port}/"
+        )
+        server = PreforkServer(
+            app,
+            listener,
+            options["workers"],
+            options["max_requests"],
+            options["max_requests_jitter"],
+            self.stdout.write,
+        )
+        ready = None
+        if options["report_memory"]:
+            ready = lambda pids: self.report_memory(pids, warm)  # noqa: E731
+        try:
+            server.run(ready)
+        finally:
+            listener.close()
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ... import slow_queries
+
+
+class Command(BaseCommand):
+    help = (
+        "Самые медленные группы SQL-запросов всех процессов "
+        "(дольше SLOW_QUERY_MS) с планами выполнения."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=10)
+        parser.add_argument(
+            "--order",
+            choices=("total_ms", "max_ms", "avg_ms", "count"),
+            default="total_ms",
+        )
+        parser.add_argument("--plans", action="store_true", help="Показать EXPLAIN.")
+        parser.add_argument("--reset", action="store_true", help="Очистить журнал.")
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            slow_queries.reset()
+            self.stdout.write("Журнал медленных запросов очищен.")
+            return
+        queries = slow_queries.top(order=options["order"])[: options["top"]]
+        if not queries:
+            self.stdout.write(f"Запросов дольше {settings.SLOW_QUERY_MS} мс не было.")
+        for number, query in enumerate(queries, 1):
+            views = ", ".join(f"{view} ×{count}" for view, count in query["views"])
+            self.stdout.write(
+                f"{number}. [{query['fingerprint']}] {query['count']} раз, "
+                f"всего {query['total_ms']:.0f} мс, в среднем {query['avg_ms']:.1f} мс, "
+                f"худший {query['max_ms']:.1f} мс — {views}"
+            )
+            self.stdout.write(f"   {query['sql'][:500]}")
+            if options["plans"] and query["plan"]:
+                for line in query["plan"].splitlines():
+                    self.stdout.write(f"   | {line}")
+            if query["stack"]:
+                self.stdout.write(f"   из {query['stack'][-1]}")
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from ...warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = (
+        "Прогревает URL, шаблоны, соединения, библиотеки и кеши лент. "
+        "Общие кеши (не LocMemCache) остаются прогретыми для всех воркеров."
+    )
+
+    def handle(self, *args, **options):
+        total = 0
+        for name, count, seconds in warm_up(close_connections=True):
+            total += seconds
+            status = "ошибка, см. лог" if count is None else f"{count} шт."
+            self.stdout.write(f"{name:<12} {status:<16} {seconds * 1000:8.1f} мс")
+        self.stdout.write(f"{'всего':<29} {total * 1000:8.1f} мс")
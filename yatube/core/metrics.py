@@ -0,0 +1,321 @@
+"""Замеры запросов: время в базе, шаблонах и кеше по каждому view.
+
+Данные живут в памяти процесса: у каждого воркера своя статистика.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+_state = threading.local()
+_lock = threading.Lock()
+
+# Границы корзин в миллисекундах: геометрическая сетка с шагом 25%
+# от 0,5 мс до ~60 с даёт оценку квантилей с точностью до четверти.
+BUCKETS_MS = tuple(round(0.5 * 1.25**step, 3) for step in range(53))
+COUNTERS = (
+    "requests",
+    "errors",
+    "total_ms",
+    "db_queries",
+    "db_ms",
+    "template_ms",
+    "cache_hits",
+    "cache_misses",
+)
+
+
+class RequestTimings:
+    __slots__ = (
+        "db_queries",
+        "db_ms",
+        "template_ms",
+        "template_depth",
+        "cache_hits",
+        "cache_misses",
+    )
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+def current():
+    """Замеры текущего запроса или None вне MetricsMiddleware."""
+    return getattr(_state, "timings", None)
+
+
+def record_query(execute, sql, params, many, context):
+    timings = current()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if timings is not None:
+            timings.db_queries += 1
+            timings.db_ms += (time.perf_counter() - started) * 1000
+
+
+def count_cache(hits, misses):
+    timings = current()
+    if timings is not None:
+        timings.cache_hits += hits
+        timings.cache_misses += misses
+
+
+_missing = object()
+
+
+class InstrumentedLocMemCache(LocMemCache):
+    """LocMemCache, который считает попадания и промахи get/get_many."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        hit = value is not _missing
+        count_cache(hit, not hit)
+        return value if hit else default
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version)
+        count_cache(len(found), len(keys) - len(found))
+        return found
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = current()
+        if timings is None:
+            return super().render(context, request)
+        # render_to_string внутри шаблона не должен учитываться дважды.
+        timings.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.template_depth -= 1
+            if not timings.template_depth:
+                timings.template_ms += (time.perf_counter() - started) * 1000
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Движок DTL, который замеряет время отрисовки шаблонов."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class RollingHistogram:
+    """Гистограмма длительностей и счётчики за последние METRICS_WINDOW секунд.
+
+    Окно разбито на METRICS_WINDOW_SLOTS частей; устаревшая часть
+    обнуляется при первой записи в неё.
+    """
+
+    def __init__(self, window, slots):
+        self.slot_seconds = window / slots
+        self.slots = [self.empty(-1) for _ in range(slots)]
+
+    @staticmethod
+    def empty(number):
+        return {
+            "number": number,
+            "buckets": [0] * (len(BUCKETS_MS) + 1),
+            **dict.fromkeys(COUNTERS, 0),
+        }
+
+    def add(self, values, now):
+        number = int(now // self.slot_seconds)
+        index = number % len(self.slots)
+        slot = self.slots[index]
+        if slot["number"] != number:
+            slot = self.slots[index] = self.empty(number)
+        slot["buckets"][bisect.bisect_left(BUCKETS_MS, values["total_ms"])] += 1
+        for name in COUNTERS:
+            slot[name] += values[name]
+
+    def merged(self, now):
+        oldest = int(now // self.slot_seconds) - len(self.slots) + 1
+        result = self.empty(oldest)
+        for slot in self.slots:
+            if slot["number"] >= oldest:
+                for index, count in enumerate(slot["buckets"]):
+                    result["buckets"][index] += count
+                for name in COUNTERS:
+                    result[name] += slot[name]
+        return result
+
+
+def quantile(buckets, share):
+    """Квантиль по корзинам с линейной интерполяцией внутри корзины."""
+    total = sum(buckets)
+    if not total:
+        return 0.0
+    rank = share * total
+    seen = 0
+    for index, count in enumerate(buckets):
+        if count and seen + count >= rank:
+            low = BUCKETS_MS[index - 1] if index else 0.0
+            high = BUCKETS_MS[index] if index < len(BUCKETS_MS) else BUCKETS_MS[-1]
+            return low + (high - low) * (rank - seen) / count
+        seen += count
+    return BUCKETS_MS[-1]
+
+
+class ViewStats:
+    def __init__(self):
+        self.window = RollingHistogram(
+            settings.METRICS_WINDOW, settings.METRICS_WINDOW_SLOTS
+        )
+        # Счётчики с запуска процесса — для Prometheus.
+        self.totals = dict.fromkeys(COUNTERS, 0)
+
+
+_views = {}
+
+
+def record(view_name, values, now=None):
+    now = time.time() if now is None else now
+    with _lock:
+        stats = _views.get(view_name)
+        if stats is None:
+            stats = _views[view_name] = ViewStats()
+        stats.window.add(values, now)
+        for name in COUNTERS:
+            stats.totals[name] += values[name]
+
+
+def reset():
+    with _lock:
+        _views.clear()
+
+
+def snapshot(now=None):
+    """{view: сводка за окно и с запуска}, отсортировано по имени view."""
+    now = time.time() if now is None else now
+    with _lock:
+        items = [
+            (name, stats.window.merged(now), dict(stats.totals))
+            for name, stats in sorted(_views.items())
+        ]
+    result = {}
+    for name, window, totals in items:
+        requests = window["requests"]
+        summary = {
+            "requests": requests,
+            "errors": window["errors"],
+            "p50_ms": quantile(window["buckets"], 0.5),
+            "p95_ms": quantile(window["buckets"], 0.95),
+            "p99_ms": quantile(window["buckets"], 0.99),
+        }
+        for counter in COUNTERS[2:]:
+            summary[f"avg_{counter}"] = window[counter] / requests if requests else 0
+        result[name] = {"window": summary, "totals": totals}
+    return result
+
+
+def server_timing(timings, total_ms):
+    return ", ".join(
+        [
+            f'db;dur={timings.db_ms:.1f};desc="{timings.db_queries} queries"',
+            f"tpl;dur={timings.template_ms:.1f}",
+            f'cache;desc="hit={timings.cache_hits} miss={timings.cache_misses}"',
+            f"total;dur={total_ms:.1f}",
+        ]
+    )
+
+
+class MetricsMiddleware:
+    """Замеряет запрос, отдаёт замеры в Server-Timing и копит их по view.
+
+    Стоит первым в MIDDLEWARE, чтобы total включал остальные middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLE:
+            return self.get_response(request)
+        timings = _state.timings = RequestTimings()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(record_query))
+                response = self.get_response(request)
+        finally:
+            _state.timings = None
+        total_ms = (time.perf_counter() - started) * 1000
+        match = getattr(request, "resolver_match", None)
+        record(
+            match.view_name if match else "-",
+            {
+                "requests": 1,
+                "errors": response.status_code >= 500,
+                "total_ms": total_ms,
+                "db_queries": timings.db_queries,
+                "db_ms": timings.db_ms,
+                "template_ms": timings.template_ms,
+                "cache_hits": timings.cache_hits,
+                "cache_misses": timings.cache_misses,
+            },
+        )
+        if settings.METRICS_SERVER_TIMING:
+            response["Server-Timing"] = server_timing(timings, total_ms)
+        return response
+
+
+def prometheus_text(now=None):
+    """Сводка в текстовом формате Prometheus."""
+    lines = [
+        "# HELP yatube_request_duration_seconds Request duration by view, "
+        "quantiles over the rolling window.",
+        "# TYPE yatube_request_duration_seconds summary",
+    ]
+    stats = snapshot(now)
+    for view, data in stats.items():
+        for share, key in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+            lines.append(
+                f'yatube_request_duration_seconds{{view="{view}",quantile="{share}"}} '
+                f"{data['window'][key] / 1000:.6f}"
+            )
+        lines.append(
+            f'yatube_request_duration_seconds_sum{{view="{view}"}} '
+            f"{data['totals']['total_ms'] / 1000:.6f}"
+        )
+        lines.append(
+            f'yatube_request_duration_seconds_count{{view="{view}"}} '
+            f"{data['totals']['requests']}"
+        )
+    for counter, kind, scale, help_text in (
+        ("errors", "errors_total", 1, "Responses with 5xx status."),
+        ("db_queries", "db_queries_total", 1, "Database queries."),
+        ("db_ms", "db_seconds_total", 1000, "Time spent in database queries."),
+        ("template_ms", "template_seconds_total", 1000, "Time rendering templates."),
+        ("cache_hits", "cache_hits_total", 1, "Cache hits."),
+        ("cache_misses", "cache_misses_total", 1, "Cache misses."),
+    ):
+        lines.append(f"# HELP yatube_{kind} {help_text}")
+        lines.append(f"# TYPE yatube_{kind} counter")
+        for view, data in stats.items():
+            value = round(data["totals"][counter] / scale, 6)
+            lines.append(f'yatube_{kind}{{view="{view}"}} {value}')
+    return "\n".join(lines) + "\n"
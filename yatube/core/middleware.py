@@ -0,0 +1,307 @@
+import json
+import mimetypes
+import os
+import zlib
+
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponseNotModified
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from . import db_router
+from .storage import brotli
+from .views import IMMUTABLE_CACHE_CONTROL
+
+ENCODING_SUFFIXES = (("br", ".br"), ("gzip", ".gz"))
+
+
+def parse_accept_encoding(header):
+    """Словарь {кодировка: q} из заголовка Accept-Encoding."""
+    encodings = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        encodings[name.strip().lower()] = quality
+    return encodings
+
+
+def accepts_encoding(accepted, encoding):
+    return accepted.get(encoding, accepted.get("*", 0.0)) > 0
+
+
+class GzipEncoder:
+    name = "gzip"
+
+    def __init__(self):
+        self.compressor = zlib.compressobj(
+            settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+        )
+
+    def compress(self, data):
+        return self.compressor.compress(data) + self.compressor.flush()
+
+    def stream(self, chunks):
+        for chunk in chunks:
+            data = self.compressor.compress(chunk)
+            # Сбрасываем буфер на каждом куске, чтобы клиент получал
+            # страницу по мере генерации, а не в конце.
+            data += self.compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield self.compressor.flush()
+
+
+class BrotliEncoder:
+    name = "br"
+
+    def __init__(self):
+        self.compressor = brotli.Compressor(
+            mode=brotli.MODE_TEXT, quality=settings.COMPRESSION_BROTLI_QUALITY
+        )
+
+    def compress(self, data):
+        return self.compressor.process(data) + self.compressor.finish()
+
+    def stream(self, chunks):
+        for chunk in chunks:
+            data = self.compressor.process(chunk) + self.compressor.flush()
+            if data:
+                yield data
+        yield self.compressor.finish()
+
+
+# В порядке предпочтения при равном q.
+ENCODERS = ([BrotliEncoder] if brotli is not None else []) + [GzipEncoder]
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def choose_encoder(header):
+    accepted = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for encoder in ENCODERS:
+        quality = accepted.get(encoder.name, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoder, quality
+    return best
+
+
+class CompressionMiddleware:
+    """Сжимает ответы лучшей кодировкой из принимаемых клиентом.
+
+    Маленькие ответы (меньше COMPRESSION_MIN_SIZE) отдаются как есть,
+    потоковые сжимаются по мере генерации. Объекты zlib/brotli не
+    переиспользуются между ответами: сброс состояния в Python недоступен,
+    а copy() готового компрессора дороже создания нового.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.should_compress(response):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoder_class = choose_encoder(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoder_class is None:
+            return response
+        encoder = encoder_class()
+        if response.streaming:
+            response.streaming_content = encoder.stream(response.streaming_content)
+            del response["Content-Length"]
+        else:
+            compressed = encoder.compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoder.name
+        return response
+
+    def should_compress(self, response):
+        if response.has_header("Content-Encoding"):
+            return False
+        if response.status_code in (204, 304):
+            return False
+        content_type = response.get("Content-Type", "").split(";")[0].strip()
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return False
+        if response.streaming:
+            return True
+        return len(response.content) >= settings.COMPRESSION_MIN_SIZE
+
+
+class StaticFilesMiddleware:
+    """Отдаёт собранную collectstatic статику из STATIC_ROOT без nginx.
+
+    Выбирает заранее сжатую копию (.br/.gz), которую принимает клиент;
+    файлам с хешем в имени ставит кеширование на год.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.root = settings.STATIC_ROOT
+        if not self.root or not os.path.isdir(self.root):
+            raise MiddlewareNotUsed
+        self.prefix = settings.STATIC_URL
+        self.files = self.scan()
+        self.hashed = self.load_hashed_names()
+
+    def scan(self):
+        files = {}
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                files[os.path.relpath(path, self.root).replace(os.sep, "/")] = path
+        return files
+
+    def load_hashed_names(self):
+        manifest = os.path.join(self.root, "staticfiles.json")
+        if not os.path.exists(manifest):
+            return set()
+        with open(manifest) as stored:
+            return set(json.load(stored).get("paths", {}).values())
+
+    def __call__(self, request):
+        if request.method in ("GET", "HEAD") and request.path.startswith(self.prefix):
+            name = request.path[len(self.prefix) :]
+            if name in self.files:
+                return self.serve(request, name)
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        path = self.files[name]
+        encoding = None
+        accepted = parse_accept_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        for candidate, suffix in ENCODING_SUFFIXES:
+            if name + suffix in self.files and accepts_encoding(accepted, candidate):
+                path, encoding = self.files[name + suffix], candidate
+                break
+        stat = os.stat(path)
+        if not was_modified_since(
+            request.META.get("HTTP_IF_MODIFIED_SINCE"), stat.st_mtime, stat.st_size
+        ):
+            return HttpResponseNotModified()
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+        response["Content-Length"] = stat.st_size
+        response["Last-Modified"] = http_date(stat.st_mtime)
+        if encoding:
+            response["Content-Encoding"] = encoding
+        if name + ".gz" in self.files or name + ".br" in self.files:
+            patch_vary_headers(response, ("Accept-Encoding",))
+        if name in self.hashed:
+            response["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        else:
+            response["Cache-Control"] = "public, max-age=%d" % settings.STATIC_MAX_AGE
+        return response
+
+
+def is_anonymous_fast_path(request):
+    """Чтение публичной страницы без сессионной куки: сессия, пользователь
+    и сообщения заведомо пусты, их можно не загружать."""
+    if request.method not in ("GET", "HEAD"):
+        return False
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return False
+    if CookieStorage.cookie_name in request.COOKIES:
+        return False
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return False
+    return match.view_name in settings.ANONYMOUS_FAST_PATH_VIEWS
+
+
+class FastPathSessionMiddleware(SessionMiddleware):
+    """SessionMiddleware, который не трогает сессию анонимных читателей
+    и разрешает общий кеш для их страниц."""
+
+    def process_request(self, request):
+        request.anonymous_fast_path = is_anonymous_fast_path(request)
+        super().process_request(request)
+
+    def process_response(self, request, response):
+        if not getattr(request, "anonymous_fast_path", False):
+            return super().process_response(request, response)
+        # Разные ответы для запросов с кукой и без: кеш не отдаст
+        # анонимную страницу вошедшему пользователю.
+        patch_vary_headers(response, ("Cookie",))
+        if response.status_code == 200 and not response.cookies:
+            patch_cache_control(
+                response, public=True, max_age=settings.ANONYMOUS_CACHE_MAX_AGE
+            )
+        return response
+
+
+class FastPathAuthenticationMiddleware(AuthenticationMiddleware):
+    def process_request(self, request):
+        if getattr(request, "anonymous_fast_path", False):
+            request.user = AnonymousUser()
+            return
+        super().process_request(request)
+
+
+class FastPathMessageMiddleware(MessageMiddleware):
+    def process_request(self, request):
+        if getattr(request, "anonymous_fast_path", False):
+            return
+        super().process_request(request)
+
+
+class ReplicaPinningMiddleware:
+    """Закрепляет пользователя за основной базой после записи.
+
+    Пока реплики догоняют основную базу, запросы с кукой
+    REPLICA_PIN_COOKIE читают из default.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = (
+            request.method not in ("GET", "HEAD", "OPTIONS")
+            or settings.REPLICA_PIN_COOKIE in request.COOKIES
+        )
+        db_router.reset_state(pinned)
+        try:
+            response = self.get_response(request)
+            wrote = db_router.has_written()
+        finally:
+            db_router.reset_state()
+        if wrote:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -0,0 +1,106 @@
+import base64
+import hashlib
+import json
+import re
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.safestring import mark_safe
+
+from . import db_router
+
+# Персональные участки страницы («дыры») хранятся в кеше вместе с
+# разметкой первого посетителя и перерисовываются для каждого запроса.
+HOLE_RE = re.compile(r"<!--hole:(\w+):([\w=-]*)-->.*?<!--/hole-->", re.DOTALL)
+
+holes = {}
+stats = Counter()
+
+
+def register_hole(name):
+    """Регистрирует функцию render(request, **params) -> str для дыры."""
+
+    def decorator(func):
+        holes[name] = func
+        return func
+
+    return decorator
+
+
+def encode_params(params):
+    return base64.urlsafe_b64encode(json.dumps(params).encode()).decode()
+
+
+def decode_params(encoded):
+    if not encoded:
+        return {}
+    return json.loads(base64.urlsafe_b64decode(encoded.encode()))
+
+
+def render_hole(name, request, params=None):
+    params = params or {}
+    content = holes[name](request, **params)
+    return mark_safe(
+        f"<!--hole:{name}:{encode_params(params) if params else ''}-->"
+        f"{content}<!--/hole-->"
+    )
+
+
+def fill_holes(content, request):
+    return HOLE_RE.sub(
+        lambda match: render_hole(match[1], request, decode_params(match[2])),
+        content,
+    )
+
+
+VERSION_KEY = "page:version"
+
+
+def invalidate_pages():
+    """Сбрасывает все закешированные страницы сменой поколения ключей."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+def page_key(request):
+    version = cache.get_or_set(VERSION_KEY, 1, None)
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f"page:{version}:{request.get_host()}:{path}"
+
+
+def full_page_cache(view):
+    """Одна закешированная страница на URL для всех посетителей.
+
+    Участки, отмеченные тегом {% hole %}, при попадании в кеш
+    перерисовываются для текущего пользователя.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        # Закреплённый за основной базой пользователь должен видеть свои
+        # изменения, а не страницу, собранную по отстающей реплике.
+        if request.method not in ("GET", "HEAD") or db_router.is_pinned():
+            return view(request, *args, **kwargs)
+        key = page_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            stats["hits"] += 1
+            content_type, content = entry
+            return HttpResponse(fill_holes(content, request), content_type=content_type)
+        stats["misses"] += 1
+        response = view(request, *args, **kwargs)
+        if (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+        ):
+            entry = (response["Content-Type"], response.content.decode())
+            cache.set(key, entry, settings.PAGE_CACHE_TIMEOUT)
+        return response
+
+    return wrapper
@@ -0,0 +1,193 @@
+"""Сервер с предварительным fork: приложение загружается и прогревается
+один раз в главном процессе, воркеры получают его копию при записи.
+"""
+
+import gc
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.servers.basehttp import WSGIRequestHandler, WSGIServer
+from django.db import connections
+from django.dispatch import Signal
+
+# Воркер закончил обслуживать запросы и сейчас завершится через os._exit,
+# без atexit: последний шанс записать накопленное в памяти.
+worker_stopping = Signal()
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def drop_inherited_connections():
+    """Забывает соединения с базой, доставшиеся от главного процесса.
+
+    Закрывать их нельзя: у postgres это закрыло бы сокет и у родителя.
+    Главный процесс закрывает свои соединения перед fork, так что здесь
+    это лишь страховка."""
+    for connection in connections.all():
+        connection.connection = None
+
+
+def memory_usage(pid):
+    """RSS, PSS и private процесса в байтах из /proc/<pid>/smaps_rollup."""
+    usage = {"rss": 0, "pss": 0, "private": 0}
+    with open(f"/proc/{pid}/smaps_rollup") as rollup:
+        for line in rollup:
+            name, _, value = line.partition(":")
+            if not value.strip().endswith("kB"):
+                continue
+            size = int(value.split()[0]) * 1024
+            if name == "Rss":
+                usage["rss"] = size
+            elif name == "Pss":
+                usage["pss"] = size
+            elif name in ("Private_Clean", "Private_Dirty"):
+                usage["private"] += size
+    return usage
+
+
+class WorkerServer(WSGIServer):
+    """WSGIServer на сокете главного процесса, который считает запросы."""
+
+    def __init__(self, listener, app):
+        address = listener.getsockname()[:2]
+        super().__init__(address, QuietHandler, bind_and_activate=False)
+        self.socket.close()
+        self.socket = listener
+        # То, что обычно делает server_bind(): сокет уже привязан родителем.
+        self.server_name, self.server_port = address
+        self.setup_environ()
+        self.set_app(app)
+        self.timeout = 1
+        self.handled = 0
+
+    def finish_request(self, request, client_address):
+        self.handled += 1
+        super().finish_request(request, client_address)
+
+
+def run_worker(listener, app, max_requests):
+    """Обслуживает до max_requests запросов; SIGTERM — выйти после текущего."""
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+    # Ctrl-C получает вся группа процессов; останавливает воркеры родитель.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    drop_inherited_connections()
+    server = WorkerServer(listener, app)
+    while not stopping and server.handled < max_requests:
+        server.handle_request()
+    worker_stopping.send(sender=WorkerServer)
+    connections.close_all()
+
+
+class PreforkServer:
+    # Воркер, завершившийся с ошибкой быстрее MIN_LIFETIME, считается
+    # упавшим при запуске; перезапуск таких откладывается всё дольше,
+    # чтобы не крутить fork в цикле.
+    MIN_LIFETIME = 1.0
+    BACKOFF_START = 0.1
+    BACKOFF_MAX = 10.0
+
+    def __init__(self, app, listener, workers, max_requests, jitter, log):
+        self.app = app
+        self.listener = listener
+        self.workers = workers
+        self.max_requests = max_requests
+        self.jitter = jitter
+        self.log = log
+        self.children = {}
+        self.failures = 0
+        self.stopping = False
+
+    def restart_delay(self, lifetime, status):
+        """Пауза перед заменой воркера, прожившего lifetime секунд."""
+        if status == 0 or lifetime >= self.MIN_LIFETIME:
+            self.failures = 0
+            return 0
+        self.failures += 1
+        return min(self.BACKOFF_START * 2 ** (self.failures - 1), self.BACKOFF_MAX)
+
+    def spawn(self):
+        # Разброс лимита, чтобы воркеры не перезапускались одновременно.
+        limit = self.max_requests + random.randint(0, self.jitter)
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return pid
+        code = 0
+        try:
+            run_worker(self.listener, self.app, limit)
+        except BaseException:
+            code = 1
+            sys.excepthook(*sys.exc_info())
+        finally:
+            # Без atexit и finally главного процесса.
+            os._exit(code)
+
+    def stop(self, signum, frame):
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self, ready=None):
+        # Каждое обращение сборщика мусора к объекту пишет в его заголовок
+        # и копирует страницу; загруженное до fork сборщик больше не трогает.
+        connections.close_all()
+        gc.collect()
+        gc.freeze()
+        self.listener.setblocking(False)
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+        if ready is not None:
+            ready(sorted(self.children))
+        while self.children:
+            pid, status = os.wait()
+            lifetime = time.monotonic() - self.children.pop(pid)
+            if self.stopping:
+                continue
+            delay = self.restart_delay(lifetime, status)
+            self.log(
+                f"Воркер {pid} завершился ({status}), "
+                f"запускаю новый через {delay:.1f} с."
+            )
+            time.sleep(delay)
+            if not self.stopping:
+                self.spawn()
+
+
+def standalone_memory(warm):
+    """Память процесса, который сам импортирует и прогревает yatube.wsgi,
+    как воркер обычного сервера без preload."""
+    env = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": "yatube.settings",
+        "YATUBE_WARMUP": "1" if warm else "0",
+    }
+    code = "import sys, time, yatube.wsgi; print('ready', flush=True); time.sleep(60)"
+    process = subprocess.Popen(
+        [sys.executable, "-c", code],
+        cwd=settings.BASE_DIR,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    try:
+        process.stdout.readline()
+        time.sleep(0.2)
+        return memory_usage(process.pid)
+    finally:
+        process.kill()
+        process.wait()
@@ -0,0 +1,239 @@
+"""Профилирование отдельных запросов по требованию персонала.
+
+Персонал добавляет к адресу ?_profile=cprofile (или sample), либо
+заголовок X-Profile; кроме того, доля PROFILING_SAMPLE_RATE всех
+запросов профилируется сэмплирующим профайлером автоматически.
+Профиль, адрес, имя view и хронология SQL сохраняются в PROFILING_DIR.
+"""
+
+import cProfile
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+PROFILE_PARAM = "_profile"
+PROFILE_HEADER = "HTTP_X_PROFILE"
+KINDS = ("cprofile", "sample")
+SUFFIXES = {"cprofile": ".prof", "sample": ".folded"}
+NAME_RE = re.compile(r"^[\w.:-]+\.(prof|folded|json)$")
+
+# cProfile в Python 3.12+ может работать только в одном потоке за раз.
+_cprofile_lock = threading.Lock()
+
+
+def requested_kind(request):
+    """Какой профайлер запустить для запроса; None — профилировать не нужно.
+
+    Обычный запрос ищет подстроку в QUERY_STRING и ключ в META и, при
+    ненулевой доле сэмплирования, вызывает random(); GET не разбирается."""
+    meta = request.META
+    if PROFILE_PARAM in meta.get("QUERY_STRING", "") or PROFILE_HEADER in meta:
+        kind = request.GET.get(PROFILE_PARAM) or meta.get(PROFILE_HEADER)
+        user = getattr(request, "user", None)
+        if kind is not None and user is not None and user.is_staff:
+            return kind if kind in KINDS else "cprofile"
+    rate = settings.PROFILING_SAMPLE_RATE
+    if rate and random.random() < rate:
+        return "sample"
+    return None
+
+
+class SamplingProfiler:
+    """Раз в interval секунд снимает стек потока запроса.
+
+    Результат — «свёрнутые» стеки (формат flamegraph.pl и speedscope):
+    строка «внешняя;...;внутренняя функция число_снимков».
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self.thread_id = threading.get_ident()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}"
+                    f":{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def save(self, path):
+        with open(path, "w") as output:
+            for stack, count in self.stacks.most_common():
+                output.write(f"{stack} {count}\n")
+
+
+class DeterministicProfiler:
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def __enter__(self):
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profile.disable()
+
+    def save(self, path):
+        self.profile.dump_stats(path)
+
+
+class SqlTimeline:
+    """execute_wrapper: начало и длительность каждого запроса к базе."""
+
+    def __init__(self, started):
+        self.started = started
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                {
+                    "alias": context["connection"].alias,
+                    "start_ms": round((started - self.started) * 1000, 3),
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                    "sql": sql,
+                }
+            )
+
+
+def prune(directory, keep):
+    """Оставляет keep самых свежих профилей."""
+    metas = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith(".json")),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True,
+    )
+    for entry in metas[keep:]:
+        with open(entry.path) as stored:
+            profile_file = json.load(stored)["profile_file"]
+        for name in (entry.name, profile_file):
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+
+def save_profile(profiler, kind, request, response, timeline, total_ms):
+    directory = settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+    match = getattr(request, "resolver_match", None)
+    view_name = match.view_name if match else "-"
+    stem = (
+        f"{time.strftime('%Y%m%d-%H%M%S')}-{view_name.replace(':', '.')}-"
+        f"{uuid.uuid4().hex[:8]}"
+    )
+    profile_file = stem + SUFFIXES[kind]
+    profiler.save(os.path.join(directory, profile_file))
+    meta = {
+        "created": time.time(),
+        "kind": kind,
+        "view_name": view_name,
+        "method": request.method,
+        "path": request.get_full_path(),
+        "user": getattr(getattr(request, "user", None), "username", "") or "",
+        "status": response.status_code,
+        "total_ms": round(total_ms, 3),
+        "sql_ms": round(sum(query["duration_ms"] for query in timeline), 3),
+        "profile_file": profile_file,
+        "queries": timeline,
+    }
+    with open(os.path.join(directory, stem + ".json"), "w") as output:
+        json.dump(meta, output, ensure_ascii=False, indent=1)
+    prune(directory, settings.PROFILING_KEEP)
+    return stem
+
+
+def list_profiles():
+    """Метаданные сохранённых профилей, свежие первыми."""
+    directory = settings.PROFILING_DIR
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".json"):
+            with open(entry.path) as stored:
+                meta = json.load(stored)
+            meta["meta_file"] = entry.name
+            meta["query_count"] = len(meta.pop("queries"))
+            profiles.append(meta)
+    return sorted(profiles, key=lambda meta: meta["created"], reverse=True)
+
+
+def profile_path(name):
+    """Путь к файлу профиля; None для чужих и несуществующих имён."""
+    if not NAME_RE.match(name):
+        return None
+    path = os.path.join(settings.PROFILING_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+class ProfilingMiddleware:
+    """Запускает профайлер для запросов, выбранных requested_kind().
+
+    Стоит после AuthenticationMiddleware: права проверяются по request.user.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        kind = requested_kind(request)
+        if kind is None:
+            return self.get_response(request)
+        if kind == "cprofile" and not _cprofile_lock.acquire(blocking=False):
+            kind = "sample"
+        try:
+            return self.profile(request, kind)
+        finally:
+            if kind == "cprofile":
+                _cprofile_lock.release()
+
+    def profile(self, request, kind):
+        if kind == "cprofile":
+            profiler = DeterministicProfiler()
+        else:
+            profiler = SamplingProfiler(settings.PROFILING_SAMPLE_INTERVAL)
+        started = time.perf_counter()
+        timeline = SqlTimeline(started)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timeline))
+            with profiler:
+                response = self.get_response(request)
+        total_ms = (time.perf_counter() - started) * 1000
+        stem = save_profile(
+            profiler, kind, request, response, timeline.queries, total_ms
+        )
+        response["X-Profile-Id"] = stem
+        return response
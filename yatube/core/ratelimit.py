@@ -0,0 +1,84 @@
+import re
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .views import too_many_requests
+
+RATE_RE = re.compile(r"^(\d+)/(\d*)([smhd])$")
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """'10/m' -> (10, 60), '5/10m' -> (5, 600)."""
+    match = RATE_RE.match(rate)
+    if match is None:
+        raise ValueError(f"Неверный формат лимита: {rate!r}")
+    count, multiplier, unit = match.groups()
+    return int(count), int(multiplier or 1) * PERIODS[unit]
+
+
+def consume(key, limit, period):
+    """Берёт жетон из корзины key и возвращает (разрешено, секунд до пополнения).
+
+    Корзина на limit жетонов целиком пополняется раз в period секунд.
+    В API кеша нет сравнения с обменом, зато incr и add атомарны
+    (memcached, redis, locmem), поэтому вместо времени пополнения храним
+    число взятых жетонов в ключе текущего периода.
+    """
+    now = time.time()
+    window = int(now // period)
+    key = f"rl:{key}:{period}:{window}"
+    try:
+        taken = cache.incr(key)
+    except ValueError:
+        # Первый запрос периода; add проигрывает гонку другому потоку.
+        if cache.add(key, 1, period + 1):
+            taken = 1
+        else:
+            taken = cache.incr(key)
+    return taken <= limit, (window + 1) * period - now
+
+
+def client_ip(request):
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def buckets(scope, request):
+    """Корзины запроса: [(ключ, лимит)], пользовательская первой."""
+    rate = settings.RATELIMITS.get(scope)
+    if not rate:
+        return []
+    result = []
+    if request.user.is_authenticated:
+        result.append((f"{scope}:user:{request.user.pk}", rate))
+    ip_rate = settings.RATELIMITS_IP.get(scope, rate)
+    result.append((f"{scope}:ip:{client_ip(request)}", ip_rate))
+    return result
+
+
+def ratelimit(scope, methods=("POST",)):
+    """Ограничивает частоту запросов к view по лимиту RATELIMITS[scope].
+
+    Отдельные корзины у пользователя и у IP-адреса: спамер не обойдёт
+    лимит сменой аккаунта, а соседи по NAT делят корзину IP с лимитом
+    RATELIMITS_IP[scope], рассчитанным на многих пользователей. Корзина
+    пользователя проверяется первой: отклонённый по ней запрос не тратит
+    общую корзину IP.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if settings.RATELIMIT_ENABLE and request.method in methods:
+                for key, rate in buckets(scope, request):
+                    allowed, retry_after = consume(key, *parse_rate(rate))
+                    if not allowed:
+                        return too_many_requests(request, retry_after)
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
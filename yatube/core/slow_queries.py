@@ -0,0 +1,207 @@
+"""Журнал медленных SQL-запросов с планом выполнения.
+
+Запросы дольше SLOW_QUERY_MS группируются по «отпечатку» — SQL без
+литералов, — для каждого хранятся число, суммарное и худшее время,
+вызвавшие view, стек самого медленного вызова и EXPLAIN QUERY PLAN.
+Каждый процесс держит SLOW_QUERY_TOP групп с наибольшим суммарным
+временем и сохраняет их в SLOW_QUERY_DIR/<pid>.json; команда
+slow_queries и страница /admin/slow-queries/ сводят файлы всех процессов.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import traceback
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_state = threading.local()
+_lock = threading.Lock()
+_entries = {}
+
+LITERALS_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s|\?")
+IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+# Пакетная вставка: VALUES (...), (...) и SELECT ... UNION ALL SELECT ...
+REPEATS_RE = re.compile(
+    r"(\(\.\.\.\))(?:, \(\.\.\.\))+|(SELECT \?(?:, \?)*)(?: UNION ALL \2)+"
+)
+SPACES_RE = re.compile(r"\s+")
+
+
+def normalize(sql):
+    """SQL без литералов и параметров: одинаков для запросов одной формы."""
+    sql = LITERALS_RE.sub("?", sql)
+    sql = SPACES_RE.sub(" ", IN_LIST_RE.sub("(...)", sql)).strip()
+    return REPEATS_RE.sub(lambda match: f"{match.group(1) or match.group(2)} ...", sql)
+
+
+def fingerprint(sql):
+    return hashlib.md5(normalize(sql).encode()).hexdigest()[:12]
+
+
+def project_stack():
+    """Кадры стека из кода проекта, от внешнего к внутреннему."""
+    frames = [
+        frame
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(settings.BASE_DIR)
+        and not frame.filename.endswith(("slow_queries.py", "manage.py"))
+    ]
+    return frames[-settings.SLOW_QUERY_STACK_DEPTH :]
+
+
+def calling_view(frames):
+    """Внешний кадр из views.py — сам view, а не его помощник."""
+    for frame in frames:
+        if frame.filename.endswith("views.py"):
+            module = os.path.relpath(frame.filename, settings.BASE_DIR)
+            return f"{module[:-3].replace(os.sep, '.')}.{frame.name}"
+    return "-"
+
+
+def explain(connection, sql, params):
+    """EXPLAIN QUERY PLAN для SELECT; для остальных запросов — пусто."""
+    if params is None or not sql.lstrip().upper().startswith("SELECT"):
+        return ""
+    prefix = "EXPLAIN QUERY PLAN " if connection.vendor == "sqlite" else "EXPLAIN "
+    _state.explaining = True
+    try:
+        # Точка сохранения: ошибка EXPLAIN не ломает транзакцию вызывающего.
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+    except DatabaseError:
+        return ""
+    finally:
+        _state.explaining = False
+    if connection.vendor != "sqlite":
+        return "\n".join(str(row[0]) for row in rows)
+    # Строки плана SQLite: (id, parent, -, detail); отступ по вложенности.
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return "\n".join(lines)
+
+
+def record(connection, sql, params, duration_ms):
+    frames = project_stack()
+    view = calling_view(frames)
+    key = fingerprint(sql)
+    with _lock:
+        entry = _entries.get(key)
+        is_new = entry is None
+        if is_new:
+            entry = _entries[key] = {
+                "fingerprint": key,
+                "sql": normalize(sql),
+                "alias": connection.alias,
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "views": Counter(),
+                "example": sql,
+                "stack": [],
+                "plan": "",
+            }
+        entry["count"] += 1
+        entry["total_ms"] += duration_ms
+        entry["views"][view] += 1
+        if duration_ms >= entry["max_ms"]:
+            entry["max_ms"] = duration_ms
+            entry["example"] = sql
+            entry["stack"] = [
+                f"{os.path.relpath(frame.filename, settings.BASE_DIR)}:"
+                f"{frame.lineno} {frame.name}"
+                for frame in frames
+            ]
+        if len(_entries) > settings.SLOW_QUERY_TOP:
+            cheapest = min(_entries.values(), key=lambda item: item["total_ms"])
+            del _entries[cheapest["fingerprint"]]
+    # План снимается один раз на отпечаток, вне блокировки.
+    if is_new and key in _entries:
+        entry["plan"] = explain(connection, sql, params)
+    save()
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    if getattr(_state, "explaining", False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration_ms = (time.perf_counter() - started) * 1000
+    if duration_ms >= settings.SLOW_QUERY_MS:
+        record(context["connection"], sql, None if many else params, duration_ms)
+    return result
+
+
+@receiver(connection_created)
+def install_wrapper(sender, connection, **kwargs):
+    # В начало списка: execute_wrapper() снимает с конца то, что добавил,
+    # и не должен снять постоянную обёртку при первом подключении внутри
+    # своего блока.
+    if slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, slow_query_wrapper)
+
+
+def process_file():
+    return os.path.join(settings.SLOW_QUERY_DIR, f"{os.getpid()}.json")
+
+
+def save():
+    with _lock:
+        data = json.dumps(list(_entries.values()), ensure_ascii=False)
+    os.makedirs(settings.SLOW_QUERY_DIR, exist_ok=True)
+    path = process_file()
+    with open(path + ".tmp", "w") as output:
+        output.write(data)
+    os.replace(path + ".tmp", path)
+
+
+def reset():
+    """Очищает статистику этого процесса и файлы всех процессов."""
+    with _lock:
+        _entries.clear()
+    directory = settings.SLOW_QUERY_DIR
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if name.endswith(".json"):
+                os.remove(os.path.join(directory, name))
+
+
+def top(limit=None, order="total_ms"):
+    """Группы медленных запросов всех процессов, худшие первыми."""
+    merged = {}
+    directory = settings.SLOW_QUERY_DIR
+    names = os.listdir(directory) if os.path.isdir(directory) else []
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(directory, name)) as stored:
+            entries = json.load(stored)
+        for entry in entries:
+            current = merged.get(entry["fingerprint"])
+            if current is None:
+                entry["views"] = Counter(entry["views"])
+                merged[entry["fingerprint"]] = entry
+                continue
+            current["count"] += entry["count"]
+            current["total_ms"] += entry["total_ms"]
+            current["views"].update(entry["views"])
+            current["plan"] = current["plan"] or entry["plan"]
+            if entry["max_ms"] > current["max_ms"]:
+                for field in ("max_ms", "example", "stack"):
+                    current[field] = entry[field]
+    entries = sorted(merged.values(), key=lambda item: item[order], reverse=True)
+    for entry in entries:
+        entry["avg_ms"] = entry["total_ms"] / entry["count"]
+        entry["views"] = entry["views"].most_common()
+    return entries[:limit]
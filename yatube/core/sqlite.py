@@ -0,0 +1,62 @@
+import random
+import sqlite3
+import time
+from functools import wraps
+from itertools import chain
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            apply_pragmas(cursor, settings.SQLITE_PRAGMAS)
+
+
+def is_locked(exc):
+    return isinstance(exc, (OperationalError, sqlite3.OperationalError)) and (
+        "locked" in str(exc) or "busy" in str(exc)
+    )
+
+
+def backoff_delays():
+    """Паузы между попытками: экспоненциальный рост со случайным разбросом."""
+    delay = settings.SQLITE_RETRY_DELAY
+    for _ in range(settings.SQLITE_RETRY_ATTEMPTS - 1):
+        yield delay * random.uniform(0.5, 1.5)
+        delay *= 2
+
+
+def retry_on_locked(func):
+    """Выполняет func в транзакции и повторяет её, если база занята.
+
+    В WAL-режиме транзакция, начавшая с чтения, не может стать пишущей,
+    если другой писатель успел зафиксировать изменения: SQLite сразу
+    возвращает «database is locked», не дожидаясь таймаута. Тогда
+    транзакцию повторяем целиком.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        # Внутри внешней транзакции повтор вложенной ничего не даст.
+        if transaction.get_connection().in_atomic_block:
+            return func(*args, **kwargs)
+        for pause in chain(backoff_delays(), [None]):
+            try:
+                with transaction.atomic():
+                    return func(*args, **kwargs)
+            except OperationalError as exc:
+                if pause is None or not is_locked(exc):
+                    raise
+            time.sleep(pause)
+
+    return wrapper
@@ -0,0 +1,126 @@
+import gzip
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# posts/ab/cd/abcd…ef.jpg — имя выводится из содержимого и никогда не меняется.
+# Миниатюры sorl (cache/…) тоже названы хешем от имени исходника и опций.
+IMMUTABLE_NAME_RE = re.compile(r"^[\w-]+/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{32,64}\.\w+$")
+
+
+def is_immutable(name):
+    return bool(IMMUTABLE_NAME_RE.match(name))
+
+
+def content_digest(content):
+    digest = hashlib.sha256()
+    if hasattr(content, "seek"):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище, в котором имя файла — sha256 его содержимого.
+
+    Повторная загрузка того же файла не создаёт копию, а URL файла
+    никогда не переиспользуется, поэтому его можно кешировать навсегда.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Совпадение имён означает совпадение содержимого: суффиксы не нужны.
+        return name
+
+    def content_name(self, name, content):
+        directory = posixpath.dirname(name.replace("\\", "/"))
+        extension = os.path.splitext(name)[1].lower()
+        digest = content_digest(content)
+        return posixpath.join(directory, digest[:2], digest[2:4], digest + extension)
+
+    def _save(self, name, content):
+        name = self.content_name(name, content)
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            return name
+        directory = os.path.dirname(full_path)
+        if self.directory_permissions_mode is not None:
+            old_umask = os.umask(0)
+            try:
+                os.makedirs(directory, self.directory_permissions_mode, exist_ok=True)
+            finally:
+                os.umask(old_umask)
+        else:
+            os.makedirs(directory, exist_ok=True)
+        # Пишем во временный файл рядом и атомарно переименовываем: при
+        # одновременной загрузке одинаковых файлов победит любой, и оба верны.
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as destination:
+                content.seek(0)
+                for chunk in content.chunks():
+                    destination.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
+
+
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".txt", ".json", ".xml", ".ico"}
+
+
+def precompress(content):
+    """Варианты файла для Content-Encoding, которые заметно меньше оригинала."""
+    variants = {"gz": gzip.compress(content, 9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(content, quality=11)
+    return {
+        suffix: data
+        for suffix, data in variants.items()
+        if len(data) < len(content) * 0.95
+    }
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """collectstatic добавляет хеш содержимого в имена файлов и кладёт рядом
+    сжатые копии .gz и .br (если установлен brotli)."""
+
+    def stored_name(self, name):
+        # Без манифеста (collectstatic не запускался: разработка, тесты)
+        # отдаём исходное имя вместо ошибки.
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            with self.open(name) as original:
+                content = original.read()
+            for suffix, data in precompress(content).items():
+                compressed_name = f"{name}.{suffix}"
+                if self.exists(compressed_name):
+                    self.delete(compressed_name)
+                self._save(compressed_name, ContentFile(data))
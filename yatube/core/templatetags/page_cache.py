@@ -0,0 +1,15 @@
+from django import template
+
+from ..page_cache import render_hole
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, **params):
+    """Персональный участок страницы: {% hole "follow_button" username=... %}.
+
+    Параметры должны быть простыми значениями (строки, числа), их
+    сохраняют в разметке, чтобы перерисовать участок из кеша.
+    """
+    return render_hole(name, context["request"], params)
@@ -0,0 +1,52 @@
+import gzip
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from ..middleware import CompressionMiddleware, choose_encoder
+
+PAGE = ("<p>Последние обновления на сайте</p>\n" * 200).encode()
+
+
+@override_settings(COMPRESSION_MIN_SIZE=860)
+class CompressionMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def process(self, response, accept="gzip, deflate"):
+        middleware = CompressionMiddleware(lambda request: response)
+        return middleware(self.factory.get("/", HTTP_ACCEPT_ENCODING=accept))
+
+    def test_page_compressed_with_gzip(self):
+        """Большая страница сжимается gzip и распаковывается обратно."""
+        response = self.process(HttpResponse(PAGE))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+        self.assertEqual(gzip.decompress(response.content), PAGE)
+
+    def test_small_and_binary_responses_skipped(self):
+        """Маленькие и несжимаемые ответы отдаются как есть."""
+        small = self.process(HttpResponse(b"<p>ok</p>"))
+        self.assertFalse(small.has_header("Content-Encoding"))
+        image = self.process(HttpResponse(PAGE, content_type="image/png"))
+        self.assertFalse(image.has_header("Content-Encoding"))
+
+    def test_streaming_response_compressed_incrementally(self):
+        """Потоковый ответ сжимается по кускам, каждый кусок сразу отдаётся."""
+        chunks = [PAGE[:1000], PAGE[1000:5000], PAGE[5000:]]
+        response = self.process(StreamingHttpResponse(iter(chunks)))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertFalse(response.has_header("Content-Length"))
+        parts = list(response.streaming_content)
+        self.assertGreaterEqual(len(parts), len(chunks))
+        self.assertEqual(gzip.decompress(b"".join(parts)), PAGE)
+
+    def test_encoding_negotiation(self):
+        """Учитываются q-значения и запрет кодировок."""
+        self.assertIsNone(choose_encoder(""))
+        self.assertIsNone(choose_encoder("gzip;q=0, identity"))
+        self.assertEqual(choose_encoder("deflate, gzip;q=0.5").name, "gzip")
+        self.assertIn(choose_encoder("*").name, ("br", "gzip"))
+        response = self.process(HttpResponse(PAGE), accept="identity")
+        self.assertFalse(response.has_header("Content-Encoding"))
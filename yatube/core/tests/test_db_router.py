@@ -0,0 +1,75 @@
+from core import db_router
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+def replicate(*models):
+    """Реплика догоняет основную базу: копирует в неё все строки."""
+    for model in models:
+        model.objects.using("replica").all().delete()
+        for obj in model.objects.using("default").all():
+            obj.save(using="replica", force_insert=True)
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTests(TestCase):
+    databases = {"default", "replica"}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="HasNoName")
+        cls.group = Group.objects.create(
+            title="Тестовая группа", slug="test-slug", description="Описание"
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text="Тестовый текст", group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.auth_client = Client()
+        self.auth_client.force_login(self.user)
+        replicate(User, Session, Group, Post, Comment)
+        db_router.reset_state()
+
+    def test_reads_go_to_replica_writes_to_primary(self):
+        """Чтение идёт с реплики, запись — в основную базу."""
+        post = Post.objects.create(author=self.user, text="Новый пост")
+        db_router.reset_state()
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+        self.assertTrue(Post.objects.using("default").filter(pk=post.pk).exists())
+
+    def test_lagging_replica_serves_anonymous_readers(self):
+        """Пока реплика отстаёт, анонимы видят её данные."""
+        post = Post.objects.create(author=self.user, text="Новый пост")
+        url = reverse("posts:post_detail", kwargs={"post_id": post.pk})
+        self.assertEqual(self.client.get(url).status_code, 404)
+        replicate(Post)
+        cache.clear()
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_author_reads_own_writes(self):
+        """После записи автор читает из основной базы, пока стоит кука."""
+        url = reverse("posts:post_detail", kwargs={"post_id": self.post.pk})
+        self.client.get(url)
+        response = self.auth_client.post(
+            reverse("posts:add_comment", kwargs={"post_id": self.post.pk}),
+            {"text": "Свежий комментарий"},
+        )
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        self.assertContains(self.auth_client.get(url), "Свежий комментарий")
+        self.assertNotContains(Client().get(url), "Свежий комментарий")
+
+    def test_safe_request_without_writes_sets_no_cookie(self):
+        """Чтение без записи не закрепляет пользователя за основной базой."""
+        response = self.auth_client.get(reverse("posts:posts_index"))
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        self.assertFalse(db_router.is_pinned())
@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Post
+
+User = get_user_model()
+
+
+class AnonymousFastPathTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="HasNoName")
+        cls.post = Post.objects.create(author=cls.user, text="Тестовый текст")
+
+    def setUp(self):
+        cache.clear()
+        self.auth_client = Client()
+        self.auth_client.force_login(self.user)
+
+    def test_anonymous_reader_gets_cacheable_page(self):
+        """Аноним без сессии получает страницу, пригодную для общего кеша."""
+        urls = (
+            reverse("posts:posts_index"),
+            reverse("posts:profile", kwargs={"username": self.user.username}),
+            reverse("posts:post_detail", kwargs={"post_id": self.post.pk}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response.wsgi_request.anonymous_fast_path)
+                self.assertFalse(response.wsgi_request.user.is_authenticated)
+                self.assertIn("public", response["Cache-Control"])
+                self.assertIn("Cookie", response["Vary"])
+                self.assertFalse(response.cookies)
+                self.assertContains(response, 'data-fragment="header"')
+
+    def test_logged_in_user_and_writes_take_full_path(self):
+        """Вошедший пользователь и POST-запросы идут обычным путём."""
+        response = self.auth_client.get(reverse("posts:posts_index"))
+        self.assertFalse(response.wsgi_request.anonymous_fast_path)
+        self.assertNotIn("public", response.get("Cache-Control", ""))
+        response = self.client.get(reverse("about:author"))
+        self.assertFalse(response.wsgi_request.anonymous_fast_path)
+        response = self.client.post(
+            reverse("posts:add_comment", kwargs={"post_id": self.post.pk})
+        )
+        self.assertFalse(response.wsgi_request.anonymous_fast_path)
+
+    def test_user_fragments(self):
+        """Персональные фрагменты отдаются отдельно и не кешируются."""
+        response = self.auth_client.get(
+            reverse("posts:user_fragments") + f"?post={self.post.pk}"
+        )
+        fragments = response.json()
+        self.assertIn(self.user.username, fragments["header"])
+        self.assertIn(
+            reverse("posts:add_comment", kwargs={"post_id": self.post.pk}),
+            fragments["comment_form"],
+        )
+        self.assertIn("no-cache", response["Cache-Control"])
@@ -0,0 +1,71 @@
+import os
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from ..management.commands.loadtest import (
+    DEFAULT_MIX,
+    PASSWORD_ENV,
+    Command,
+    HttpSession,
+    classify,
+    parse_mix,
+    redirects_to_login,
+)
+
+User = get_user_model()
+
+
+def prepare_options(**options):
+    return {"users": 2, "url": None, "create_users": False, **options}
+
+
+class LoadTestSafetyTests(TestCase):
+    def assertNoAccounts(self):
+        self.assertFalse(User.objects.filter(username__startswith="loadtest_"))
+
+    def test_refuses_without_debug(self):
+        """При DEBUG=False команда не запускается без --force."""
+        with self.assertRaisesMessage(CommandError, "--force"):
+            call_command("loadtest", create_users=True)
+        self.assertNoAccounts()
+
+    @override_settings(DEBUG=True)
+    def test_accounts_only_on_request(self):
+        """Без --create-users учётки не создаются, а --url их не создаёт вовсе."""
+        with mock.patch.dict(os.environ, {PASSWORD_ENV: ""}):
+            with self.assertRaisesMessage(CommandError, "--create-users"):
+                call_command("loadtest")
+        with self.assertRaisesMessage(CommandError, "--url"):
+            call_command("loadtest", url="http://127.0.0.1:1", create_users=True)
+        self.assertNoAccounts()
+
+    def test_password_per_run_or_from_env(self):
+        """Пароль учёток случайный на каждый запуск или берётся из окружения."""
+        mix = parse_mix(DEFAULT_MIX)
+        with mock.patch.dict(os.environ, {PASSWORD_ENV: ""}):
+            first = Command().prepare(prepare_options(create_users=True), mix)
+            second = Command().prepare(prepare_options(create_users=True), mix)
+        self.assertNotEqual(first["password"], second["password"])
+        user = User.objects.get(username="loadtest_0")
+        self.assertTrue(user.check_password(second["password"]))
+        with mock.patch.dict(os.environ, {PASSWORD_ENV: "из-окружения"}):
+            plan = Command().prepare(prepare_options(create_users=True), mix)
+        self.assertEqual(plan["password"], "из-окружения")
+        user.refresh_from_db()
+        self.assertTrue(user.check_password("из-окружения"))
+        self.assertEqual(plan["users"], ["loadtest_0", "loadtest_1"])
+        self.assertTrue(plan["posts"])
+
+    def test_failed_login_fails_run(self):
+        """Неверный пароль останавливает прогон, а редирект на вход — ошибка."""
+        plan = {"users": ["loadtest_0", "loadtest_1"], "password": "неверный"}
+        with mock.patch.object(HttpSession, "login", return_value=False):
+            with self.assertRaisesMessage(CommandError, "loadtest_0, loadtest_1"):
+                Command().check_logins(("127.0.0.1", 1), plan)
+        self.assertTrue(redirects_to_login(302, "/auth/login/?next=/follow/"))
+        self.assertFalse(redirects_to_login(302, "/follow/"))
+        self.assertFalse(redirects_to_login(200, "/auth/login/"))
+        self.assertEqual(classify(401), "error")
@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Post
+
+from .. import metrics
+
+User = get_user_model()
+
+
+class MetricsMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="HasNoName")
+        cls.staff = User.objects.create_user(username="Staff", is_staff=True)
+        cls.post = Post.objects.create(author=cls.user, text="Тестовый текст")
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def test_server_timing_header(self):
+        """Ответ сообщает время в базе, шаблонах и попадания в кеш."""
+        url = reverse("posts:post_detail", kwargs={"post_id": self.post.pk})
+        header = self.client.get(url)["Server-Timing"]
+        self.assertRegex(header, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertRegex(header, r"tpl;dur=[\d.]+")
+        self.assertRegex(header, r"total;dur=[\d.]+")
+        self.assertRegex(self.client.get(url)["Server-Timing"], r"hit=[1-9]")
+
+    def test_stats_aggregated_by_view_name(self):
+        """Замеры копятся по имени view, сводка доступна только персоналу."""
+        url = reverse("posts:profile", kwargs={"username": self.user.username})
+        for _ in range(3):
+            self.client.get(url)
+        stats_url = reverse("request_stats")
+        self.assertEqual(self.client.get(stats_url).status_code, 302)
+        views = self.staff_client.get(stats_url).json()["views"]
+        profile = views["posts:profile"]["window"]
+        self.assertEqual(profile["requests"], 3)
+        self.assertGreater(profile["p95_ms"], 0)
+        self.assertGreaterEqual(profile["p99_ms"], profile["p50_ms"])
+        self.assertGreater(profile["avg_db_queries"], 0)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_prometheus_export(self):
+        """Экспорт в формате Prometheus по токену или для персонала."""
+        self.client.get(reverse("posts:posts_index"))
+        url = reverse("prometheus_metrics")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(
+            self.client.get(url, HTTP_AUTHORIZATION="Bearer wrong").status_code, 403
+        )
+        response = self.client.get(url, HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(
+            response,
+            'yatube_request_duration_seconds{view="posts:posts_index",quantile="0.95"}',
+        )
+        self.assertContains(
+            response,
+            'yatube_request_duration_seconds_count{view="posts:posts_index"} 1',
+        )
+        self.assertEqual(self.staff_client.get(url).status_code, 200)
+
+    @override_settings(METRICS_ENABLE=False)
+    def test_disabled(self):
+        """Выключенные замеры не добавляют заголовок и не копят статистику."""
+        response = self.client.get(reverse("posts:posts_index"))
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(metrics.snapshot(), {})
+
+
+class RollingHistogramTests(SimpleTestCase):
+    def values(self, total_ms):
+        return {
+            **dict.fromkeys(metrics.COUNTERS, 0),
+            "requests": 1,
+            "total_ms": total_ms,
+        }
+
+    def test_quantiles(self):
+        """Квантили по корзинам близки к точным."""
+        histogram = metrics.RollingHistogram(window=60, slots=6)
+        for total_ms in range(1, 101):
+            histogram.add(self.values(total_ms), now=1000)
+        buckets = histogram.merged(now=1000)["buckets"]
+        self.assertAlmostEqual(metrics.quantile(buckets, 0.5), 50, delta=50 * 0.25)
+        self.assertAlmostEqual(metrics.quantile(buckets, 0.99), 99, delta=99 * 0.25)
+
+    def test_old_slots_leave_window(self):
+        """Замеры старше окна в сводку не попадают."""
+        histogram = metrics.RollingHistogram(window=60, slots=6)
+        histogram.add(self.values(500), now=1000)
+        histogram.add(self.values(5), now=1055)
+        self.assertEqual(histogram.merged(now=1055)["requests"], 2)
+        self.assertEqual(histogram.merged(now=1065)["requests"], 1)
+        histogram.add(self.values(5), now=1120)
+        self.assertEqual(histogram.merged(now=1120)["requests"], 1)
@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Follow, Post
+
+from ..page_cache import stats
+
+User = get_user_model()
+
+
+class FullPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="Author")
+        cls.reader = User.objects.create_user(username="Reader")
+        cls.fan = User.objects.create_user(username="Fan")
+        Follow.objects.create(user=cls.fan, author=cls.author)
+        cls.post = Post.objects.create(author=cls.author, text="Тестовый текст")
+
+    def setUp(self):
+        cache.clear()
+        stats.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.fan_client = Client()
+        self.fan_client.force_login(self.fan)
+
+    def test_page_shared_between_users_with_own_holes(self):
+        """Страница кешируется одна на всех, персональные части свои."""
+        url = reverse("posts:profile", kwargs={"username": self.author.username})
+        first = self.reader_client.get(url)
+        self.assertContains(first, "Пользователь: Reader")
+        self.assertContains(first, "Подписаться")
+        fan = self.fan_client.get(url)
+        anonymous = self.client.get(url)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"], 2)
+        self.assertContains(fan, "Пользователь: Fan")
+        self.assertContains(fan, "Отписаться")
+        self.assertNotContains(fan, "Reader")
+        self.assertNotContains(anonymous, "Reader")
+        self.assertNotContains(anonymous, "Подписаться")
+        self.assertContains(anonymous, reverse("users:login"))
+
+    def test_comment_form_punched_through_cache(self):
+        """Форма комментария с CSRF-токеном рисуется для каждого запроса."""
+        url = reverse("posts:post_detail", kwargs={"post_id": self.post.pk})
+        self.client.get(url)
+        response = self.reader_client.get(url)
+        self.assertEqual(stats["hits"], 1)
+        self.assertContains(response, "csrfmiddlewaretoken")
+        self.assertContains(
+            response, reverse("posts:add_comment", kwargs={"post_id": self.post.pk})
+        )
+
+    def test_new_content_invalidates_pages(self):
+        """Новый комментарий сразу виден на закешированной странице."""
+        url = reverse("posts:post_detail", kwargs={"post_id": self.post.pk})
+        self.client.get(url)
+        Comment.objects.create(post=self.post, author=self.reader, text="Свежий")
+        response = self.client.get(url)
+        self.assertEqual(stats["misses"], 2)
+        self.assertContains(response, "Свежий")
@@ -0,0 +1,79 @@
+import http.client
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+from ..prefork import PreforkServer
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class RestartBackoffTests(SimpleTestCase):
+    def test_quick_exits_back_off(self):
+        """Воркеры, падающие при запуске, перезапускаются всё реже."""
+        server = PreforkServer(None, None, 1, 10, 0, print)
+        delays = [server.restart_delay(0.01, 256) for _ in range(10)]
+        self.assertEqual(delays[:3], [0.1, 0.2, 0.4])
+        self.assertEqual(delays[-1], PreforkServer.BACKOFF_MAX)
+        # Плановый перезапуск по --max-requests и долгая жизнь сбрасывают паузу.
+        self.assertEqual(server.restart_delay(0.01, 0), 0)
+        self.assertEqual(server.restart_delay(0.01, 256), 0.1)
+        self.assertEqual(server.restart_delay(5, 256), 0)
+
+
+class ServeCommandTests(SimpleTestCase):
+    def test_refuses_workers_with_local_cache(self):
+        """Несколько воркеров с кешем в памяти процесса не запускаются."""
+        with self.assertRaisesMessage(CommandError, "--allow-local-cache"):
+            call_command("serve", workers=2, no_warmup=True)
+
+    def test_workers_recycled_and_stopped(self):
+        """Воркер заменяется после --max-requests, SIGTERM останавливает сервер."""
+        port = free_port()
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                "manage.py",
+                "serve",
+                f"--bind=127.0.0.1:{port}",
+                "--workers=1",
+                "--max-requests=2",
+                "--max-requests-jitter=0",
+                "--no-warmup",
+            ],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, "YATUBE_WARMUP": "0"},
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+        )
+        try:
+            self.assertIn("воркеров", process.stdout.readline())
+            statuses = []
+            for _ in range(5):
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+                connection.request(
+                    "GET", "/auth/login/", headers={"Host": settings.ALLOWED_HOSTS[0]}
+                )
+                statuses.append(connection.getresponse().status)
+                connection.close()
+            self.assertEqual(statuses, [200] * 5)
+            time.sleep(0.2)
+            process.send_signal(signal.SIGTERM)
+            output, _ = process.communicate(timeout=10)
+        finally:
+            process.kill()
+            process.wait()
+        self.assertEqual(process.returncode, 0)
+        self.assertEqual(output.count("запускаю новый"), 2)
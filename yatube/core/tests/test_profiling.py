@@ -0,0 +1,98 @@
+import json
+import os
+import pstats
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Post
+
+TEMP_PROFILING_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(PROFILING_DIR=TEMP_PROFILING_DIR)
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="HasNoName")
+        cls.staff = User.objects.create_user(username="Staff", is_staff=True)
+        cls.post = Post.objects.create(author=cls.user, text="Тестовый текст")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_PROFILING_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(TEMP_PROFILING_DIR, ignore_errors=True)
+        self.url = reverse("posts:post_detail", kwargs={"post_id": self.post.pk})
+        self.user_client = Client()
+        self.user_client.force_login(self.user)
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def saved(self):
+        if not os.path.isdir(TEMP_PROFILING_DIR):
+            return []
+        return sorted(os.listdir(TEMP_PROFILING_DIR))
+
+    def test_staff_profile_with_sql_timeline(self):
+        """Персонал получает профиль cProfile и хронологию SQL запроса."""
+        response = self.staff_client.get(self.url, {"_profile": "cprofile"})
+        stem = response["X-Profile-Id"]
+        self.assertEqual(self.saved(), [stem + ".json", stem + ".prof"])
+        with open(os.path.join(TEMP_PROFILING_DIR, stem + ".json")) as stored:
+            meta = json.load(stored)
+        self.assertEqual(meta["view_name"], "posts:post_detail")
+        self.assertEqual(meta["status"], 200)
+        self.assertTrue(meta["queries"])
+        self.assertIn("sql", meta["queries"][0])
+        stats = pstats.Stats(os.path.join(TEMP_PROFILING_DIR, stem + ".prof"))
+        self.assertTrue(stats.total_calls)
+
+    def test_sampling_profiler_by_header(self):
+        """Заголовок X-Profile: sample включает сэмплирующий профайлер."""
+        response = self.staff_client.get(self.url, HTTP_X_PROFILE="sample")
+        self.assertIn(response["X-Profile-Id"] + ".folded", self.saved())
+
+    def test_not_triggered_for_others(self):
+        """Флаг от анонима или обычного пользователя ничего не делает."""
+        self.client.get(self.url, {"_profile": "cprofile"})
+        response = self.user_client.get(self.url, HTTP_X_PROFILE="cprofile")
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(self.saved(), [])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_KEEP=2)
+    def test_automatic_sampling_keeps_latest(self):
+        """Доля запросов профилируется сама, старые профили удаляются."""
+        for _ in range(3):
+            self.client.get(self.url)
+        self.assertEqual(len([n for n in self.saved() if n.endswith(".json")]), 2)
+        self.assertEqual(len(self.saved()), 4)
+
+    def test_admin_list_and_download(self):
+        """Список профилей и скачивание доступны только персоналу."""
+        stem = self.staff_client.get(self.url, {"_profile": "1"})["X-Profile-Id"]
+        list_url = reverse("profile_list")
+        self.assertEqual(self.user_client.get(list_url).status_code, 302)
+        response = self.staff_client.get(list_url)
+        self.assertContains(response, "posts:post_detail")
+        download_url = reverse("profile_download", args=[stem + ".prof"])
+        self.assertContains(response, download_url)
+        response = self.staff_client.get(download_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("attachment", response["Content-Disposition"])
+        self.assertEqual(
+            self.staff_client.get(
+                reverse("profile_download", args=["..settings.py"])
+            ).status_code,
+            404,
+        )
@@ -0,0 +1,95 @@
+import threading
+
+from core.ratelimit import consume, parse_rate
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class RateLimitTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="HasNoName")
+        cls.post = Post.objects.create(author=cls.user, text="Тестовый текст")
+
+    def setUp(self):
+        cache.clear()
+        self.auth_client = Client()
+        self.auth_client.force_login(self.user)
+
+    def test_parse_rate(self):
+        """Лимит задаётся как «число/период»."""
+        self.assertEqual(parse_rate("10/m"), (10, 60))
+        self.assertEqual(parse_rate("5/10m"), (5, 600))
+        with self.assertRaises(ValueError):
+            parse_rate("10 в минуту")
+
+    @override_settings(RATELIMITS={"add_comment": "3/d"})
+    def test_comment_limit_per_user(self):
+        """Сверх лимита комментарии не создаются, ответ 429."""
+        url = reverse("posts:add_comment", kwargs={"post_id": self.post.pk})
+        for number in range(3):
+            response = self.auth_client.post(url, {"text": f"Комментарий {number}"})
+            self.assertEqual(response.status_code, 302)
+        response = self.auth_client.post(url, {"text": "Спам"})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+        self.assertEqual(Comment.objects.count(), 3)
+
+    @override_settings(
+        RATELIMITS={"add_comment": "2/d"}, RATELIMITS_IP={"add_comment": "3/d"}
+    )
+    def test_shared_ip_has_own_larger_limit(self):
+        """Соседи по IP не делят лимит пользователя, а отказ не тратит IP."""
+        url = reverse("posts:add_comment", kwargs={"post_id": self.post.pk})
+        statuses = [
+            self.auth_client.post(url, {"text": "Текст"}).status_code for _ in range(3)
+        ]
+        self.assertEqual(statuses, [302, 302, 429])
+        neighbour = Client()
+        neighbour.force_login(User.objects.create_user(username="Neighbour"))
+        statuses = [
+            neighbour.post(url, {"text": "Текст"}).status_code for _ in range(2)
+        ]
+        self.assertEqual(statuses, [302, 429])
+        self.assertEqual(Comment.objects.count(), 3)
+
+    @override_settings(RATELIMITS={"signup": "2/d"})
+    def test_signup_limit_per_ip(self):
+        """Регистрация ограничена по IP-адресу."""
+        url = reverse("users:signup")
+        statuses = [
+            self.client.post(url, {}, REMOTE_ADDR="10.0.0.1").status_code
+            for _ in range(3)
+        ]
+        self.assertEqual(statuses, [200, 200, 429])
+        response = self.client.post(url, {}, REMOTE_ADDR="10.0.0.2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(url, REMOTE_ADDR="10.0.0.1").status_code, 200)
+
+
+class ConsumeConcurrencyTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_limit_holds_across_threads(self):
+        """Параллельные потоки не получают больше жетонов, чем лимит."""
+        allowed = []
+        barrier = threading.Barrier(8)
+
+        def worker():
+            barrier.wait()
+            for _ in range(50):
+                allowed.append(consume("race", 100, 86400)[0])
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(allowed.count(True), 100)
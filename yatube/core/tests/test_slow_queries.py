@@ -0,0 +1,93 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Post
+
+from .. import slow_queries
+
+TEMP_SLOW_QUERY_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+class NormalizeTests(SimpleTestCase):
+    def test_literals_and_lists_removed(self):
+        """Запросы одной формы с разными значениями дают один отпечаток."""
+        first = "SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'a' LIMIT 21"
+        second = "SELECT * FROM t WHERE id IN (%s, %s)  AND name = 'b''c' LIMIT 5"
+        self.assertEqual(
+            slow_queries.normalize(first),
+            "SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?",
+        )
+        self.assertEqual(
+            slow_queries.fingerprint(first), slow_queries.fingerprint(second)
+        )
+
+
+@override_settings(SLOW_QUERY_DIR=TEMP_SLOW_QUERY_DIR, SLOW_QUERY_MS=0)
+class SlowQueryLogTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="HasNoName")
+        cls.staff = User.objects.create_user(username="Staff", is_staff=True)
+        cls.post = Post.objects.create(author=cls.user, text="Тестовый текст")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_SLOW_QUERY_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        slow_queries.reset()
+
+    def feed_query(self):
+        for query in slow_queries.top():
+            if 'FROM "posts_post"' in query["sql"] and "ORDER BY" in query["sql"]:
+                return query
+        self.fail("Запрос ленты не попал в журнал")
+
+    def test_records_view_stack_and_plan(self):
+        """Запрос записан с вызвавшим view, стеком и планом выполнения."""
+        self.client.get(reverse("posts:posts_index"))
+        self.client.get(reverse("posts:posts_index") + "?page=1")
+        query = self.feed_query()
+        self.assertEqual(query["views"][0][0], "posts.views.index")
+        self.assertEqual(query["count"], 2)
+        self.assertIn("posts_post", query["plan"])
+        self.assertTrue(any("posts/views.py" in frame for frame in query["stack"]))
+
+    @override_settings(SLOW_QUERY_TOP=3)
+    def test_keeps_top_n(self):
+        """Процесс хранит не больше SLOW_QUERY_TOP групп запросов."""
+        self.client.get(reverse("posts:posts_index"))
+        self.assertLessEqual(len(slow_queries.top()), 3)
+
+    @override_settings(SLOW_QUERY_MS=10_000)
+    def test_fast_queries_ignored(self):
+        """Запросы быстрее порога не записываются."""
+        self.client.get(reverse("posts:posts_index"))
+        self.assertEqual(slow_queries.top(), [])
+
+    def test_command_and_staff_view(self):
+        """Сводка доступна командой и страницей для персонала."""
+        self.client.get(reverse("posts:posts_index"))
+        output = StringIO()
+        call_command("slow_queries", plans=True, stdout=output)
+        self.assertIn("posts.views.index", output.getvalue())
+        self.assertIn("| ", output.getvalue())
+        url = reverse("slow_query_list")
+        self.assertEqual(self.client.get(url).status_code, 302)
+        staff_client = Client()
+        staff_client.force_login(self.staff)
+        self.assertContains(staff_client.get(url), self.feed_query()["fingerprint"])
+        call_command("slow_queries", reset=True, stdout=output)
+        self.assertEqual(slow_queries.top(), [])
@@ -0,0 +1,40 @@
+from unittest import mock
+
+from core.sqlite import retry_on_locked
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+
+
+class SqlitePragmaTests(TestCase):
+    def test_pragmas_applied_to_connection(self):
+        """Новое соединение получает настроенные прагмы."""
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute("PRAGMA cache_size")
+            self.assertEqual(cursor.fetchone()[0], -20000)
+
+
+@override_settings(SQLITE_RETRY_ATTEMPTS=3, SQLITE_RETRY_DELAY=0)
+class RetryOnLockedTests(TransactionTestCase):
+    def test_locked_transaction_is_retried(self):
+        """Транзакция повторяется, пока база занята."""
+        func = mock.Mock(
+            side_effect=[OperationalError("database is locked")] * 2 + ["ok"]
+        )
+        self.assertEqual(retry_on_locked(func)(), "ok")
+        self.assertEqual(func.call_count, 3)
+
+    def test_gives_up_after_attempts(self):
+        """После SQLITE_RETRY_ATTEMPTS попыток ошибка пробрасывается."""
+        func = mock.Mock(side_effect=OperationalError("database is locked"))
+        with self.assertRaises(OperationalError):
+            retry_on_locked(func)()
+        self.assertEqual(func.call_count, 3)
+
+    def test_other_errors_are_not_retried(self):
+        """Прочие ошибки базы не повторяются."""
+        func = mock.Mock(side_effect=OperationalError("no such table: x"))
+        with self.assertRaises(OperationalError):
+            retry_on_locked(func)()
+        self.assertEqual(func.call_count, 1)
@@ -0,0 +1,65 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from ..middleware import StaticFilesMiddleware
+
+TEMP_STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(STATIC_ROOT=TEMP_STATIC_ROOT)
+class StaticPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command("collectstatic", interactive=False, verbosity=0)
+        with open(os.path.join(TEMP_STATIC_ROOT, "staticfiles.json")) as manifest:
+            cls.hashed_css = json.load(manifest)["paths"]["css/bootstrap.min.css"]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_STATIC_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.middleware = StaticFilesMiddleware(lambda request: HttpResponse("view"))
+        self.factory = RequestFactory()
+
+    def test_collectstatic_fingerprints_and_precompresses(self):
+        """collectstatic добавляет хеш в имя и кладёт рядом .gz."""
+        self.assertRegex(self.hashed_css, r"^css/bootstrap\.min\.[0-9a-f]{12}\.css$")
+        path = os.path.join(TEMP_STATIC_ROOT, self.hashed_css)
+        with open(path, "rb") as original, gzip.open(path + ".gz") as compressed:
+            self.assertEqual(original.read(), compressed.read())
+
+    def test_serves_precompressed_with_far_future_cache(self):
+        """Клиенту с gzip отдаётся сжатая копия с кешем на год."""
+        request = self.factory.get(
+            settings.STATIC_URL + self.hashed_css, HTTP_ACCEPT_ENCODING="gzip, br;q=0"
+        )
+        response = self.middleware(request)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("Accept-Encoding", response["Vary"])
+        body = gzip.decompress(b"".join(response.streaming_content))
+        self.assertTrue(body.startswith(b"@charset"))
+
+    def test_unhashed_name_and_identity_encoding(self):
+        """Без хеша в имени кеш короткий, без gzip отдаётся оригинал."""
+        request = self.factory.get(settings.STATIC_URL + "css/bootstrap.min.css")
+        response = self.middleware(request)
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertNotIn("immutable", response["Cache-Control"])
+
+    def test_other_paths_pass_through(self):
+        """Запросы не к статике уходят дальше по цепочке."""
+        response = self.middleware(self.factory.get("/"))
+        self.assertEqual(response.content, b"view")
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from posts.models import Group, Post
+
+from ..page_cache import stats
+from ..warmup import warm_up
+
+User = get_user_model()
+
+
+class WarmUpTests(TestCase):
+    databases = {"default", "replica"}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="HasNoName")
+        cls.group = Group.objects.create(
+            title="Тестовая группа", slug="test-slug", description="Описание"
+        )
+        Post.objects.create(author=cls.user, group=cls.group, text="Тестовый текст")
+
+    def setUp(self):
+        cache.clear()
+        stats.clear()
+
+    def test_all_steps_succeed(self):
+        """Все шаги прогрева выполняются и что-то прогревают."""
+        report = warm_up()
+        self.assertEqual(
+            [name for name, _, _ in report],
+            ["urls", "templates", "connections", "libraries", "pages"],
+        )
+        for name, count, _ in report:
+            with self.subTest(step=name):
+                self.assertTrue(count)
+
+    def test_feeds_cached_for_first_visitor(self):
+        """После прогрева первая лента отдаётся из кеша страниц."""
+        warm_up()
+        stats.clear()
+        self.client.get(reverse("posts:posts_index"), HTTP_HOST=settings.WARMUP_HOST)
+        self.client.get(
+            reverse("posts:group_posts", args=[self.group.slug]),
+            HTTP_HOST=settings.WARMUP_HOST,
+        )
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 0)
@@ -1,4 +1,18 @@
+import math
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
+from django.views.static import serve
+
+from . import metrics, profiling, slow_queries
+from .storage import is_immutable
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
 
 
 def page_not_found(request, exception):
@@ -15,3 +29,66 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, "core/403.html", status=403)
+
+
+def too_many_requests(request, retry_after):
+    response = render(request, "core/429.html", status=429)
+    response["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def serve_media(request, path):
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if is_immutable(path):
+        response["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+@never_cache
+@staff_member_required
+def request_stats(request):
+    """p50/p95/p99 и средние замеры по каждому view этого процесса."""
+    return JsonResponse(
+        {"window_seconds": settings.METRICS_WINDOW, "views": metrics.snapshot()}
+    )
+
+
+@never_cache
+def prometheus_metrics(request):
+    token = request.META.get("HTTP_AUTHORIZATION", "")[len("Bearer ") :]
+    authorized = settings.METRICS_TOKEN and constant_time_compare(
+        token, settings.METRICS_TOKEN
+    )
+    if not authorized and not request.user.is_staff:
+        raise PermissionDenied
+    return HttpResponse(
+        metrics.prometheus_text(), content_type="text/plain; version=0.0.4"
+    )
+
+
+@staff_member_required
+def profile_list(request):
+    context = {
+        "title": "Профили запросов",
+        "profiles": profiling.list_profiles(),
+        "sample_rate": settings.PROFILING_SAMPLE_RATE,
+    }
+    return render(request, "core/profiles.html", context)
+
+
+@staff_member_required
+def profile_download(request, name):
+    path = profiling.profile_path(name)
+    if path is None:
+        raise Http404
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=name)
+
+
+@staff_member_required
+def slow_query_list(request):
+    context = {
+        "title": "Медленные запросы",
+        "threshold": settings.SLOW_QUERY_MS,
+        "queries": slow_queries.top(settings.SLOW_QUERY_TOP),
+    }
+    return render(request, "core/slow_queries.html", context)
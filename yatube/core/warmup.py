@@ -0,0 +1,138 @@
+"""Прогрев процесса перед первыми запросами.
+
+Всё, что Django и библиотеки строят лениво при первом обращении, —
+распознаватель URL, шаблоны и библиотеки тегов, соединения с базой,
+бэкенд sorl-thumbnail, валидаторы паролей, — и горячие кеши лент
+заполняются заранее, чтобы первый посетитель воркера не ждал.
+"""
+
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth import password_validation
+from django.db import connections
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.test import Client
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils.translation import override
+
+logger = logging.getLogger(__name__)
+
+# Запросы прогрева помечены заголовком X-Warmup: это не посетители.
+WARMUP_HEADER = "HTTP_X_WARMUP"
+
+
+def template_names(engine):
+    """Имена всех шаблонов из DIRS и каталогов templates приложений."""
+    names = set()
+    for directory in engine.template_dirs:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith((".html", ".txt")):
+                    path = os.path.relpath(os.path.join(root, name), directory)
+                    names.add(path.replace(os.sep, "/"))
+    return sorted(names)
+
+
+def warm_templates():
+    """Компилирует шаблоны; с кеширующим загрузчиком (DEBUG=False)
+    они остаются в памяти, иначе подгружаются хотя бы библиотеки тегов."""
+    count = 0
+    for engine in engines.all():
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+            except (TemplateDoesNotExist, TemplateSyntaxError):
+                continue
+            count += 1
+    return count
+
+
+def iter_patterns(resolver):
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_patterns(pattern)
+        elif isinstance(pattern, URLPattern):
+            yield pattern
+
+
+def warm_urls():
+    """Строит таблицы reverse() всех пространств имён и распознаватели
+    вложенных URLconf."""
+    resolver = get_resolver()
+    with override(settings.LANGUAGE_CODE):
+        resolver.reverse_dict
+        for namespace in resolver.namespace_dict:
+            resolver.namespace_dict[namespace][1].reverse_dict
+    return sum(1 for _ in iter_patterns(resolver))
+
+
+def warm_connections():
+    for connection in connections.all():
+        connection.ensure_connection()
+    return len(connections.all())
+
+
+def warm_libraries():
+    from PIL import Image
+    from sorl.thumbnail import default
+
+    # Загрузчики форматов Pillow и ленивые объекты sorl.
+    Image.init()
+    for lazy in (default.backend, default.engine, default.kvstore, default.storage):
+        lazy.__class__
+    return len(password_validation.get_default_password_validators())
+
+
+def warm_pages():
+    """Первые страницы лент: заполняет кеш страниц, групп и счётчиков."""
+    from posts.groups import group_index
+    from posts.models import Group, Post
+
+    group_index.refresh()
+    urls = [reverse("posts:posts_index")]
+    groups = Group.objects.filter(is_deleted=False).order_by("-pk")
+    urls += [
+        reverse("posts:group_posts", args=[slug])
+        for slug in groups.values_list("slug", flat=True)[: settings.WARMUP_FEEDS]
+    ]
+    latest = Post.objects.visible().order_by("-pub_date").first()
+    if latest is not None:
+        urls.append(reverse("posts:post_detail", args=[latest.pk]))
+    client = Client(HTTP_HOST=settings.WARMUP_HOST, **{WARMUP_HEADER: "1"})
+    for url in urls:
+        client.get(url)
+    return len(urls)
+
+
+STEPS = (
+    ("urls", warm_urls),
+    ("templates", warm_templates),
+    ("connections", warm_connections),
+    ("libraries", warm_libraries),
+    ("pages", warm_pages),
+)
+
+
+def warm_up(close_connections=False):
+    """Выполняет шаги прогрева; возвращает [(шаг, число объектов, секунды)].
+
+    Упавший шаг пишется в лог и не мешает остальным: прогрев не должен
+    ронять запуск воркера. close_connections нужен перед fork — открытые
+    соединения с базой нельзя делить между процессами.
+    """
+    report = []
+    for name, step in STEPS:
+        started = time.perf_counter()
+        try:
+            count = step()
+        except Exception:
+            logger.exception("Прогрев: шаг %s не выполнен", name)
+            count = None
+        report.append((name, count, time.perf_counter() - started))
+    if close_connections:
+        for connection in connections.all():
+            connection.close()
+    return report
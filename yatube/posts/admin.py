@@ -1,27 +1,55 @@
 from django.contrib import admin
+from django.contrib.auth import get_permission_codename
+from django.contrib.auth.admin import UserAdmin
 
-from .models import Comment, Follow, Group, Post
+from .deletion import cascade_models, schedule_deletion
+from .models import ArchivedPost, Comment, DeletionJob, Follow, Group, Post, User
 
 
-class GroupAdmin(admin.ModelAdmin):
-    list_display = ("title", "description")
+class ScheduledDeletionMixin:
+    """Удаление из админки только скрывает объект и ставит его в очередь
+    process_deletions, не запуская каскад в запросе."""
+
+    def get_deleted_objects(self, objs, request):
+        # Полный список каскада для большой группы строится минутами,
+        # поэтому права проверяем на уровне моделей, а не строк.
+        to_delete = [str(obj) for obj in objs]
+        perms_needed = set()
+        for model in cascade_models(self.model):
+            opts = model._meta
+            codename = get_permission_codename("delete", opts)
+            if not request.user.has_perm(f"{opts.app_label}.{codename}"):
+                perms_needed.add(opts.verbose_name)
+        return to_delete, {}, perms_needed, []
+
+    def delete_model(self, request, obj):
+        schedule_deletion(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            schedule_deletion(obj)
+
+
+class GroupAdmin(ScheduledDeletionMixin, admin.ModelAdmin):
+    list_display = ("title", "description", "is_deleted")
     prepopulated_fields = {"slug": ("title",)}
 
 
 admin.site.register(Group, GroupAdmin)
 
 
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(ScheduledDeletionMixin, admin.ModelAdmin):
     list_display = (
         "pk",
         "text",
         "pub_date",
         "author",
         "group",
+        "is_deleted",
     )
     list_editable = ("group",)
     search_fields = ("text",)
-    list_filter = ("pub_date",)
+    list_filter = ("pub_date", "is_deleted")
     empty_value_display = "-пусто-"
 
 
@@ -56,3 +84,44 @@ class FollowAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Follow, FollowAdmin)
+
+
+class ArchivedPostAdmin(admin.ModelAdmin):
+    list_display = (
+        "pk",
+        "text",
+        "pub_date",
+        "author",
+        "group",
+    )
+    search_fields = ("text",)
+    list_filter = ("pub_date",)
+    empty_value_display = "-пусто-"
+
+
+admin.site.register(ArchivedPost, ArchivedPostAdmin)
+
+
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "pk",
+        "kind",
+        "object_id",
+        "deleted",
+        "created",
+        "finished",
+    )
+    list_filter = ("kind", "finished")
+    readonly_fields = ("kind", "object_id", "deleted", "created", "finished")
+    empty_value_display = "-пусто-"
+
+
+admin.site.register(DeletionJob, DeletionJobAdmin)
+
+
+class ScheduledDeletionUserAdmin(ScheduledDeletionMixin, UserAdmin):
+    pass
+
+
+admin.site.unregister(User)
+admin.site.register(User, ScheduledDeletionUserAdmin)
@@ -0,0 +1,172 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+from core.page_cache import invalidate_pages
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .models import ArchivedComment, ArchivedPost, Comment, Post
+from .signals import change_refs
+
+VERSION_KEY = "archive:version"
+
+
+def invalidate_archived_counts():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+def archived_count(queryset):
+    """Число постов в архиве. Между запусками архивации оно почти не
+    меняется, поэтому хранится в кеше."""
+    queryset = queryset.order_by().values("pk")
+    version = cache.get_or_set(VERSION_KEY, 1, None)
+    digest = hashlib.md5(str(queryset.query).encode()).hexdigest()
+    key = f"archive:count:{version}:{digest}"
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.ARCHIVE_COUNT_TIMEOUT)
+    return count
+
+
+class TieredFeed:
+    """Лента для Paginator: сначала горячая таблица, затем архив.
+
+    Архив старше любого горячего поста, поэтому страницы, целиком
+    лежащие в горячей таблице, архив не читают.
+    """
+
+    def __init__(self, hot, archived):
+        self.hot = hot
+        self.archived = archived
+
+    @cached_property
+    def hot_count(self):
+        # Аннотации карточек для подсчёта страниц не нужны.
+        return self.hot.order_by().values("pk").count()
+
+    def count(self):
+        return self.hot_count + archived_count(self.archived)
+
+    def __getitem__(self, index):
+        start, stop = index.start or 0, index.stop
+        if stop <= self.hot_count:
+            return list(self.hot[start:stop])
+        posts = list(self.hot[start : self.hot_count]) if start < self.hot_count else []
+        archived_start = max(0, start - self.hot_count)
+        return posts + list(self.archived[archived_start : stop - self.hot_count])
+
+    def after(self, cursor, limit):
+        """До limit постов, следующих в ленте за cursor (pub_date, pk).
+
+        В отличие от номера страницы, курсор не сдвигается, когда сверху
+        появляются новые посты."""
+        hot, archived = self.hot, self.archived
+        if cursor is not None:
+            pub_date, pk = cursor
+            older = Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            hot, archived = hot.filter(older), archived.filter(older)
+        posts = list(hot[:limit])
+        if len(posts) < limit:
+            posts += list(archived[: limit - len(posts)])
+        return posts
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_cursor(post):
+    """Позиция в ленте: время публикации в микросекундах и id поста."""
+    microseconds = (post.pub_date - EPOCH) // timedelta(microseconds=1)
+    return f"{microseconds}.{post.pk}"
+
+
+def decode_cursor(value):
+    """Обратное encode_cursor; ValueError для испорченной строки."""
+    if not value:
+        return None
+    microseconds, pk = value.split(".")
+    pk = int(pk)
+    # id больше INTEGER базы ломает уже запрос, а время вне datetime — timedelta.
+    if not 0 < pk < 2**63:
+        raise ValueError(f"id вне диапазона: {pk}")
+    try:
+        return EPOCH + timedelta(microseconds=int(microseconds)), pk
+    except OverflowError as exc:
+        raise ValueError(f"время вне диапазона: {microseconds}") from exc
+
+
+def count_author_posts(author):
+    return (
+        Post.objects.visible().filter(author=author).count()
+        + ArchivedPost.objects.visible().filter(author=author).count()
+    )
+
+
+def archive_batch(before, batch_size):
+    """Переносит до batch_size постов старше before вместе с комментариями.
+
+    Возвращает число перенесённых постов."""
+    with transaction.atomic():
+        posts = list(
+            Post.objects.filter(pub_date__lt=before)
+            .order_by("pub_date", "pk")
+            .select_for_update()[:batch_size]
+        )
+        if not posts:
+            return 0
+        ids = [post.pk for post in posts]
+        ArchivedPost.objects.bulk_create(
+            ArchivedPost(
+                id=post.pk,
+                text=post.text,
+                text_html=post.text_html,
+                excerpt=post.excerpt,
+                pub_date=post.pub_date,
+                author_id=post.author_id,
+                group_id=post.group_id,
+                image=post.image.name,
+                is_deleted=post.is_deleted,
+                views_count=post.views_count,
+            )
+            for post in posts
+        )
+        comments = Comment.objects.filter(post_id__in=ids)
+        ArchivedComment.objects.bulk_create(
+            ArchivedComment(
+                id=comment.pk,
+                post_id=comment.post_id,
+                author_id=comment.author_id,
+                text=comment.text,
+                created=comment.created,
+                path=comment.path,
+                depth=comment.depth,
+            )
+            for comment in comments
+        )
+        comments.delete()
+        Post.objects.filter(pk__in=ids).delete()
+        # Удаление из горячей таблицы уменьшило счётчики ссылок на картинки,
+        # но архивная копия ссылается на те же файлы.
+        for post in posts:
+            change_refs(post.image.name, 1)
+    return len(posts)
+
+
+def archive_posts(before, batch_size=500):
+    moved = 0
+    while True:
+        count = archive_batch(before, batch_size)
+        if not count:
+            break
+        moved += count
+    if moved:
+        invalidate_archived_counts()
+        invalidate_pages()
+    return moved
@@ -0,0 +1,102 @@
+from core.page_cache import invalidate_pages
+from core.sqlite import retry_on_locked
+from django.db.models import Q
+from django.utils import timezone
+
+from .archive import invalidate_archived_counts
+from .models import (
+    ArchivedComment,
+    ArchivedPost,
+    Comment,
+    DeletionJob,
+    Follow,
+    Group,
+    Post,
+    User,
+)
+
+
+def deletion_kind(model):
+    if issubclass(model, User):
+        return DeletionJob.USER
+    return DeletionJob.GROUP if issubclass(model, Group) else DeletionJob.POST
+
+
+def schedule_deletion(obj):
+    """Сразу скрывает объект из лент и ставит его удаление в очередь."""
+    kind = deletion_kind(type(obj))
+    if kind == DeletionJob.USER:
+        obj.is_active = False
+        obj.save(update_fields=["is_active"])
+    else:
+        obj.is_deleted = True
+        obj.save(update_fields=["is_deleted"])
+    job, _ = DeletionJob.objects.get_or_create(
+        kind=kind, object_id=obj.pk, finished__isnull=True
+    )
+    invalidate_archived_counts()
+    invalidate_pages()
+    return job
+
+
+def deletion_steps(job):
+    """Запросы в порядке удаления: сначала зависимые строки, потом сам объект.
+
+    Каждый шаг удаляется по частям, и ни один не упирается в каскад."""
+    if job.kind == DeletionJob.POST:
+        return [
+            Comment.objects.filter(post_id=job.object_id),
+            Post.objects.filter(pk=job.object_id),
+            ArchivedComment.objects.filter(post_id=job.object_id),
+            ArchivedPost.objects.filter(pk=job.object_id),
+        ]
+    if job.kind == DeletionJob.GROUP:
+        posts = Post.objects.filter(group_id=job.object_id)
+        archived = ArchivedPost.objects.filter(group_id=job.object_id)
+        return [
+            Comment.objects.filter(post__in=posts),
+            posts,
+            ArchivedComment.objects.filter(post__in=archived),
+            archived,
+            Group.objects.filter(pk=job.object_id),
+        ]
+    posts = Post.objects.filter(author_id=job.object_id)
+    archived = ArchivedPost.objects.filter(author_id=job.object_id)
+    return [
+        Follow.objects.filter(Q(user_id=job.object_id) | Q(author_id=job.object_id)),
+        Comment.objects.filter(Q(author_id=job.object_id) | Q(post__in=posts)),
+        posts,
+        ArchivedComment.objects.filter(
+            Q(author_id=job.object_id) | Q(post__in=archived)
+        ),
+        archived,
+        User.objects.filter(pk=job.object_id),
+    ]
+
+
+def cascade_models(model):
+    """Модели, строки которых удаляет работа для объекта model."""
+    job = DeletionJob(kind=deletion_kind(model), object_id=0)
+    return {queryset.model for queryset in deletion_steps(job)}
+
+
+@retry_on_locked
+def delete_chunk(job, queryset, chunk_size):
+    """Удаляет до chunk_size строк и в той же транзакции сохраняет прогресс,
+    поэтому после сбоя работа продолжается с места остановки."""
+    pks = list(queryset.values_list("pk", flat=True)[:chunk_size])
+    if not pks:
+        return 0
+    deleted, _ = queryset.model.objects.filter(pk__in=pks).delete()
+    job.deleted += deleted
+    job.save(update_fields=["deleted"])
+    return len(pks)
+
+
+def run_job(job, chunk_size=500, progress=None):
+    for queryset in deletion_steps(job):
+        while delete_chunk(job, queryset, chunk_size):
+            if progress is not None:
+                progress(job)
+    job.finished = timezone.now()
+    job.save(update_fields=["finished"])
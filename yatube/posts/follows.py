@@ -0,0 +1,74 @@
+from itertools import islice
+
+from core.sqlite import retry_on_locked
+
+from .models import Follow, User
+from .profiles import invalidate_profile_summaries
+from .signals import invalidate
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+@retry_on_locked
+def follow_batch(pairs):
+    """Создаёт подписки из пар (user_id, author_id) одной вставкой.
+
+    Возвращает число новых подписок. Подписки на себя и на отключённых
+    авторов пропускаются, существующие — тоже; ignore_conflicts
+    страхует от гонки с одиночным profile_follow по unique_following.
+    """
+    pairs = {
+        (user_id, author_id) for user_id, author_id in pairs if user_id != author_id
+    }
+    user_ids = {user_id for user_id, _ in pairs}
+    active = set(
+        User.objects.filter(
+            pk__in={author_id for _, author_id in pairs}, is_active=True
+        ).values_list("pk", flat=True)
+    )
+    existing = set(
+        Follow.objects.filter(user_id__in=user_ids, author_id__in=active).values_list(
+            "user_id", "author_id"
+        )
+    )
+    new = [pair for pair in pairs if pair[1] in active and pair not in existing]
+    Follow.objects.bulk_create(
+        [Follow(user_id=user_id, author_id=author_id) for user_id, author_id in new],
+        ignore_conflicts=True,
+    )
+    if new:
+        # bulk_create не шлёт post_save: кеш шапок профилей сбрасываем
+        # сами, один раз на пачку.
+        invalidate(
+            invalidate_profile_summaries,
+            *user_ids,
+            *{author_id for _, author_id in new},
+        )
+    return len(new)
+
+
+def bulk_follow(pairs, batch_size=500, progress=None):
+    """Подписки из пар (user_id, author_id) пачками по batch_size.
+
+    Возвращает (обработано пар, создано подписок)."""
+    seen = created = 0
+    for batch in batches(pairs, batch_size):
+        created += follow_batch(batch)
+        seen += len(batch)
+        if progress is not None:
+            progress(seen, created)
+    return seen, created
+
+
+def follow_authors(user, author_ids, batch_size=500):
+    """Подписывает user на авторов; возвращает число новых подписок."""
+    return bulk_follow(((user.pk, author_id) for author_id in author_ids), batch_size)[
+        1
+    ]
@@ -1,11 +1,65 @@
 from django import forms
-from posts.models import Comment, Post
+from django.core.files.uploadedfile import UploadedFile
+from django.urls import reverse_lazy
+from django.utils.html import format_html
+from posts.groups import group_choices
+from posts.images import check_upload_size, ingest_image
+from posts.models import Comment, Group, Post
+
+
+class IngestImageField(forms.ImageField):
+    """Отклоняет слишком большие файлы до декодирования и сохраняет
+    уменьшенную копию без метаданных."""
+
+    def to_python(self, data):
+        if isinstance(data, UploadedFile):
+            check_upload_size(data)
+        return super().to_python(data)
+
+    def clean(self, data, initial=None):
+        image = super().clean(data, initial)
+        if isinstance(image, UploadedFile):
+            return ingest_image(image)
+        return image
+
+
+class GroupAutocompleteWidget(forms.HiddenInput):
+    """Скрытое поле с id группы и строка поиска для js/group_autocomplete.js.
+
+    Варианты не перебираются: название выбранной группы берётся из кеша.
+    """
+
+    def render(self, name, value, attrs=None, renderer=None):
+        hidden = super().render(name, value, attrs, renderer)
+        try:
+            title = group_choices().get(int(value), ("", ""))[0]
+        except (TypeError, ValueError):
+            # Пусто или мусор из отправленной формы: ошибку покажет поле.
+            title = ""
+        return hidden + format_html(
+            '<input type="search" class="form-control" autocomplete="off" '
+            'list="{0}-options" value="{1}" data-group-autocomplete="{0}" '
+            'data-url="{2}" placeholder="Начните вводить название группы">'
+            '<datalist id="{0}-options"></datalist>',
+            self.build_attrs(self.attrs, attrs).get("id", name),
+            title,
+            reverse_lazy("posts:group_autocomplete"),
+        )
+
+
+class GroupChoiceField(forms.ModelChoiceField):
+    widget = GroupAutocompleteWidget
+
+    def __init__(self, queryset=None, **kwargs):
+        # Проверяется только выбранная группа, список целиком не грузится.
+        super().__init__(Group.objects.filter(is_deleted=False), **kwargs)
 
 
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         fields = ("text", "group", "image")
+        field_classes = {"image": IngestImageField, "group": GroupChoiceField}
         help_text = {
             "group": "Группа, к которой будет относиться пост",
             "text": "Текст нового поста",
@@ -13,6 +67,12 @@ class PostForm(forms.ModelForm):
 
 
 class CommentForm(forms.ModelForm):
+    # Комментарий, на который отвечают; пусто — новая ветка.
+    # Границы — диапазон pk в базе: больший номер не дойдёт до запроса.
+    parent = forms.IntegerField(
+        required=False, min_value=1, max_value=2**63 - 1, widget=forms.HiddenInput
+    )
+
     class Meta:
         model = Comment
         fields = ("text",)
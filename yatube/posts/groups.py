@@ -0,0 +1,92 @@
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Group
+
+VERSION_KEY = "groups:version"
+
+
+def invalidate_group_choices():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+def groups_version():
+    return cache.get_or_set(VERSION_KEY, 1, None)
+
+
+def group_choices(version=None):
+    """Словарь {pk: (title, slug)} всех групп, хранится в кеше до изменения
+    любой группы."""
+    version = version or groups_version()
+    key = f"groups:choices:{version}"
+    choices = cache.get(key)
+    if choices is None:
+        choices = {
+            pk: (title, slug)
+            for pk, title, slug in Group.objects.filter(is_deleted=False)
+            .order_by("title")
+            .values_list("pk", "title", "slug")
+        }
+        cache.set(key, choices, None)
+    return choices
+
+
+class GroupIndex:
+    """Отсортированный список (ключ, pk) для поиска групп по префиксу.
+
+    Ключи — slug, название целиком и каждое слово названия в нижнем
+    регистре. Индекс свой в каждом процессе и перестраивается, когда
+    в кеше меняется версия групп.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.entries = []
+        self.lock = threading.Lock()
+
+    def build(self, choices):
+        entries = set()
+        for pk, (title, slug) in choices.items():
+            title = title.lower()
+            entries.add((slug.lower(), pk))
+            entries.add((title, pk))
+            entries.update((word, pk) for word in title.split())
+        return sorted(entries)
+
+    def refresh(self):
+        version = groups_version()
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.entries = self.build(group_choices(version))
+                    self.version = version
+        return group_choices(version)
+
+    def search(self, prefix, limit=None):
+        limit = limit or settings.GROUP_AUTOCOMPLETE_LIMIT
+        choices = self.refresh()
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        entries = self.entries
+        found = []
+        position = bisect_left(entries, (prefix,))
+        while position < len(entries) and len(found) < limit:
+            key, pk = entries[position]
+            if not key.startswith(prefix):
+                break
+            if pk not in found and pk in choices:
+                found.append(pk)
+            position += 1
+        return [
+            {"id": pk, "title": choices[pk][0], "slug": choices[pk][1]} for pk in found
+        ]
+
+
+group_index = GroupIndex()
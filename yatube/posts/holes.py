@@ -0,0 +1,33 @@
+from core.page_cache import register_hole
+from django.template.loader import render_to_string
+
+from .forms import CommentForm
+from .profiles import profile_summary
+
+
+@register_hole("header")
+def header(request):
+    return render_to_string("includes/header_nav.html", request=request)
+
+
+@register_hole("switcher")
+def switcher(request):
+    return render_to_string("includes/switcher.html", request=request)
+
+
+@register_hole("comment_form")
+def comment_form(request, post_id):
+    if getattr(request, "anonymous_fast_path", False):
+        # Заглушка: форму подставит js/user_fragments.js, если нужно.
+        return '<div data-fragment="comment_form"></div>'
+    context = {"post_id": post_id, "form": CommentForm()}
+    return render_to_string("includes/comment_form.html", context, request)
+
+
+@register_hole("follow_button")
+def follow_button(request, username):
+    context = {"username": username, "can_follow": False, "following": False}
+    if request.user.is_authenticated and request.user.username != username:
+        context["can_follow"] = True
+        context["following"] = profile_summary(username, request.user).viewer_follows
+    return render_to_string("includes/follow_button.html", context, request)
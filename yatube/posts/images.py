@@ -0,0 +1,87 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from PIL import Image, ImageOps
+
+# Буфер для перекодированного файла: небольшие картинки остаются в памяти,
+# крупные уходят во временный файл.
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузку на диск по частям и перестаёт сохранять данные
+    после POST_IMAGE_MAX_BYTES. Реальный размер остаётся в file.size,
+    чтобы форма могла отклонить файл с понятной ошибкой."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received <= settings.POST_IMAGE_MAX_BYTES:
+            self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        upload = super().file_complete(file_size)
+        upload.size = self.received
+        return upload
+
+
+def check_upload_size(upload):
+    if upload.size > settings.POST_IMAGE_MAX_BYTES:
+        raise ValidationError(
+            "Файл слишком большой: максимум %(limit)s МБ.",
+            params={"limit": settings.POST_IMAGE_MAX_BYTES // (1024 * 1024)},
+        )
+
+
+def check_pixels(image):
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            "Изображение слишком большое: %(width)s×%(height)s точек.",
+            params={"width": width, "height": height},
+        )
+
+
+def has_alpha(image):
+    return image.mode in ("RGBA", "LA") or (
+        image.mode == "P" and "transparency" in image.info
+    )
+
+
+def ingest_image(upload):
+    """Проверяет размеры загруженной картинки по заголовку, уменьшает её
+    до POST_IMAGE_MAX_SIDE и перекодирует без метаданных (EXIF и т.п.).
+
+    Возвращает File, готовый к сохранению в ImageField."""
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    upload.seek(0)
+    with Image.open(upload) as source:
+        # Image.open читает только заголовок, пиксели ещё не декодированы.
+        check_pixels(source)
+        scale = min(1, max_side / max(source.size))
+        target = (round(source.width * scale), round(source.height * scale))
+        # Для JPEG декодер сразу уменьшает картинку в 2/4/8 раз.
+        source.draft("RGB", target)
+        image = ImageOps.exif_transpose(source)
+        image.thumbnail((max_side, max_side), Image.LANCZOS, reducing_gap=3.0)
+        if has_alpha(image):
+            image = image.convert("RGBA")
+            extension, options = "png", {"format": "PNG", "optimize": True}
+        else:
+            image = image.convert("RGB")
+            extension, options = "jpg", {
+                "format": "JPEG",
+                "quality": settings.POST_IMAGE_QUALITY,
+            }
+        output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        image.save(output, **options)
+    output.seek(0)
+    stem = os.path.splitext(os.path.basename(upload.name))[0] or "image"
+    return File(output, name=f"{stem}.{extension}")
@@ -0,0 +1,62 @@
+import html
+import re
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+from posts.sampledata import sample_data
+
+MORE_RE = re.compile(r'data-feed-more="([^"]+)"')
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает загрузку следующей порции ленты целой страницей "
+        "и фрагментом: размер ответа и время отрисовки."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def measure(self, client, url, repeat, cached):
+        timings = []
+        size = 0
+        for _ in range(repeat):
+            if not cached:
+                cache.clear()
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append(time.perf_counter() - started)
+            size = len(response.content)
+        return size, statistics.median(timings)
+
+    def handle(self, *args, **options):
+        with sample_data(authors=5, posts=200) as data:
+            client = Client()
+            user = data["users"][0]
+            feeds = (
+                ("index", reverse("posts:posts_index")),
+                ("group", reverse("posts:group_posts", args=[data["group"].slug])),
+                ("profile", reverse("posts:profile", args=[user.username])),
+            )
+            for label, url in feeds:
+                cache.clear()
+                page = client.get(url).content.decode()
+                fragment_url = html.unescape(MORE_RE.search(page)[1])
+                self.stdout.write(label)
+                for cached in (False, True):
+                    with override_settings(PAGE_CACHE_TIMEOUT=60 if cached else 0):
+                        page = self.measure(
+                            client, url + "?page=2", options["repeat"], cached
+                        )
+                        fragment = self.measure(
+                            client, fragment_url, options["repeat"], cached
+                        )
+                    self.stdout.write(
+                        f"  {'кеш' if cached else 'без кеша':<9}"
+                        f"страница {page[0]:6} байт {page[1] * 1000:6.2f} мс   "
+                        f"фрагмент {fragment[0]:6} байт {fragment[1] * 1000:6.2f} мс"
+                    )
@@ -0,0 +1,100 @@
+import json
+import os
+import sys
+import time
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image, ImageFilter
+from posts.images import ingest_image
+
+
+def make_photo(width, height):
+    """Синтетическое «фото»: плавный градиент с зерном, как у камеры."""
+    gradient = Image.radial_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 24).filter(ImageFilter.SMOOTH)
+    image = Image.merge("RGB", (gradient, noise, Image.blend(gradient, noise, 0.5)))
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", quality=95)
+    return buffer.getvalue()
+
+
+def store_original(upload):
+    """Прежнее поведение: проверка картинки и сохранение как есть."""
+    upload.seek(0)
+    with Image.open(upload) as image:
+        image.verify()
+    upload.seek(0)
+    return BytesIO(upload.read())
+
+
+def make_thumbnail(stored):
+    stored.seek(0)
+    with Image.open(stored) as image:
+        image.thumbnail((960, 960), Image.LANCZOS)
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает сохранение оригинала и обработку загрузки: скорость, объём, память."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--width", type=int, default=4000)
+        parser.add_argument("--height", type=int, default=3000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def run_variant(self, ingest, content, repeat):
+        ingest_time = thumbnail_time = 0.0
+        for _ in range(repeat):
+            upload = SimpleUploadedFile("photo.jpg", content, "image/jpeg")
+            started = time.perf_counter()
+            stored = ingest(upload)
+            ingest_time += time.perf_counter() - started
+            started = time.perf_counter()
+            make_thumbnail(stored)
+            thumbnail_time += time.perf_counter() - started
+        stored.seek(0, os.SEEK_END)
+        return ingest_time / repeat, thumbnail_time / repeat, stored.tell()
+
+    def measure(self, label, ingest, content, repeat):
+        # Каждый вариант в отдельном дочернем процессе, чтобы пиковый RSS
+        # одного не смешивался с другим.
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                os.close(read_fd)
+                result = self.run_variant(ingest, content, repeat)
+                os.write(write_fd, json.dumps(result).encode())
+            except BaseException:
+                code = 1
+                sys.excepthook(*sys.exc_info())
+            finally:
+                # Ни остаток замеров, ни завершение команды в дочернем
+                # процессе не выполняются.
+                os._exit(code)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            output = pipe.read()
+        _, status, usage = os.wait4(pid, 0)
+        if status != 0:
+            raise CommandError(f"Замер {label} завершился с ошибкой.")
+        ingest_time, thumbnail_time, size = json.loads(output)
+        self.stdout.write(
+            f"{label:>9}: {1 / ingest_time:7.2f} img/s "
+            f"({len(content) / 1024 / 1024 / ingest_time:6.1f} MB/s), "
+            f"миниатюра {thumbnail_time * 1000:6.1f} мс, "
+            f"файл {size / 1024:7.0f} KB, пик RSS {usage.ru_maxrss / 1024:6.1f} MB"
+        )
+
+    def handle(self, *args, **options):
+        content = make_photo(options["width"], options["height"])
+        self.stdout.write(
+            f"Исходник {options['width']}x{options['height']}, "
+            f"{len(content) / 1024 / 1024:.1f} MB, повторов: {options['repeat']}"
+        )
+        self.measure("original", store_original, content, options["repeat"])
+        self.measure("ingest", ingest_image, content, options["repeat"])
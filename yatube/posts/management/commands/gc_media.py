@@ -0,0 +1,76 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+from posts.models import ArchivedPost, MediaFile, Post
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+
+class Command(BaseCommand):
+    help = "Удаляет файлы картинок, на которые не ссылается ни один пост."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace",
+            type=int,
+            default=3600,
+            help="Не трогать файлы, счётчик которых менялся позже (секунды).",
+        )
+        parser.add_argument(
+            "--recount",
+            action="store_true",
+            help="Пересчитать счётчики ссылок по таблицам постов.",
+        )
+        parser.add_argument("--dry-run", action="store_true")
+
+    def recount(self):
+        refs = Counter()
+        for model in (Post, ArchivedPost):
+            refs.update(
+                dict(
+                    model.objects.exclude(image="")
+                    .values_list("image")
+                    .annotate(refs=Count("pk"))
+                    .order_by()
+                )
+            )
+        for media in MediaFile.objects.all():
+            media.refs = refs.pop(media.name, 0)
+            media.save(update_fields=["refs", "updated"])
+        MediaFile.objects.bulk_create(
+            [MediaFile(name=name, refs=count) for name, count in refs.items()]
+        )
+
+    def handle(self, *args, **options):
+        if options["recount"]:
+            self.recount()
+        storage = Post._meta.get_field("image").storage
+        deadline = timezone.now() - timedelta(seconds=options["grace"])
+        removed = 0
+        for media in MediaFile.objects.filter(refs__lte=0, updated__lt=deadline):
+            # Счётчик лишь подсказка: перед удалением проверяем таблицу.
+            refs = (
+                Post.objects.filter(image=media.name).count()
+                + ArchivedPost.objects.filter(image=media.name).count()
+            )
+            if refs:
+                media.refs = refs
+                media.save(update_fields=["refs", "updated"])
+                continue
+            if not options["dry_run"]:
+                # Условное удаление: если файл успели снова использовать,
+                # счётчик уже вырос и строка (и файл) остаются.
+                deleted, _ = MediaFile.objects.filter(
+                    pk=media.pk, refs__lte=0, updated__lt=deadline
+                ).delete()
+                if not deleted:
+                    continue
+                image_file = ImageFile(media.name, storage)
+                default.kvstore.delete(image_file)
+                storage.delete(media.name)
+            self.stdout.write(f"Удаляется {media.name}")
+            removed += 1
+        self.stdout.write(f"Удалено файлов: {removed}")
@@ -0,0 +1,70 @@
+import csv
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from posts.follows import batches, follow_batch
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Импортирует подписки из CSV со строками «подписчик,автор» (имена "
+        "пользователей) пачками; существующие подписки пропускаются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV-файл или - для stdin")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--delimiter", default=",")
+
+    def rows(self, source, delimiter):
+        for line, row in enumerate(csv.reader(source, delimiter=delimiter), 1):
+            if len(row) < 2:
+                raise CommandError(f"Строка {line}: нужны подписчик и автор.")
+            yield row[0].strip(), row[1].strip()
+
+    def import_rows(self, rows, batch_size):
+        seen = created = unknown = 0
+        started = time.perf_counter()
+        for batch in batches(rows, batch_size):
+            users = dict(
+                User.objects.filter(
+                    username__in={name for row in batch for name in row}
+                ).values_list("username", "pk")
+            )
+            pairs = [
+                (users[follower], users[author])
+                for follower, author in batch
+                if follower in users and author in users
+            ]
+            unknown += len(batch) - len(pairs)
+            created += follow_batch(pairs)
+            seen += len(batch)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"  строк {seen}, новых подписок {created}, "
+                f"{seen / elapsed:.0f} строк/с"
+            )
+        return seen, created, unknown, time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size должен быть положительным.")
+        if options["path"] == "-":
+            source = sys.stdin
+        else:
+            source = open(options["path"], newline="", encoding="utf-8")
+        try:
+            seen, created, unknown, elapsed = self.import_rows(
+                self.rows(source, options["delimiter"]), options["batch_size"]
+            )
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        self.stdout.write(
+            f"Готово: строк {seen}, новых подписок {created}, "
+            f"пропущено {seen - created - unknown}, "
+            f"неизвестных имён {unknown}; {elapsed:.2f} с, "
+            f"{seen / elapsed if elapsed else 0:.0f} строк/с"
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from posts.deletion import run_job
+from posts.models import DeletionJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет по частям скрытые группы, пользователей и посты. "
+        "Прерванную работу можно запустить снова: она продолжится."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def progress(self, job):
+        self.stdout.write(f"  {job}: удалено строк {job.deleted}")
+
+    def handle(self, *args, **options):
+        for job in DeletionJob.objects.filter(finished__isnull=True):
+            self.stdout.write(f"Удаление {job}")
+            run_job(job, options["chunk_size"], self.progress)
+            self.stdout.write(f"Готово {job}: всего удалено строк {job.deleted}")
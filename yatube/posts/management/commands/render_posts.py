@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from posts.models import ArchivedPost, Post
+from posts.text import render_text
+
+
+class Command(BaseCommand):
+    help = "Заполняет HTML и анонсы постов, сохранённых до их появления."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Пересчитать все посты, а не только незаполненные.",
+        )
+
+    def backfill(self, model, batch_size, everything):
+        queryset = model.objects.order_by("pk").only("pk", "text")
+        if not everything:
+            queryset = queryset.filter(text_html="")
+        done, last_pk = 0, 0
+        while True:
+            # Порции по возрастанию pk: прерванный запуск можно повторить.
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            for post in batch:
+                post.text_html, post.excerpt = render_text(post.text)
+            with transaction.atomic():
+                model.objects.bulk_update(batch, ["text_html", "excerpt"])
+            done += len(batch)
+            last_pk = batch[-1].pk
+            self.stdout.write(f"  {model._meta.model_name}: {done}")
+        return done
+
+    def handle(self, *args, **options):
+        for model in (Post, ArchivedPost):
+            done = self.backfill(model, options["batch_size"], options["all"])
+            self.stdout.write(f"{model._meta.verbose_name}: обновлено {done}")
@@ -0,0 +1,57 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:29
+
+import core.storage
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_existing_refs(apps, schema_editor):
+    Post = apps.get_model("posts", "Post")
+    MediaFile = apps.get_model("posts", "MediaFile")
+    images = (
+        Post.objects.exclude(image="")
+        .values("image")
+        .annotate(refs=Count("pk"))
+        .order_by()
+    )
+    MediaFile.objects.bulk_create(
+        [MediaFile(name=row["image"], refs=row["refs"]) for row in images]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0011_auto_20220128_1731"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MediaFile",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255, unique=True)),
+                ("refs", models.IntegerField(default=0)),
+                ("updated", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name="post",
+            name="image",
+            field=models.ImageField(
+                blank=True,
+                storage=core.storage.ContentAddressedStorage(),
+                upload_to="posts/",
+                verbose_name="Картинка",
+            ),
+        ),
+        migrations.RunPython(count_existing_refs, migrations.RunPython.noop),
+    ]
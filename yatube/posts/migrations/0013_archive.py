@@ -0,0 +1,82 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:42
+
+import core.storage
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("posts", "0012_mediafile"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedPost",
+            fields=[
+                ("id", models.IntegerField(primary_key=True, serialize=False)),
+                ("text", models.TextField(verbose_name="Текст поста")),
+                ("pub_date", models.DateTimeField(db_index=True)),
+                (
+                    "image",
+                    models.ImageField(
+                        blank=True,
+                        storage=core.storage.ContentAddressedStorage(),
+                        upload_to="posts/",
+                        verbose_name="Картинка",
+                    ),
+                ),
+                (
+                    "author",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="archived_posts",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "group",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_posts",
+                        to="posts.Group",
+                        verbose_name="Группа",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-pub_date"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedComment",
+            fields=[
+                ("id", models.IntegerField(primary_key=True, serialize=False)),
+                ("text", models.TextField(verbose_name="Текст комментария")),
+                ("created", models.DateTimeField()),
+                (
+                    "author",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_comments",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="comments",
+                        to="posts.ArchivedPost",
+                    ),
+                ),
+            ],
+        ),
+    ]
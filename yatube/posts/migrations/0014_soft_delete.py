@@ -0,0 +1,63 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0013_archive"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DeletionJob",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("group", "Группа"),
+                            ("user", "Пользователь"),
+                            ("post", "Пост"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("object_id", models.IntegerField()),
+                (
+                    "deleted",
+                    models.IntegerField(default=0, verbose_name="Удалено строк"),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("finished", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "ordering": ["created"],
+            },
+        ),
+        migrations.AddField(
+            model_name="archivedpost",
+            name="is_deleted",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="group",
+            name="is_deleted",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="is_deleted",
+            field=models.BooleanField(default=False),
+        ),
+    ]
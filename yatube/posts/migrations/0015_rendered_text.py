@@ -0,0 +1,33 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0014_soft_delete"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="archivedpost",
+            name="excerpt",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="archivedpost",
+            name="text_html",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="excerpt",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="text_html",
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 2.2.16 on 2026-10-19 11:14
+
+from django.db import migrations, models
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def path_segment(pk):
+    segment = ""
+    while pk:
+        pk, digit = divmod(pk, len(DIGITS))
+        segment = DIGITS[digit] + segment
+    return segment.rjust(8, "0")
+
+
+def fill_paths(apps, schema_editor):
+    # Существующие комментарии становятся ветками верхнего уровня.
+    for name in ("Comment", "ArchivedComment"):
+        model = apps.get_model("posts", name)
+        comments = list(model.objects.only("pk"))
+        for comment in comments:
+            comment.path = path_segment(comment.pk)
+        model.objects.bulk_update(comments, ["path"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0015_rendered_text"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="archivedcomment",
+            name="depth",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="archivedcomment",
+            name="path",
+            field=models.CharField(default="", editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="depth",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="path",
+            field=models.CharField(default="", editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name="archivedcomment",
+            index=models.Index(
+                fields=["post", "path"], name="archived_comment_thread_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["post", "path"], name="comment_thread_idx"),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-19 11:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0016_comment_threads"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="archivedpost",
+            name="views_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="views_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
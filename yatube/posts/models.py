@@ -1,23 +1,103 @@
+from core.storage import ContentAddressedStorage
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from posts.text import RenderedTextMixin
 from posts.validators import validate_not_empty
 
 User = get_user_model()
 
+# Путь комментария — номера (pk) его предков и его собственный в base36
+# фиксированной ширины: сортировка по пути даёт порядок обсуждения, а
+# ветка — это диапазон [path, path + PATH_END) в индексе (post, path).
+PATH_STEP = 8
+PATH_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+PATH_END = "~"
+# Ответ глубже этого уровня становится соседом своего родителя.
+MAX_COMMENT_DEPTH = 15
+
+
+def path_segment(pk):
+    segment = ""
+    while pk:
+        pk, digit = divmod(pk, len(PATH_DIGITS))
+        segment = PATH_DIGITS[digit] + segment
+    return segment.rjust(PATH_STEP, "0")
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    # Удалённая группа скрыта сразу, а строки удаляет process_deletions.
+    is_deleted = models.BooleanField(default=False)
 
     def __str__(self):
         return self.title
 
 
-class Post(models.Model):
+class CommentQuerySet(models.QuerySet):
+    def visible(self):
+        return self.filter(Q(author__isnull=True) | Q(author__is_active=True))
+
+    def threads(self):
+        """Комментарии верхнего уровня в порядке обсуждения."""
+        return self.filter(depth=0).order_by("path")
+
+    def subtree(self, start, end=None, max_depth=None):
+        """Ветки от пути start до пути end включительно одним запросом
+        по диапазону путей, в порядке обсуждения."""
+        queryset = self.filter(path__gte=start, path__lt=(end or start) + PATH_END)
+        if max_depth is not None:
+            queryset = queryset.filter(depth__lte=max_depth)
+        return queryset.order_by("path")
+
+
+class PostQuerySet(models.QuerySet):
+    def visible(self):
+        """Без удалённых постов, постов удалённых групп и отключённых авторов."""
+        return self.filter(
+            Q(group__isnull=True) | Q(group__is_deleted=False),
+            Q(author__isnull=True) | Q(author__is_active=True),
+            is_deleted=False,
+        )
+
+    def for_feed(self):
+        """Посты для карточек ленты: счётчик и последний комментарий
+        подтягиваются подзапросами, без запроса на каждую карточку."""
+        comment_model = self.model._meta.get_field("comments").related_model
+        comments = comment_model.objects.visible().filter(post=OuterRef("pk"))
+        comments_count = (
+            comments.order_by()
+            .values("post")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        latest = comments.order_by("-created", "-pk")
+        # id различает посты с одинаковым временем: на этом порядке
+        # держатся курсоры бесконечной ленты.
+        queryset = (
+            self.select_related("author", "group")
+            # Карточке хватает анонса, полный текст не читаем.
+            .defer("text", "text_html").order_by("-pub_date", "-pk")
+        )
+        return queryset.annotate(
+            comments_count=Coalesce(
+                Subquery(comments_count, output_field=IntegerField()), 0
+            ),
+            latest_comment_text=Subquery(latest.values("text")[:1]),
+            latest_comment_author=Subquery(latest.values("author__username")[:1]),
+        )
+
+
+class Post(RenderedTextMixin, models.Model):
     text = models.TextField(
         validators=[validate_not_empty], verbose_name="Текст поста", help_text=""
     )
+    # Заполняются при сохранении, чтобы шаблоны не обрабатывали текст.
+    text_html = models.TextField(blank=True, editable=False)
+    excerpt = models.TextField(blank=True, editable=False)
     pub_date = models.DateTimeField(auto_now_add=True)
     author = models.ForeignKey(
         User, related_name="posts", on_delete=models.SET_NULL, null=True
@@ -30,7 +110,17 @@ class Post(models.Model):
         verbose_name="Группа",
         help_text="",
     )
-    image = models.ImageField("Картинка", upload_to="posts/", blank=True)
+    image = models.ImageField(
+        "Картинка",
+        upload_to="posts/",
+        blank=True,
+        storage=ContentAddressedStorage(),
+    )
+    is_deleted = models.BooleanField(default=False)
+    # Пополняется пачками из posts.view_counts.
+    views_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ["-pub_date"]
@@ -54,6 +144,30 @@ class Comment(models.Model):
         validators=[validate_not_empty], verbose_name="Текст комментария", help_text=""
     )
     created = models.DateTimeField(auto_now_add=True)
+    path = models.CharField(max_length=255, default="", editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [models.Index(fields=["post", "path"], name="comment_thread_idx")]
+
+    def reply_to(self, parent):
+        """Делает несохранённый комментарий ответом на parent."""
+        depth = min(parent.depth + 1, MAX_COMMENT_DEPTH)
+        self.depth = depth
+        self.path = parent.path[: depth * PATH_STEP]
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        # Вставка и запись пути — одна транзакция: без неё сбой между ними
+        # оставил бы комментарий с путём родителя вместо своего.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                # pk известен только после вставки: дописываем свой сегмент.
+                self.path += path_segment(self.pk)
+                type(self).objects.filter(pk=self.pk).update(path=self.path)
 
 
 class Follow(models.Model):
@@ -71,3 +185,101 @@ class Follow(models.Model):
         constraints = [
             models.UniqueConstraint(fields=["user", "author"], name="unique_following")
         ]
+
+
+class MediaFile(models.Model):
+    """Счётчик ссылок постов на файл в хранилище по содержимому."""
+
+    name = models.CharField(max_length=255, unique=True)
+    refs = models.IntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+
+class ArchivedPost(RenderedTextMixin, models.Model):
+    """Старый пост, перенесённый из горячей таблицы командой archive_posts.
+
+    Сохраняет id исходного поста, поэтому ссылки на него продолжают работать.
+    """
+
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField(verbose_name="Текст поста")
+    text_html = models.TextField(blank=True, editable=False)
+    excerpt = models.TextField(blank=True, editable=False)
+    pub_date = models.DateTimeField(db_index=True)
+    author = models.ForeignKey(
+        User, related_name="archived_posts", on_delete=models.SET_NULL, null=True
+    )
+    group = models.ForeignKey(
+        Group,
+        related_name="archived_posts",
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        verbose_name="Группа",
+    )
+    image = models.ImageField(
+        "Картинка",
+        upload_to="posts/",
+        blank=True,
+        storage=ContentAddressedStorage(),
+    )
+    is_deleted = models.BooleanField(default=False)
+    # Пополняется пачками из posts.view_counts.
+    views_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        ordering = ["-pub_date"]
+
+    def __str__(self):
+        return self.text[:15]
+
+
+class ArchivedComment(models.Model):
+    id = models.IntegerField(primary_key=True)
+    post = models.ForeignKey(
+        ArchivedPost, related_name="comments", on_delete=models.CASCADE
+    )
+    author = models.ForeignKey(
+        User, related_name="archived_comments", on_delete=models.CASCADE, null=True
+    )
+    text = models.TextField(verbose_name="Текст комментария")
+    created = models.DateTimeField()
+    path = models.CharField(max_length=255, default="", editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["post", "path"], name="archived_comment_thread_idx")
+        ]
+
+
+class DeletionJob(models.Model):
+    """Отложенное удаление группы, пользователя или поста по частям."""
+
+    GROUP = "group"
+    USER = "user"
+    POST = "post"
+    KIND_CHOICES = (
+        (GROUP, "Группа"),
+        (USER, "Пользователь"),
+        (POST, "Пост"),
+    )
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.IntegerField()
+    deleted = models.IntegerField("Удалено строк", default=0)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created"]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.object_id}"
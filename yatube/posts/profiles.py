@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Exists, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.shortcuts import get_object_or_404
+
+from .models import ArchivedPost, Follow, Post, User
+
+
+def count_by(queryset, field):
+    counts = (
+        queryset.filter(**{field: OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def summary_queryset(viewer=None):
+    """Пользователи со счётчиками постов, подписчиков и подписок;
+    с viewer — ещё и признак, подписан ли он на пользователя."""
+    queryset = User.objects.filter(is_active=True).annotate(
+        posts_count=count_by(Post.objects.visible(), "author")
+        + count_by(ArchivedPost.objects.visible(), "author"),
+        followers_count=count_by(Follow.objects.all(), "author"),
+        following_count=count_by(Follow.objects.all(), "user"),
+    )
+    if viewer is not None and viewer.is_authenticated:
+        queryset = queryset.annotate(
+            viewer_follows=Exists(
+                Follow.objects.filter(user=viewer, author=OuterRef("pk"))
+            )
+        )
+    return queryset
+
+
+def summary_key(username):
+    return f"profile:summary:{username}"
+
+
+# Только то, что нужно шапке профиля: пароль, почта и прочее в общий кеш
+# не попадают.
+SUMMARY_FIELDS = ("username", "first_name", "last_name")
+SUMMARY_COUNTERS = ("posts_count", "followers_count", "following_count")
+
+
+def profile_summary(username, viewer=None):
+    """Автор со счётчиками для шапки профиля, одним запросом.
+
+    Кешируются по автору только имя и счётчики; из них собирается лёгкий
+    экземпляр User. Подписка зрителя в кеш не попадает: при попадании
+    она проверяется отдельным запросом.
+    """
+    key = summary_key(username)
+    summary = cache.get(key)
+    if summary is None:
+        author = get_object_or_404(
+            summary_queryset(viewer).only(*SUMMARY_FIELDS), username=username
+        )
+        viewer_follows = getattr(author, "viewer_follows", False)
+        summary = {
+            field: getattr(author, field)
+            for field in ("pk", *SUMMARY_FIELDS, *SUMMARY_COUNTERS)
+        }
+        cache.set(key, summary, settings.PROFILE_SUMMARY_TIMEOUT)
+    elif viewer is not None and viewer.is_authenticated and viewer.pk != summary["pk"]:
+        viewer_follows = Follow.objects.filter(
+            user=viewer, author_id=summary["pk"]
+        ).exists()
+    else:
+        viewer_follows = False
+    author = User(**{field: summary[field] for field in ("pk", *SUMMARY_FIELDS)})
+    author._state.adding = False
+    for counter in SUMMARY_COUNTERS:
+        setattr(author, counter, summary[counter])
+    author.viewer_follows = viewer_follows
+    return author
+
+
+def invalidate_profile_summaries(*user_ids):
+    usernames = User.objects.filter(pk__in=user_ids).values_list("username", flat=True)
+    cache.delete_many([summary_key(username) for username in usernames])
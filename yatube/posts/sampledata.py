@@ -0,0 +1,46 @@
+from contextlib import contextmanager
+
+from django.db import transaction
+
+from .models import Comment, Follow, Group, Post, User
+
+SAMPLE_TEXT = (
+    "Сегодня гулял по набережной и думал о том, как быстро меняется город. "
+    "Новые дома, новые люди, а река всё та же. Вечером зашёл в кофейню, "
+    "где когда-то писал первые посты сюда. https://example.com/notes\n"
+)
+
+
+@contextmanager
+def sample_data(authors=5, posts=100, comments=3):
+    """Наполняет базу данными для замеров и откатывает их на выходе."""
+    with transaction.atomic():
+        group = Group.objects.create(
+            title="Замеры", slug="bench-sample", description="Группа для замеров"
+        )
+        users = [
+            User.objects.create_user(
+                username=f"bench_author_{i}", first_name="Автор", last_name=str(i)
+            )
+            for i in range(authors)
+        ]
+        for user in users[1:]:
+            Follow.objects.create(user=users[0], author=user)
+        new_posts = [
+            Post(author=users[i % authors], group=group, text=SAMPLE_TEXT * (1 + i % 4))
+            for i in range(posts)
+        ]
+        # bulk_create не вызывает save(), HTML считаем сами.
+        for post in new_posts:
+            post.render_text()
+        Post.objects.bulk_create(new_posts)
+        created = list(Post.objects.filter(group=group).order_by("pk"))
+        Comment.objects.bulk_create(
+            Comment(post=post, author=users[j % authors], text=f"Комментарий {j}")
+            for post in created
+            for j in range(comments)
+        )
+        try:
+            yield {"group": group, "users": users, "posts": created}
+        finally:
+            transaction.set_rollback(True)
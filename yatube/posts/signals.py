@@ -0,0 +1,96 @@
+from core.page_cache import invalidate_pages
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import ArchivedPost, Comment, Follow, Group, MediaFile, Post, User
+from .groups import invalidate_group_choices
+from .profiles import invalidate_profile_summaries, summary_key
+
+
+def change_refs(name, delta):
+    if not name:
+        return
+    MediaFile.objects.get_or_create(name=name)
+    # update() не трогает auto_now: время последнего изменения счётчика
+    # нужно gc_media для отсрочки удаления.
+    MediaFile.objects.filter(name=name).update(
+        refs=F("refs") + delta, updated=timezone.now()
+    )
+
+
+def invalidate(func, *args):
+    """Сбрасывает кеш сразу и ещё раз после фиксации транзакции.
+
+    Между сбросом и COMMIT параллельный запрос может прочитать старые
+    данные и снова положить их в кеш; повторный сброс это убирает."""
+    func(*args)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: func(*args))
+
+
+def image_name(instance):
+    # Берём сырое значение, чтобы не грузить отложенное (defer) поле.
+    image = instance.__dict__.get("image")
+    return getattr(image, "name", image) or ""
+
+
+@receiver(post_init, sender=Post)
+def remember_image(sender, instance, **kwargs):
+    instance._saved_image = image_name(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_image_refs(sender, instance, created, **kwargs):
+    if "image" not in instance.__dict__:
+        return
+    saved = "" if created else instance._saved_image
+    current = image_name(instance)
+    if current != saved:
+        change_refs(current, 1)
+        change_refs(saved, -1)
+    instance._saved_image = current
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=ArchivedPost)
+def release_image(sender, instance, **kwargs):
+    # Архивная копия держит свою ссылку на файл (см. archive_batch).
+    change_refs(image_name(instance), -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Group)
+def invalidate_cached_pages(sender, **kwargs):
+    # Удаление не сбрасывает кеш: скрытие поста до физического удаления
+    # проходит через сохранение, а остальное истечёт по таймауту.
+    invalidate(invalidate_pages)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=ArchivedPost)
+def invalidate_author_summary(sender, instance, **kwargs):
+    invalidate(invalidate_profile_summaries, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_summaries(sender, instance, **kwargs):
+    invalidate(invalidate_profile_summaries, instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_summary(sender, instance, **kwargs):
+    # Например, пользователя отключили перед удалением.
+    invalidate(cache.delete, summary_key(instance.username))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_groups(sender, **kwargs):
+    invalidate(invalidate_group_choices)
@@ -0,0 +1,96 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..archive import TieredFeed, archived_count
+from ..models import ArchivedComment, ArchivedPost, Comment, Group, Post
+
+User = get_user_model()
+
+OLD_POSTS = 8
+NEW_POSTS = 7
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="HasNoName")
+        cls.group = Group.objects.create(
+            title="Тестовая группа", slug="test-slug", description="Описание"
+        )
+        now = timezone.now()
+        for number in range(OLD_POSTS + NEW_POSTS):
+            post = Post.objects.create(
+                author=cls.user, group=cls.group, text=f"Пост {number}"
+            )
+            age = timedelta(days=1000 - number if number < OLD_POSTS else number)
+            Post.objects.filter(pk=post.pk).update(pub_date=now - age)
+        cls.old_post = Post.objects.get(text="Пост 0")
+        Comment.objects.create(
+            post=cls.old_post, author=cls.user, text="Старый комментарий"
+        )
+
+    def setUp(self):
+        cache.clear()
+        call_command("archive_posts", stdout=StringIO())
+
+    def test_old_posts_moved_with_comments(self):
+        """Старые посты и их комментарии переезжают в архив с теми же id."""
+        self.assertEqual(Post.objects.count(), NEW_POSTS)
+        self.assertEqual(ArchivedPost.objects.count(), OLD_POSTS)
+        archived = ArchivedPost.objects.get(pk=self.old_post.pk)
+        self.assertEqual(archived.text, self.old_post.text)
+        self.assertEqual(archived.pub_date, self.old_post.pub_date)
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(ArchivedComment.objects.get().post_id, self.old_post.pk)
+
+    def test_feed_continues_into_archive(self):
+        """Пагинация ленты после горячих постов продолжается архивом."""
+        urls = (
+            reverse("posts:posts_index"),
+            reverse("posts:group_posts", kwargs={"slug": self.group.slug}),
+            reverse("posts:profile", kwargs={"username": self.user.username}),
+        )
+        # Новые посты в порядке создания, затем архив от новых к старым.
+        numbers = list(range(OLD_POSTS, OLD_POSTS + NEW_POSTS))
+        numbers += reversed(range(OLD_POSTS))
+        expected = [f"Пост {number}" for number in numbers]
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.client.get(url).context["page_obj"]
+                second = self.client.get(url + "?page=2").context["page_obj"]
+                self.assertEqual(first.paginator.count, OLD_POSTS + NEW_POSTS)
+                posts = list(first) + list(second)
+                self.assertEqual([post.text for post in posts], expected)
+
+    def test_hot_pages_do_not_touch_archive(self):
+        """Страница из горячих постов не читает архивную таблицу."""
+        archived = ArchivedPost.objects.for_feed()
+        archived_count(archived)
+        feed = TieredFeed(Post.objects.for_feed(), archived)
+        with CaptureQueriesContext(connection) as queries:
+            feed.count()
+            posts = feed[0:NEW_POSTS]
+        self.assertEqual(len(posts), NEW_POSTS)
+        for query in queries.captured_queries:
+            self.assertNotIn(ArchivedPost._meta.db_table, query["sql"])
+
+    def test_archived_post_detail(self):
+        """Архивный пост открывается по прежнему адресу без формы ответа."""
+        response = self.client.get(
+            reverse("posts:post_detail", kwargs={"post_id": self.old_post.pk})
+        )
+        self.assertEqual(response.context["post"].text, self.old_post.text)
+        self.assertTrue(response.context["archived"])
+        self.assertContains(response, "Старый комментарий")
+        self.assertNotContains(response, 'data-fragment="comment_form"')
+        self.assertContains(response, f"<span >{OLD_POSTS + NEW_POSTS}</span>")
@@ -0,0 +1,129 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import MAX_COMMENT_DEPTH, Comment, Post
+from ..threads import load_threads
+
+User = get_user_model()
+
+
+def reply(parent, text):
+    comment = Comment(post=parent.post, author=parent.author, text=text)
+    comment.reply_to(parent)
+    comment.save()
+    return comment
+
+
+class CommentThreadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="HasNoName")
+        cls.post = Post.objects.create(author=cls.user, text="Тестовый текст")
+        cls.other_post = Post.objects.create(author=cls.user, text="Другой пост")
+        # Ответы создаются вперемешку с новыми ветками: порядок обсуждения
+        # не должен зависеть от порядка вставки.
+        cls.first = Comment.objects.create(post=cls.post, author=cls.user, text="1")
+        cls.second = Comment.objects.create(post=cls.post, author=cls.user, text="2")
+        cls.first_reply = reply(cls.first, "1.1")
+        cls.second_reply = reply(cls.second, "2.1")
+        cls.nested = reply(cls.first_reply, "1.1.1")
+        cls.first_reply_two = reply(cls.first, "1.2")
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def texts(self, comments):
+        return [comment.text for comment in comments]
+
+    def test_thread_in_display_order_with_one_query(self):
+        """Ветки загружаются одним запросом по индексу в порядке обсуждения."""
+        comments = self.post.comments.visible()
+        with self.assertNumQueries(1):
+            loaded = load_threads(comments, [self.first, self.second], 5)
+        self.assertEqual(self.texts(loaded), ["1", "1.1", "1.1.1", "1.2", "2", "2.1"])
+        self.assertEqual([comment.level for comment in loaded], [0, 1, 2, 1, 0, 1])
+        self.assertEqual(
+            self.texts(load_threads(comments, [self.first_reply], 5)),
+            ["1.1", "1.1.1"],
+        )
+        self.assertIn("comment_thread_idx", comments.subtree(self.first.path).explain())
+
+    def test_depth_limits(self):
+        """Глубже предела ответ становится соседом, а на странице скрывается."""
+        comment = self.nested
+        for number in range(MAX_COMMENT_DEPTH + 2):
+            comment = reply(comment, f"глубже {number}")
+        self.assertEqual(comment.depth, MAX_COMMENT_DEPTH)
+        self.assertTrue(comment.path.startswith(self.first.path))
+        loaded = load_threads(self.post.comments.visible(), [self.first], 1)
+        self.assertEqual(self.texts(loaded), ["1", "1.1", "1.2"])
+        self.assertTrue(loaded[1].more_replies)
+        self.assertFalse(loaded[2].more_replies)
+
+    def test_replies_to_hidden_comment_not_shown(self):
+        """Ответы на скрытый комментарий не попадают в соседнюю ветку,
+        а отвечать на скрытый комментарий нельзя."""
+        hidden_author = User.objects.create_user(username="Hidden", is_active=False)
+        hidden = Comment.objects.create(
+            post=self.post, author=hidden_author, text="скрыт"
+        )
+        answer = Comment(post=self.post, author=self.user, text="ответ скрытому")
+        answer.reply_to(hidden)
+        answer.save()
+        last = Comment.objects.create(post=self.post, author=self.user, text="3")
+        comments = self.post.comments.visible()
+        self.assertEqual(
+            self.texts(load_threads(comments, [self.second, last], 5)),
+            ["2", "2.1", "3"],
+        )
+        count = Comment.objects.count()
+        url = reverse("posts:add_comment", kwargs={"post_id": self.post.pk})
+        response = self.client.post(url, {"text": "Ответ", "parent": hidden.pk})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(Comment.objects.count(), count)
+
+    @override_settings(COMMENTS_PER_PAGE=1, COMMENT_DISPLAY_DEPTH=1)
+    def test_post_detail_paginates_threads(self):
+        """Страница поста листает ветки верхнего уровня."""
+        url = reverse("posts:post_detail", kwargs={"post_id": self.post.pk})
+        response = self.client.get(url)
+        self.assertEqual(self.texts(response.context["comments"]), ["1", "1.1", "1.2"])
+        self.assertEqual(response.context["comments_page"].paginator.num_pages, 2)
+        self.assertContains(
+            response,
+            reverse("posts:comment_thread", args=[self.post.pk, self.first_reply.pk]),
+        )
+        response = self.client.get(url + "?page=2")
+        self.assertEqual(self.texts(response.context["comments"]), ["2", "2.1"])
+
+    def test_reply_via_form(self):
+        """Ответ сохраняется в ветке родителя и ведёт на страницу ветки."""
+        url = reverse("posts:add_comment", kwargs={"post_id": self.post.pk})
+        response = self.client.post(url, {"text": "Ответ", "parent": self.second.pk})
+        thread_url = reverse(
+            "posts:comment_thread", args=[self.post.pk, self.second.pk]
+        )
+        self.assertRedirects(response, thread_url)
+        comment = Comment.objects.latest("pk")
+        self.assertEqual(comment.depth, 1)
+        self.assertEqual(comment.path[:8], self.second.path)
+        response = self.client.get(thread_url)
+        self.assertEqual(
+            self.texts(response.context["comments"]), ["2", "2.1", "Ответ"]
+        )
+        self.assertEqual(response.context["form"]["parent"].value(), self.second.pk)
+        # Ответить на комментарий к другому посту нельзя.
+        url = reverse("posts:add_comment", kwargs={"post_id": self.other_post.pk})
+        response = self.client.post(url, {"text": "Ответ", "parent": self.second.pk})
+        self.assertEqual(response.status_code, 404)
+        # Номер вне диапазона pk — неверная форма, а не ошибка сервера.
+        count = Comment.objects.count()
+        for parent in ("99999999999999999999999999", "0", "abc"):
+            response = self.client.post(url, {"text": "Ответ", "parent": parent})
+            self.assertEqual(response.status_code, 302)
+        self.assertEqual(Comment.objects.count(), count)
@@ -0,0 +1,153 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..deletion import run_job, schedule_deletion
+from ..models import Comment, DeletionJob, Follow, Group, Post
+
+User = get_user_model()
+
+GROUP_POSTS = 5
+
+
+class ScheduledDeletionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="HasNoName")
+        cls.spammer = User.objects.create_user(username="Spammer")
+        cls.group = Group.objects.create(
+            title="Тестовая группа", slug="test-slug", description="Описание"
+        )
+        cls.posts = [
+            Post.objects.create(author=cls.user, group=cls.group, text=f"Пост {i}")
+            for i in range(GROUP_POSTS)
+        ]
+        cls.own_post = Post.objects.create(author=cls.user, text="Без группы")
+        cls.spam_post = Post.objects.create(author=cls.spammer, text="Спам")
+        Comment.objects.create(post=cls.posts[0], author=cls.user, text="Коммент")
+        Comment.objects.create(post=cls.own_post, author=cls.spammer, text="Реклама")
+        Follow.objects.create(user=cls.spammer, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_deleted_group_hidden_at_once(self):
+        """Удалённая группа и её посты сразу пропадают со страниц."""
+        schedule_deletion(self.group)
+        response = self.client.get(reverse("posts:posts_index"))
+        self.assertEqual(
+            [post.text for post in response.context["page_obj"]],
+            [self.spam_post.text, self.own_post.text],
+        )
+        response = self.client.get(
+            reverse("posts:group_posts", kwargs={"slug": self.group.slug})
+        )
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(
+            reverse("posts:post_detail", kwargs={"post_id": self.posts[0].pk})
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(Post.objects.filter(group=self.group).count(), GROUP_POSTS)
+
+    def test_group_removed_in_chunks(self):
+        """Команда удаляет группу частями и пишет прогресс."""
+        job = schedule_deletion(self.group)
+        out = StringIO()
+        call_command("process_deletions", chunk_size=2, stdout=out)
+        job.refresh_from_db()
+        self.assertIsNotNone(job.finished)
+        self.assertFalse(Group.objects.exists())
+        self.assertFalse(Post.objects.filter(pk__in=[p.pk for p in self.posts]))
+        self.assertEqual(Post.objects.count(), 2)
+        # Комментарий, три порции постов и группа.
+        self.assertEqual(out.getvalue().count(": удалено строк"), 5)
+        self.assertEqual(job.deleted, 1 + GROUP_POSTS + 1)
+
+    def test_interrupted_job_resumes(self):
+        """Прерванное удаление продолжается с места остановки."""
+        job = schedule_deletion(self.group)
+
+        def crash(job):
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            run_job(job, chunk_size=2, progress=crash)
+        job.refresh_from_db()
+        self.assertEqual(job.deleted, 1)
+        self.assertIsNone(job.finished)
+        call_command("process_deletions", chunk_size=2, stdout=StringIO())
+        job.refresh_from_db()
+        self.assertIsNotNone(job.finished)
+        self.assertEqual(job.deleted, 1 + GROUP_POSTS + 1)
+        self.assertFalse(Group.objects.exists())
+
+    def test_deleted_user_hidden_then_removed(self):
+        """Удалённый пользователь скрыт сразу и удаляется вместе с записями."""
+        schedule_deletion(self.spammer)
+        response = self.client.get(
+            reverse("posts:profile", kwargs={"username": self.spammer.username})
+        )
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(
+            reverse("posts:post_detail", kwargs={"post_id": self.own_post.pk})
+        )
+        self.assertNotContains(response, "Реклама")
+        call_command("process_deletions", stdout=StringIO())
+        self.assertFalse(User.objects.filter(pk=self.spammer.pk).exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(Comment.objects.get().text, "Коммент")
+        self.assertEqual(Post.objects.count(), GROUP_POSTS + 1)
+
+    def test_admin_delete_is_scheduled(self):
+        """Удаление в админке только скрывает объект и ставит задачу."""
+        admin = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        client = Client()
+        client.force_login(admin)
+        client.post(
+            reverse("admin:posts_group_delete", args=[self.group.pk]),
+            {"post": "yes"},
+        )
+        self.group.refresh_from_db()
+        self.assertTrue(self.group.is_deleted)
+        self.assertTrue(
+            DeletionJob.objects.filter(
+                kind=DeletionJob.GROUP, object_id=self.group.pk, finished=None
+            ).exists()
+        )
+
+    def test_admin_delete_needs_cascade_permissions(self):
+        """Без прав на удаление постов группу из админки не удалить."""
+        staff = User.objects.create_user("staff", is_staff=True)
+        staff.user_permissions.add(
+            *Permission.objects.filter(
+                content_type__app_label="posts",
+                codename__in=["delete_group", "view_group"],
+            )
+        )
+        client = Client()
+        client.force_login(staff)
+        response = client.post(
+            reverse("admin:posts_group_delete", args=[self.group.pk]),
+            {"post": "yes"},
+        )
+        self.assertEqual(response.status_code, 403)
+        self.group.refresh_from_db()
+        self.assertFalse(self.group.is_deleted)
+
+    def test_hidden_post_not_editable_or_commentable(self):
+        """Пост в очереди на удаление нельзя править и комментировать."""
+        schedule_deletion(self.own_post)
+        client = Client()
+        client.force_login(self.user)
+        for name in ("posts:post_edit", "posts:add_comment"):
+            response = client.post(
+                reverse(name, kwargs={"post_id": self.own_post.pk}),
+                {"text": "Ещё текст"},
+            )
+            self.assertEqual(response.status_code, 404)
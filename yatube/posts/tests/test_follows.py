@@ -0,0 +1,109 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..follows import bulk_follow, follow_authors
+from ..models import Follow
+from ..profiles import profile_summary
+
+User = get_user_model()
+
+
+class BulkFollowTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username="reader")
+        cls.authors = [
+            User.objects.create_user(username=f"author{number}") for number in range(5)
+        ]
+        cls.inactive = User.objects.create_user(username="inactive", is_active=False)
+        Follow.objects.create(user=cls.reader, author=cls.authors[0])
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_bulk_follow_skips_existing_self_and_inactive(self):
+        """Существующие подписки, на себя и на отключённых не создаются."""
+        author_ids = [author.pk for author in self.authors]
+        pairs = [(self.reader.pk, author_id) for author_id in author_ids * 2]
+        pairs += [(self.reader.pk, self.reader.pk), (self.reader.pk, self.inactive.pk)]
+        with self.assertNumQueries(17):
+            seen, created = bulk_follow(pairs, batch_size=2)
+        self.assertEqual((seen, created), (12, 4))
+        self.assertEqual(
+            set(
+                Follow.objects.filter(user=self.reader).values_list(
+                    "author_id", flat=True
+                )
+            ),
+            set(author_ids),
+        )
+
+    def test_no_follow_for_inactive(self):
+        """На отключённого автора нельзя подписаться по ссылке профиля."""
+        for view in ("profile_follow", "profile_unfollow"):
+            url = reverse(f"posts:{view}", args=[self.inactive.username])
+            self.assertEqual(self.reader_client.get(url).status_code, 404)
+        self.assertFalse(Follow.objects.filter(author=self.inactive).exists())
+
+    def test_cached_summaries_invalidated(self):
+        """Пачка сбрасывает шапки профилей подписчика и авторов."""
+        self.assertEqual(profile_summary(self.authors[1].username).followers_count, 0)
+        self.assertEqual(profile_summary(self.reader.username).following_count, 1)
+        follow_authors(self.reader, [self.authors[1].pk, self.authors[2].pk])
+        self.assertEqual(profile_summary(self.authors[1].username).followers_count, 1)
+        self.assertEqual(profile_summary(self.reader.username).following_count, 3)
+
+    def test_follow_bulk_api(self):
+        """API подписывает на список авторов и называет неизвестные имена."""
+        url = reverse("posts:follow_bulk")
+        response = self.reader_client.post(
+            url,
+            json.dumps({"authors": ["author1", "author2", "author0", "nobody"]}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.json(), {"followed": 2, "unknown": ["nobody"]})
+        response = self.reader_client.post(url, {"authors": ["author3"]})
+        self.assertEqual(response.json()["followed"], 1)
+        self.assertEqual(Follow.objects.filter(user=self.reader).count(), 4)
+        self.assertEqual(self.reader_client.get(url).status_code, 405)
+        self.assertEqual(
+            self.reader_client.post(
+                url, '{"authors": "author4"}', content_type="application/json"
+            ).status_code,
+            400,
+        )
+        with override_settings(FOLLOW_BULK_MAX=1):
+            response = self.reader_client.post(url, {"authors": ["a", "b"]})
+        self.assertEqual(response.status_code, 400)
+
+    def test_import_follows_command(self):
+        """Команда импортирует CSV пачками и сообщает скорость."""
+        handle, path = tempfile.mkstemp(suffix=".csv", dir=settings.BASE_DIR)
+        with os.fdopen(handle, "w") as csv_file:
+            csv_file.write(
+                "reader,author0\nreader,author1\nauthor1,author2\n"
+                "reader,nobody\nauthor2,author1\n"
+            )
+        output = StringIO()
+        try:
+            call_command("import_follows", path, batch_size=2, stdout=output)
+        finally:
+            os.remove(path)
+        self.assertEqual(Follow.objects.count(), 4)
+        self.assertIn(
+            "строк 5, новых подписок 3, пропущено 1, неизвестных имён 1",
+            output.getvalue(),
+        )
+        self.assertIn("строк/с", output.getvalue())
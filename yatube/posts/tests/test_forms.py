@@ -1,11 +1,14 @@
 import shutil
 import tempfile
+from io import BytesIO
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 from posts.models import Comment, Group, Post
 
 User = get_user_model()
@@ -61,6 +64,16 @@ class PostFormTests(TestCase):
         # Проверяем, что создалась запись
         self.assertEqual(Post.objects.order_by("-pk")[0].text, form_data["text"])
 
+    def test_create_post_with_bad_group(self):
+        """Нечисловая группа возвращает форму с ошибкой, а не 500."""
+        post_count = Post.objects.count()
+        response = self.auth_client.post(
+            reverse("posts:post_create"), data={"text": "Текст", "group": "abc"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["form"].errors["group"])
+        self.assertEqual(Post.objects.count(), post_count)
+
     def test_create_post_with_img(self):
         """Валидная форма создает запись в Post c img"""
         # Создаем пост c img
@@ -273,6 +286,7 @@ class PostFormTests(TestCase):
         # Проверяем, что создался комментарий
         last_comment = Comment.objects.order_by("-pk")[0]
         self.assertEqual(last_comment.text, form_data["text"])
+        cache.clear()
         response = self.auth_client.get(
             reverse("posts:post_detail", kwargs={"post_id": post_new.pk}),
         )
@@ -295,3 +309,73 @@ class PostFormTests(TestCase):
             follow=True,
         )
         self.assertEqual(Comment.objects.count(), comments_count)
+
+
+def make_jpeg(size, exif=True):
+    """JPEG со случайным шумом и EXIF-тегами камеры."""
+    image = Image.effect_noise(size, 64).convert("RGB")
+    options = {}
+    if exif:
+        tags = Image.Exif()
+        tags[0x010F] = "Yatube Camera"
+        options["exif"] = tags.tobytes()
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", **options)
+    return buffer.getvalue()
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    POST_IMAGE_MAX_SIDE=100,
+    POST_IMAGE_MAX_PIXELS=500 * 500,
+    POST_IMAGE_MAX_BYTES=200 * 1024,
+)
+class PostImageIngestTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="HasNoName")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.auth_client = Client()
+        self.auth_client.force_login(self.user)
+
+    def upload(self, content, name="photo.jpg"):
+        uploaded = SimpleUploadedFile(
+            name=name, content=content, content_type="image/jpeg"
+        )
+        return self.auth_client.post(
+            reverse("posts:post_create"),
+            data={"text": "Пост с фото", "image": uploaded},
+        )
+
+    def test_image_downscaled_without_metadata(self):
+        """Картинка уменьшается и сохраняется без EXIF."""
+        response = self.upload(make_jpeg((400, 300)))
+        self.assertEqual(response.status_code, 302)
+        post = Post.objects.get(text="Пост с фото")
+        self.assertTrue(post.image.name.endswith(".jpg"))
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.size, (100, 75))
+            self.assertEqual(len(stored.getexif()), 0)
+
+    def test_too_many_pixels_rejected(self):
+        """Картинка больше лимита по точкам не сохраняется."""
+        response = self.upload(make_jpeg((600, 500), exif=False))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["form"].errors["image"])
+        self.assertFalse(Post.objects.filter(text="Пост с фото").exists())
+
+    def test_too_many_bytes_rejected(self):
+        """Файл больше лимита по размеру отклоняется до декодирования."""
+        response = self.upload(b"\xff\xd8" + b"0" * 300 * 1024)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            "Файл слишком большой", response.context["form"].errors["image"][0]
+        )
+        self.assertFalse(Post.objects.filter(text="Пост с фото").exists())
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from core.views import serve_media
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from ..archive import archive_posts
+from ..models import ArchivedPost, MediaFile, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x02\x00"
+    b"\x01\x00\x80\x00\x00\x00\x00\x00"
+    b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+    b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+    b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+    b"\x0A\x00\x3B"
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedMediaTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="HasNoName")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, name="small.gif"):
+        return Post.objects.create(
+            author=self.user,
+            text="Текст",
+            image=SimpleUploadedFile(name, SMALL_GIF, content_type="image/gif"),
+        )
+
+    def test_same_content_stored_once(self):
+        """Одинаковые картинки хранятся одним файлом с именем-хешем."""
+        first = self.create_post("first.gif")
+        second = self.create_post("second.GIF")
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r"^posts/\w\w/\w\w/[0-9a-f]{64}\.gif$")
+        directory = os.path.dirname(first.image.path)
+        self.assertEqual(os.listdir(directory), [os.path.basename(first.image.path)])
+        self.assertEqual(MediaFile.objects.get(name=first.image.name).refs, 2)
+
+    def test_unreferenced_file_collected(self):
+        """Файл без ссылок удаляется сборщиком, а используемый остаётся."""
+        first = self.create_post()
+        second = self.create_post()
+        name, path = first.image.name, first.image.path
+        first.delete()
+        call_command("gc_media", grace=-1, stdout=StringIO())
+        self.assertTrue(os.path.exists(path))
+        second.image = ""
+        second.save()
+        self.assertEqual(MediaFile.objects.get(name=name).refs, 0)
+        call_command("gc_media", grace=-1, stdout=StringIO())
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(MediaFile.objects.filter(name=name).exists())
+
+    def test_recently_released_file_kept(self):
+        """Недавно освобождённый файл переживает сборку до конца отсрочки."""
+        post = self.create_post()
+        name, path = post.image.name, post.image.path
+        MediaFile.objects.filter(name=name).update(
+            updated=timezone.now() - timedelta(hours=2)
+        )
+        post.delete()
+        call_command("gc_media", grace=3600, stdout=StringIO())
+        self.assertTrue(os.path.exists(path))
+        self.assertTrue(MediaFile.objects.filter(name=name).exists())
+        MediaFile.objects.filter(name=name).update(
+            updated=timezone.now() - timedelta(hours=2)
+        )
+        call_command("gc_media", grace=3600, stdout=StringIO())
+        self.assertFalse(os.path.exists(path))
+
+    def test_archived_post_releases_image(self):
+        """Архивная копия держит ссылку на файл и отпускает её при удалении."""
+        post = self.create_post()
+        name = post.image.name
+        archive_posts(timezone.now() + timedelta(days=1))
+        self.assertEqual(MediaFile.objects.get(name=name).refs, 1)
+        ArchivedPost.objects.get(pk=post.pk).delete()
+        self.assertEqual(MediaFile.objects.get(name=name).refs, 0)
+
+    def test_immutable_media_cache_headers(self):
+        """Файлы с именем-хешем отдаются с годовым кешированием."""
+        post = self.create_post()
+        request = RequestFactory().get("/media/" + post.image.name)
+        response = serve_media(request, post.image.name)
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=31536000", response["Cache-Control"])
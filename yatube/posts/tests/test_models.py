@@ -1,5 +1,10 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from ..models import Group, Post
 
@@ -31,3 +36,52 @@ class PostModelTest(TestCase):
         group = PostModelTest.group
         expected_object_name_group = group.title
         self.assertEqual(expected_object_name_group, str(group))
+
+
+class RenderedTextTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+
+    def test_text_rendered_on_save(self):
+        """HTML и анонс считаются при сохранении поста."""
+        post = Post.objects.create(
+            author=self.user,
+            text="Первая <строка>\nсм. https://example.com\n\n" + "слово " * 40,
+        )
+        self.assertIn("<p>Первая &lt;строка&gt;<br>", post.text_html)
+        self.assertIn('<a href="https://example.com" rel="nofollow">', post.text_html)
+        self.assertTrue(post.excerpt.startswith("Первая <строка> см."))
+        self.assertTrue(post.excerpt.endswith("…"))
+        post.text = "Новый текст"
+        post.save(update_fields=["text"])
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, "<p>Новый текст</p>")
+        self.assertEqual(post.excerpt, "Новый текст")
+
+    def test_partial_save_skips_rendering(self):
+        """Сохранение без text не рендерит и не подгружает текст."""
+        post = Post.objects.create(author=self.user, text="Текст")
+        post = Post.objects.defer("text", "text_html").get(pk=post.pk)
+        with CaptureQueriesContext(connection) as queries:
+            post.save(update_fields=["is_deleted"])
+        selects = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith("SELECT") and '"posts_post"' in query["sql"]
+        ]
+        self.assertEqual(selects, [])
+
+    def test_backfill_command(self):
+        """Команда заполняет HTML постов, сохранённых без него."""
+        posts = [
+            Post.objects.create(author=self.user, text=f"Текст {number}")
+            for number in range(5)
+        ]
+        Post.objects.update(text_html="", excerpt="")
+        call_command("render_posts", batch_size=2, stdout=StringIO())
+        for post in posts:
+            post.refresh_from_db()
+            self.assertEqual(post.text_html, f"<p>{post.text}</p>")
+            self.assertEqual(post.excerpt, post.text)
@@ -0,0 +1,100 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import view_counts
+from ..models import ArchivedPost, Post
+
+User = get_user_model()
+
+
+@override_settings(VIEW_COUNT_FLUSH_INTERVAL=3600, VIEW_COUNT_FLUSH_MAX=1000)
+class ViewCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Просмотры, накопленные другими тестами, к этим постам не относятся.
+        view_counts.flush()
+        cls.user = User.objects.create_user(username="HasNoName")
+        cls.post = Post.objects.create(author=cls.user, text="Тестовый текст")
+        cls.other = Post.objects.create(author=cls.user, text="Другой пост")
+        cls.archived = ArchivedPost.objects.create(
+            id=cls.other.pk + 1,
+            author=cls.user,
+            text="Архив",
+            pub_date=cls.post.pub_date,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        view_counts.flush()
+
+    def views(self, post):
+        post.refresh_from_db()
+        return post.views_count
+
+    def test_page_cache_hits_counted(self):
+        """Просмотры из кеша страниц тоже считаются, но пишутся пачкой."""
+        url = reverse("posts:post_detail", kwargs={"post_id": self.post.pk})
+        self.client.get(url)
+        self.client.get(url)
+        self.client.get(url, HTTP_X_WARMUP="1")
+        self.client.get(reverse("posts:post_detail", kwargs={"post_id": 999}))
+        self.assertEqual(self.views(self.post), 0)
+        self.assertEqual(view_counts.flush(), 1)
+        self.assertEqual(self.views(self.post), 2)
+
+    def test_flush_is_one_update_per_table(self):
+        """Просмотры разных постов и архива пишутся одним UPDATE на таблицу."""
+        for post_id in (self.post.pk, self.other.pk, self.other.pk, self.archived.pk):
+            view_counts.record(post_id)
+        with self.assertNumQueries(2):
+            self.assertEqual(view_counts.flush(), 3)
+        self.assertEqual(self.views(self.post), 1)
+        self.assertEqual(self.views(self.other), 2)
+        self.assertEqual(self.views(self.archived), 1)
+        with self.assertNumQueries(0):
+            view_counts.flush()
+
+    @override_settings(VIEW_COUNT_FLUSH_MAX=3)
+    def test_flushed_when_batch_full(self):
+        """Полная пачка пишется сразу, а счётчик виден в ленте."""
+        for _ in range(3):
+            view_counts.record(self.post.pk)
+        self.assertEqual(self.views(self.post), 3)
+        self.assertContains(
+            self.client.get(reverse("posts:posts_index")), "просмотров: 3"
+        )
+
+    @override_settings(VIEW_COUNT_FLUSH_INTERVAL=0)
+    def test_request_flushes_only_full_batch(self):
+        """По времени пачку пишет не запрос посетителя, а фоновый поток."""
+        view_counts.record(self.post.pk)
+        view_counts.record(self.post.pk)
+        self.assertEqual(self.views(self.post), 0)
+
+    @override_settings(VIEW_COUNT_FLUSH_INTERVAL=0.01)
+    def test_flusher_thread_per_process(self):
+        """Фоновый поток запускается один раз на процесс и пишет пачки."""
+        flushed = threading.Event()
+        with mock.patch.object(view_counts, "_periodic", True), mock.patch.object(
+            view_counts, "flush", side_effect=flushed.set
+        ):
+            view_counts.record(self.post.pk)
+            view_counts.record(self.post.pk)
+            threads = [
+                thread
+                for thread in threading.enumerate()
+                if thread.name == "view-counts-flush"
+            ]
+            self.assertEqual(len(threads), 1)
+            self.assertTrue(flushed.wait(5))
+            view_counts.stop_flusher()
+            threads[0].join(5)
+        self.assertFalse(threads[0].is_alive())
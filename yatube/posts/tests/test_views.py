@@ -6,10 +6,14 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.db import connection, transaction
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Follow, Group, Post
+from ..models import Comment, Follow, Group, Post
+from ..groups import group_index
+from ..profiles import profile_summary, summary_key
 
 User = get_user_model()
 
@@ -445,3 +449,268 @@ class PostPagesTests(TestCase):
         response_new_user = new_client.get(reverse("posts:follow_index"))
         self.assertIn(new_post, response_new_user.context["page_obj"].object_list)
         self.assertNotIn(new_post, response.context["page_obj"].object_list)
+
+
+class FeedQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test_group",
+            description="Тестовое описание группы",
+        )
+        cls.author = User.objects.create_user(username="Author")
+        cls.reader = User.objects.create_user(username="Reader")
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(12):
+            post = Post.objects.create(
+                author=cls.author, text=f"Тестовый текст {i}", group=cls.group
+            )
+            for j in range(3):
+                Comment.objects.create(
+                    post=post, author=cls.reader, text=f"Комментарий {i}-{j}"
+                )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def count_queries(self, url, per_page):
+        cache.clear()
+        with self.settings(PER_PAGE_COUNT=per_page):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.reader_client.get(url)
+        self.assertEqual(len(response.context["page_obj"]), per_page)
+        return len(queries)
+
+    def test_feed_query_count_does_not_depend_on_page_size(self):
+        """Число запросов ленты не зависит от количества карточек."""
+        urls = (
+            reverse("posts:posts_index"),
+            reverse("posts:group_posts", kwargs={"slug": self.group.slug}),
+            reverse("posts:profile", kwargs={"username": self.author.username}),
+            reverse("posts:follow_index"),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.count_queries(url, 2), self.count_queries(url, 10)
+                )
+
+    def test_feed_card_shows_comment_info(self):
+        """Карточка ленты показывает число и последний комментарий."""
+        post = Post.objects.for_feed().get(text="Тестовый текст 11")
+        self.assertEqual(post.comments_count, 3)
+        self.assertEqual(post.latest_comment_text, "Комментарий 11-2")
+        self.assertEqual(post.latest_comment_author, self.reader.username)
+        cache.clear()
+        response = self.client.get(reverse("posts:posts_index"))
+        self.assertContains(response, "Комментариев: 3")
+        self.assertContains(response, "Комментарий 11-2")
+
+
+class ProfileSummaryTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.other = User.objects.create_user(username="other")
+        for number in range(3):
+            Post.objects.create(author=cls.author, text=f"Тестовый текст {number}")
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.author, author=cls.other)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_summary_in_one_query(self):
+        """Автор, счётчики и подписка зрителя приходят одним запросом."""
+        with self.assertNumQueries(1):
+            author = profile_summary(self.author.username, self.reader)
+        self.assertEqual(author, self.author)
+        self.assertEqual(author.posts_count, 3)
+        self.assertEqual(author.followers_count, 1)
+        self.assertEqual(author.following_count, 1)
+        self.assertTrue(author.viewer_follows)
+        with self.assertNumQueries(0):
+            cached = profile_summary(self.author.username)
+        self.assertEqual(cached.posts_count, 3)
+        self.assertEqual(cached.get_full_name(), self.author.get_full_name())
+        # В общий кеш не попадают пароль, почта и прочие поля пользователя.
+        self.assertEqual(
+            set(cache.get(summary_key(self.author.username))),
+            {"pk", "username", "first_name", "last_name"}
+            | {"posts_count", "followers_count", "following_count"},
+        )
+        self.assertFalse(cached.viewer_follows)
+        with self.assertNumQueries(1):
+            self.assertFalse(
+                profile_summary(self.author.username, self.other).viewer_follows
+            )
+
+    def test_summary_invalidated_on_writes(self):
+        """Новый пост и подписка сбрасывают закешированные счётчики."""
+        profile_summary(self.author.username)
+        Post.objects.create(author=self.author, text="Ещё пост")
+        Follow.objects.create(user=self.other, author=self.author)
+        author = profile_summary(self.author.username)
+        self.assertEqual(author.posts_count, 4)
+        self.assertEqual(author.followers_count, 2)
+        Follow.objects.filter(user=self.other).delete()
+        self.assertEqual(profile_summary(self.author.username).followers_count, 1)
+
+    def test_profile_page_shows_counters(self):
+        """Страница профиля показывает счётчики и кнопку подписки."""
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        response = reader_client.get(
+            reverse("posts:profile", kwargs={"username": self.author.username})
+        )
+        self.assertEqual(response.context["posts_count"], 3)
+        self.assertContains(response, "Подписчиков: 1, подписок: 1")
+        self.assertContains(response, "Отписаться")
+
+
+class GroupAutocompleteTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="HasNoName")
+        cls.cats = Group.objects.create(
+            title="Любители кошек", slug="cats", description="Описание"
+        )
+        cls.dogs = Group.objects.create(
+            title="Собаки", slug="dogs", description="Описание"
+        )
+        Group.objects.create(
+            title="Кошки удалённые", slug="cats-old", description="", is_deleted=True
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.auth_client = Client()
+        self.auth_client.force_login(self.user)
+
+    def search(self, query):
+        response = self.client.get(reverse("posts:group_autocomplete"), {"q": query})
+        return [group["slug"] for group in response.json()["results"]]
+
+    def test_prefix_search(self):
+        """Поиск находит группы по началу slug, названия и слов названия."""
+        self.assertEqual(self.search("ca"), ["cats"])
+        self.assertEqual(self.search("Кош"), ["cats"])
+        self.assertEqual(self.search("любители"), ["cats"])
+        self.assertEqual(self.search("соб"), ["dogs"])
+        self.assertEqual(self.search(""), [])
+
+    def test_index_follows_group_changes(self):
+        """Новая группа сразу попадает в поиск."""
+        group_index.search("x")
+        Group.objects.create(title="Котята", slug="kittens", description="")
+        self.assertEqual(self.search("кот"), ["kittens"])
+
+    def test_form_does_not_load_all_groups(self):
+        """Форма поста не выводит и не загружает список всех групп."""
+        post = Post.objects.create(author=self.user, text="Текст", group=self.dogs)
+        url = reverse("posts:post_edit", kwargs={"post_id": post.pk})
+        # Первый показ кладёт названия групп в кеш.
+        self.auth_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.auth_client.get(url)
+        self.assertNotContains(response, "Любители кошек")
+        self.assertContains(response, 'value="Собаки"')
+        for query in queries.captured_queries:
+            self.assertNotIn('FROM "posts_group"', query["sql"])
+
+
+class FeedFragmentTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Тестовая группа", slug="test-slug", description="Описание"
+        )
+        for number in range(settings.PER_PAGE_COUNT * 2 + 5):
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f"Тестовый текст {number}"
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def walk(self, client, url):
+        """Тексты постов первой страницы и всех следующих фрагментов."""
+        response = client.get(url)
+        texts = [post.text for post in response.context["page_obj"]]
+        more_url = response.context["more_url"]
+        while more_url:
+            response = client.get(more_url)
+            self.assertNotContains(response, "<html")
+            texts += [post.text for post in response.context["posts"]]
+            more_url = response.context["more_url"]
+        return texts
+
+    def test_fragments_continue_feed(self):
+        """Фрагменты продолжают ленту без пропусков и повторов."""
+        expected = list(
+            Post.objects.order_by("-pub_date", "-pk").values_list("text", flat=True)
+        )
+        urls = (
+            reverse("posts:posts_index"),
+            reverse("posts:group_posts", kwargs={"slug": self.group.slug}),
+            reverse("posts:profile", kwargs={"username": self.author.username}),
+            reverse("posts:follow_index"),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.walk(self.reader_client, url), expected)
+
+    def test_cursor_is_stable_when_new_posts_appear(self):
+        """Новый пост сверху не сдвигает следующий фрагмент."""
+        response = self.client.get(reverse("posts:posts_index"))
+        last = list(response.context["page_obj"])[-1]
+        Post.objects.create(author=self.author, text="Совсем новый пост")
+        response = self.client.get(response.context["more_url"])
+        first = response.context["posts"][0]
+        self.assertLess(first.pub_date, last.pub_date)
+
+    def test_bad_cursor(self):
+        """Испорченный курсор — ошибка 400."""
+        for cursor in (
+            "abc",
+            "99999999999999999999999.1",
+            "1.99999999999999999999999",
+        ):
+            response = self.client.get(
+                reverse("posts:index_fragment") + "?after=" + cursor
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_follow_fragment_is_private(self):
+        """Фрагмент ленты подписок кешируется только в браузере."""
+        response = self.reader_client.get(reverse("posts:follow_fragment"))
+        self.assertIn("private", response["Cache-Control"])
+
+
+class InvalidateOnCommitTests(TransactionTestCase):
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username="reader")
+        self.author = User.objects.create_user(username="author")
+
+    def test_summary_dropped_again_after_commit(self):
+        """Шапка, закешированная до фиксации подписки, сбрасывается после неё."""
+        with transaction.atomic():
+            Follow.objects.create(user=self.reader, author=self.author)
+            # Параллельный запрос успел положить в кеш старые счётчики.
+            cache.set(summary_key(self.author.username), "stale")
+        self.assertIsNone(cache.get(summary_key(self.author.username)))
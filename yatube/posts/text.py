@@ -0,0 +1,29 @@
+from django.utils.html import linebreaks, urlize
+from django.utils.text import Truncator
+
+EXCERPT_WORDS = 30
+
+
+def render_text(text):
+    """HTML поста (абзацы, переносы строк, ссылки) и анонс для ленты.
+
+    Анонс — обычный текст: при выводе его экранирует шаблон."""
+    html = linebreaks(urlize(text, nofollow=True, autoescape=True))
+    return html, Truncator(text).words(EXCERPT_WORDS)
+
+
+class RenderedTextMixin:
+    """Пересчитывает text_html и excerpt при сохранении текста."""
+
+    def render_text(self):
+        self.text_html, self.excerpt = render_text(self.text)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        # Частичное сохранение без text не пишет HTML, а текст может быть
+        # отложен (defer) — не считаем и не подгружаем его зря.
+        if update_fields is None or "text" in update_fields:
+            self.render_text()
+        if update_fields is not None and "text" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "text_html", "excerpt"}
+        super().save(*args, **kwargs)
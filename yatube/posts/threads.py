@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+
+from .models import PATH_STEP
+
+
+def load_threads(comments, roots, max_depth):
+    """Ветки комментариев roots (соседей одного уровня в порядке обсуждения)
+    одним запросом по диапазону путей, не глубже max_depth уровней от них.
+
+    У каждого комментария level — уровень от корней для отступа, у
+    последних видимых с ответами more_replies=True: ответы для этой
+    отметки выбираются на один уровень глубже и отбрасываются. Ответы
+    на скрытые комментарии не показываются вместе с их ветками.
+    """
+    if not roots:
+        return []
+    base = roots[0].depth
+    shown = {}
+    for comment in comments.subtree(
+        roots[0].path, roots[-1].path, base + max_depth + 1
+    ).select_related("author"):
+        comment.level = comment.depth - base
+        comment.more_replies = False
+        if comment.level and comment.path[:-PATH_STEP] not in shown:
+            # Родитель скрыт visible(): без него ответ выглядел бы ответом
+            # в предыдущей видимой ветке.
+            continue
+        if comment.level <= max_depth:
+            shown[comment.path] = comment
+            continue
+        parent = shown.get(comment.path[:-PATH_STEP])
+        if parent is not None:
+            parent.more_replies = True
+    return list(shown.values())
+
+
+def thread_page(comments, page_number):
+    """Страница веток верхнего уровня и все их видимые комментарии."""
+    page = Paginator(comments.threads(), settings.COMMENTS_PER_PAGE).get_page(
+        page_number
+    )
+    return page, load_threads(comments, list(page), settings.COMMENT_DISPLAY_DEPTH)
@@ -12,6 +12,11 @@ urlpatterns = [
     path("create/", views.post_create, name="post_create"),
     path("posts/<post_id>/edit/", views.post_edit, name="post_edit"),
     path("posts/<int:post_id>/comment/", views.add_comment, name="add_comment"),
+    path(
+        "posts/<int:post_id>/comments/<int:comment_id>/",
+        views.comment_thread,
+        name="comment_thread",
+    ),
     path("follow/", views.follow_index, name="follow_index"),
     path("profile/<str:username>/follow/", views.profile_follow, name="profile_follow"),
     path(
@@ -19,4 +24,15 @@ urlpatterns = [
         views.profile_unfollow,
         name="profile_unfollow",
     ),
+    path("follow/bulk/", views.follow_bulk, name="follow_bulk"),
+    path("fragments/user/", views.user_fragments, name="user_fragments"),
+    path("fragments/index/", views.index_fragment, name="index_fragment"),
+    path("fragments/group/<slug:slug>/", views.group_fragment, name="group_fragment"),
+    path(
+        "fragments/profile/<str:username>/",
+        views.profile_fragment,
+        name="profile_fragment",
+    ),
+    path("fragments/follow/", views.follow_fragment, name="follow_fragment"),
+    path("groups/search/", views.group_autocomplete, name="group_autocomplete"),
 ]
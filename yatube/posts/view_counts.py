@@ -0,0 +1,143 @@
+"""Счётчики просмотров постов.
+
+Просмотры копятся в памяти процесса и пишутся в базу пачкой: один
+UPDATE ... CASE на все посты, просмотренные с прошлой записи, вместо
+UPDATE на каждый просмотр. Раз в VIEW_COUNT_FLUSH_INTERVAL секунд пачку
+пишет фоновый поток процесса (его включает start_flusher() из
+yatube/wsgi.py), так что запрос посетителя за запись не платит. Сам
+запрос пишет пачку, только если в ней набралось VIEW_COUNT_FLUSH_MAX
+просмотров. Остаток пишется при остановке процесса (atexit из
+yatube/wsgi.py, у воркеров serve — сигнал worker_stopping); упавший
+воркер теряет не больше одной пачки. Читается счётчик из строки поста
+без лишних запросов.
+"""
+
+import logging
+import os
+import threading
+from collections import Counter
+from functools import wraps
+
+from core.prefork import worker_stopping
+from core.sqlite import retry_on_locked
+from core.warmup import WARMUP_HEADER
+from django.conf import settings
+from django.db import connections
+from django.db.models import Case, F, IntegerField, Value, When
+from django.dispatch import receiver
+
+from .models import ArchivedPost, Post
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pending = Counter()
+_pid = os.getpid()
+# Фоновая запись включена; поток и его флаг остановки — свои у каждого
+# процесса: после fork поток родителя в наследнике не работает.
+_periodic = False
+_flusher = None
+
+
+def _take():
+    """Забирает накопленные просмотры; после fork — только свои."""
+    global _pending, _pid
+    with _lock:
+        pending = _pending if _pid == os.getpid() else Counter()
+        _pending, _pid = Counter(), os.getpid()
+    return pending
+
+
+@retry_on_locked
+def write(pending):
+    delta = Case(
+        *[When(pk=pk, then=Value(count)) for pk, count in pending.items()],
+        output_field=IntegerField(),
+    )
+    # Пост мог уйти в архив, пока его просмотры копились.
+    for model in (Post, ArchivedPost):
+        model.objects.filter(pk__in=pending).update(
+            views_count=F("views_count") + delta
+        )
+
+
+def flush():
+    """Пишет накопленные просмотры в базу; возвращает число постов."""
+    pending = _take()
+    if not pending:
+        return 0
+    try:
+        write(pending)
+    except Exception:
+        logger.exception("Не удалось записать просмотры %d постов", len(pending))
+        with _lock:
+            _pending.update(pending)
+        return 0
+    return len(pending)
+
+
+def _flush_periodically(stop):
+    while not stop.wait(settings.VIEW_COUNT_FLUSH_INTERVAL):
+        flush()
+        # Соединение потока не держим открытым между пачками.
+        connections.close_all()
+
+
+def start_flusher():
+    """Включает запись пачек фоновым потоком; поток запускается в каждом
+    процессе при первом просмотре, в том числе в воркерах после fork."""
+    global _periodic
+    _periodic = True
+
+
+def stop_flusher():
+    with _lock:
+        if _flusher is not None and _flusher[0] == os.getpid():
+            _flusher[1].set()
+
+
+def record(post_id):
+    global _pending, _pid, _flusher
+    start = None
+    with _lock:
+        if _pid != os.getpid():
+            # Процесс-наследник не пишет просмотры родителя второй раз.
+            _pending, _pid = Counter(), os.getpid()
+        _pending[post_id] += 1
+        full = sum(_pending.values()) >= settings.VIEW_COUNT_FLUSH_MAX
+        if _periodic and (_flusher is None or _flusher[0] != os.getpid()):
+            start = threading.Event()
+            _flusher = (os.getpid(), start)
+    if start is not None:
+        threading.Thread(
+            target=_flush_periodically,
+            args=(start,),
+            name="view-counts-flush",
+            daemon=True,
+        ).start()
+    if full:
+        flush()
+
+
+def count_views(view):
+    """Считает успешные GET-просмотры поста; ставится снаружи
+    full_page_cache, чтобы считались и страницы из кеша."""
+
+    @wraps(view)
+    def wrapper(request, post_id, *args, **kwargs):
+        response = view(request, post_id, *args, **kwargs)
+        if (
+            request.method == "GET"
+            and response.status_code == 200
+            and WARMUP_HEADER not in request.META
+        ):
+            record(int(post_id))
+        return response
+
+    return wrapper
+
+
+@receiver(worker_stopping)
+def flush_on_stop(sender, **kwargs):
+    stop_flusher()
+    flush()
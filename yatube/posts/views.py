@@ -1,86 +1,186 @@
+import json
+from functools import partial
+
+from core.db_router import use_primary
+from core.page_cache import full_page_cache, holes
+from core.ratelimit import ratelimit
+from core.sqlite import retry_on_locked
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.http import HttpResponseBadRequest, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_POST
 
+from .archive import TieredFeed, count_author_posts, decode_cursor, encode_cursor
+from .follows import follow_authors
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post, User
+from .groups import group_index
+from .models import ArchivedPost, Follow, Group, Post, User
+from .profiles import profile_summary
+from .threads import load_threads, thread_page
+from .view_counts import count_views
+
+
+def tiered_feed(**filters):
+    """Посты ленты из горячей таблицы и архива с одним фильтром."""
+    return TieredFeed(
+        Post.objects.visible().filter(**filters).for_feed(),
+        ArchivedPost.objects.visible().filter(**filters).for_feed(),
+    )
+
+
+def get_page(request, feed):
+    paginator = Paginator(feed, settings.PER_PAGE_COUNT)
+    page_number = request.GET.get("page")
+    return paginator.get_page(page_number)
+
+
+def more_url(name, args, posts, has_more):
+    """Адрес следующего фрагмента ленты после последнего из posts."""
+    if not has_more:
+        return None
+    return f"{reverse(name, args=args)}?after={encode_cursor(posts[-1])}"
+
+
+def feed_fragment(request, feed, name, args=(), display_group_link=True):
+    """Только карточки следующей порции ленты, без base.html."""
+    try:
+        cursor = decode_cursor(request.GET.get("after", ""))
+    except ValueError:
+        return HttpResponseBadRequest()
+    posts = feed.after(cursor, settings.PER_PAGE_COUNT + 1)
+    has_more = len(posts) > settings.PER_PAGE_COUNT
+    posts = posts[: settings.PER_PAGE_COUNT]
+    context = {
+        "posts": posts,
+        "more_url": more_url(name, args, posts, has_more),
+        "display_group_link": display_group_link,
+    }
+    return render(request, "includes/feed_fragment.html", context)
 
 
-@cache_page(20)
+@full_page_cache
 def index(request):
     template = "posts/index.html"
-    posts = Post.objects.select_related("group").all()
-    paginator = Paginator(posts, settings.PER_PAGE_COUNT)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    page_obj = get_page(request, tiered_feed())
     context = {
         "page_obj": page_obj,
+        "more_url": more_url("posts:index_fragment", (), page_obj, page_obj.has_next()),
     }
     return render(request, template, context)
 
 
+@full_page_cache
+def index_fragment(request):
+    return feed_fragment(request, tiered_feed(), "posts:index_fragment")
+
+
+@full_page_cache
 def group_posts(request, slug):
     template = "posts/group_list.html"
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.post_set.all()
-    paginator = Paginator(posts, settings.PER_PAGE_COUNT)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    group = get_object_or_404(Group, slug=slug, is_deleted=False)
+    feed = tiered_feed(group=group)
+    page_obj = get_page(request, feed)
     context = {
         "group": group,
-        "posts": posts,
+        "posts": feed.hot,
         "page_obj": page_obj,
+        "more_url": more_url(
+            "posts:group_fragment", [slug], page_obj, page_obj.has_next()
+        ),
     }
     return render(request, template, context)
 
 
+@full_page_cache
+def group_fragment(request, slug):
+    group = get_object_or_404(Group, slug=slug, is_deleted=False)
+    return feed_fragment(
+        request,
+        tiered_feed(group=group),
+        "posts:group_fragment",
+        [slug],
+        display_group_link=False,
+    )
+
+
+@full_page_cache
 def profile(request, username):
     template = "posts/profile.html"
-    user = get_object_or_404(User, username=username)
-    posts = Post.objects.filter(author__exact=user)
-    posts_count = Post.objects.filter(author__exact=user).count
-    paginator = Paginator(posts, settings.PER_PAGE_COUNT)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user__exact=request.user, author__exact=user
-        ).exists()
-        if request.user != user.username:
-            non_author = True
-        else:
-            non_author = False
-    else:
-        following = False
-        non_author = False
-
+    # Автор со счётчиками; подписка посетителя рисуется дырой follow_button.
+    user = profile_summary(username)
+    page_obj = get_page(request, tiered_feed(author=user))
     context = {
         "author": user,
-        "posts_count": posts_count,
+        "posts_count": user.posts_count,
         "page_obj": page_obj,
-        "following": following,
-        "non_author": non_author,
+        "more_url": more_url(
+            "posts:profile_fragment", [username], page_obj, page_obj.has_next()
+        ),
     }
     return render(request, template, context)
 
 
+@full_page_cache
+def profile_fragment(request, username):
+    user = get_object_or_404(User, username=username, is_active=True)
+    return feed_fragment(
+        request, tiered_feed(author=user), "posts:profile_fragment", [username]
+    )
+
+
+def get_post(post_id):
+    """Пост из горячей таблицы или из архива; второе значение — архивный ли."""
+    post = Post.objects.visible().filter(pk=post_id).first()
+    if post is not None:
+        return post, False
+    return get_object_or_404(ArchivedPost.objects.visible(), pk=post_id), True
+
+
+@count_views
+@full_page_cache
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    posts_count = Post.objects.filter(author__exact=post.author).count
+    post, archived = get_post(post_id)
+    posts_count = partial(count_author_posts, post.author)
     template = "posts/post_detail.html"
-    comments = Comment.objects.filter(post_id__exact=post.pk)
+    comments_page, comments = thread_page(
+        post.comments.visible(), request.GET.get("page")
+    )
     context = {
         "posts_count": posts_count,
         "post": post,
+        "archived": archived,
         "form": CommentForm(),
         "comments": comments,
+        "comments_page": comments_page,
     }
     return render(request, template, context)
 
 
+def comment_thread(request, post_id, comment_id):
+    """Ветка обсуждения от комментария с формой ответа на него."""
+    post, archived = get_post(post_id)
+    comment = get_object_or_404(post.comments.visible(), pk=comment_id)
+    context = {
+        "post": post,
+        "archived": archived,
+        "comment": comment,
+        "comments": load_threads(
+            post.comments.visible(), [comment], settings.COMMENT_DISPLAY_DEPTH
+        ),
+        "form": CommentForm(initial={"parent": comment.pk}),
+    }
+    return render(request, "posts/comment_thread.html", context)
+
+
 @login_required
+@ratelimit("post_create")
+@use_primary
+@retry_on_locked
 def post_create(request):
     if request.method == "POST":
         form = PostForm(
@@ -104,9 +204,11 @@ def post_create(request):
 
 
 @login_required
+@use_primary
+@retry_on_locked
 def post_edit(request, post_id):
     is_edit = True
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.visible(), pk=post_id)
     author = post.author
     if request.user != author:
         return redirect("posts:post_detail", post_id=post.pk)
@@ -123,14 +225,25 @@ def post_edit(request, post_id):
 
 
 @login_required
+@ratelimit("add_comment")
+@use_primary
+@retry_on_locked
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.visible(), pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
+        parent = form.cleaned_data["parent"]
+        if parent is not None:
+            parent = get_object_or_404(post.comments.visible(), pk=parent)
+            comment.reply_to(parent)
         comment.save()
+        if parent is not None:
+            return redirect(
+                "posts:comment_thread", post_id=post_id, comment_id=parent.pk
+            )
     return redirect("posts:post_detail", post_id=post_id)
 
 
@@ -138,21 +251,37 @@ def add_comment(request, post_id):
 def follow_index(request):
     follower_user = request.user
     following_authors = Follow.objects.filter(user=follower_user).values("author")
-    posts = Post.objects.filter(author__in=following_authors)
     template = "posts/follow.html"
-    paginator = Paginator(posts, settings.PER_PAGE_COUNT)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    page_obj = get_page(request, tiered_feed(author__in=following_authors))
     context = {
         "page_obj": page_obj,
         "following_authors": following_authors,
+        "more_url": more_url(
+            "posts:follow_fragment", (), page_obj, page_obj.has_next()
+        ),
     }
     return render(request, template, context)
 
 
 @login_required
+def follow_fragment(request):
+    following_authors = Follow.objects.filter(user=request.user).values("author")
+    response = feed_fragment(
+        request, tiered_feed(author__in=following_authors), "posts:follow_fragment"
+    )
+    # Лента своя у каждого читателя: кешировать её может только браузер.
+    patch_cache_control(response, private=True, max_age=settings.FEED_FRAGMENT_MAX_AGE)
+    return response
+
+
+# Подписка выполняется переходом по ссылке, то есть GET-запросом.
+@login_required
+@ratelimit("profile_follow", methods=("GET", "POST"))
+@use_primary
+@retry_on_locked
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    # На отключённых не подписываются, как и в follow_batch.
+    author = get_object_or_404(User, username=username, is_active=True)
     following_user = request.user
     if author != following_user:
         if Follow.objects.get_or_create(user=following_user, author=author):
@@ -162,11 +291,70 @@ def profile_follow(request, username):
 
 
 @login_required
+@use_primary
+@retry_on_locked
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(User, username=username, is_active=True)
     user = request.user
     if Follow.objects.filter(user=user, author=author).exists():
         Follow.objects.filter(user=user, author=author).delete()
         return redirect("posts:profile", username=username)
     else:
         return redirect("posts:profile", username=username)
+
+
+def requested_usernames(request):
+    """Имена авторов из JSON {"authors": [...]} или полей формы authors."""
+    if request.content_type != "application/json":
+        return request.POST.getlist("authors")
+    try:
+        authors = json.loads(request.body)["authors"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    if not isinstance(authors, list) or not all(
+        isinstance(name, str) for name in authors
+    ):
+        return None
+    return authors
+
+
+@require_POST
+@login_required
+@ratelimit("follow_bulk")
+@use_primary
+def follow_bulk(request):
+    """Подписка на список авторов одним запросом (импорт из другого сервиса)."""
+    usernames = requested_usernames(request)
+    if usernames is None:
+        return HttpResponseBadRequest("Ожидается список authors.")
+    if len(usernames) > settings.FOLLOW_BULK_MAX:
+        return HttpResponseBadRequest(
+            f"Не больше {settings.FOLLOW_BULK_MAX} авторов за запрос."
+        )
+    authors = dict(
+        User.objects.filter(username__in=set(usernames)).values_list("username", "pk")
+    )
+    followed = follow_authors(
+        request.user, authors.values(), settings.FOLLOW_BATCH_SIZE
+    )
+    return JsonResponse(
+        {
+            "followed": followed,
+            "unknown": sorted(set(usernames) - authors.keys()),
+        }
+    )
+
+
+def group_autocomplete(request):
+    """Группы, slug или слово названия которых начинается с ?q=."""
+    return JsonResponse({"results": group_index.search(request.GET.get("q", ""))})
+
+
+@never_cache
+def user_fragments(request):
+    """Персональные части страниц, закешированных для анонимов."""
+    fragments = {"header": holes["header"](request)}
+    post_id = request.GET.get("post", "")
+    if post_id.isdigit():
+        fragments["comment_form"] = holes["comment_form"](request, int(post_id))
+    return JsonResponse(fragments)
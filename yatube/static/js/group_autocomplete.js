@@ -0,0 +1,37 @@
+// Поиск группы в форме поста: подсказки приходят с сервера по префиксу,
+// выбранный id записывается в скрытое поле формы.
+(function () {
+  document.querySelectorAll("[data-group-autocomplete]").forEach(function (input) {
+    var hidden = document.getElementById(input.getAttribute("data-group-autocomplete"));
+    var list = document.getElementById(input.getAttribute("list"));
+    var found = {};
+    var timer = null;
+
+    function search() {
+      var url = input.getAttribute("data-url") + "?q=" + encodeURIComponent(input.value);
+      fetch(url, { credentials: "same-origin" })
+        .then(function (response) {
+          return response.ok ? response.json() : { results: [] };
+        })
+        .then(function (data) {
+          found = {};
+          list.innerHTML = "";
+          data.results.forEach(function (group) {
+            found[group.title] = group.id;
+            var option = document.createElement("option");
+            option.value = group.title;
+            option.label = group.slug;
+            list.appendChild(option);
+          });
+        });
+    }
+
+    input.addEventListener("input", function () {
+      hidden.value = found[input.value] || "";
+      clearTimeout(timer);
+      if (input.value && !hidden.value) {
+        timer = setTimeout(search, 150);
+      }
+    });
+  });
+})();
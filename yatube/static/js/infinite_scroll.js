@@ -0,0 +1,71 @@
+// Бесконечная лента: вместо перехода на следующую страницу подгружаем
+// фрагмент с карточками. Следующий фрагмент запрашивается заранее, пока
+// читатель листает текущий, и вставляется, когда он доходит до конца.
+(function () {
+  if (!("IntersectionObserver" in window)) {
+    return;
+  }
+  var prefetched = {};
+
+  function load(url) {
+    if (!prefetched[url]) {
+      prefetched[url] = fetch(url, { credentials: "same-origin" }).then(
+        function (response) {
+          if (!response.ok) {
+            throw new Error(response.status);
+          }
+          return response.text();
+        }
+      );
+    }
+    return prefetched[url];
+  }
+
+  var observer = new IntersectionObserver(
+    function (entries) {
+      entries.forEach(function (entry) {
+        if (entry.isIntersecting) {
+          show(entry.target);
+        }
+      });
+    },
+    { rootMargin: "1000px 0px" }
+  );
+
+  function watch(sentinel) {
+    load(sentinel.getAttribute("data-feed-more"));
+    observer.observe(sentinel);
+  }
+
+  function show(sentinel) {
+    observer.unobserve(sentinel);
+    var url = sentinel.getAttribute("data-feed-more");
+    load(url).then(
+      function (html) {
+        delete prefetched[url];
+        var holder = document.createElement("div");
+        holder.innerHTML = html;
+        var next = holder.querySelector("[data-feed-more]");
+        sentinel.replaceWith.apply(sentinel, Array.from(holder.childNodes));
+        if (next) {
+          watch(next);
+        }
+      },
+      function () {
+        // Не вышло — остаётся обычная постраничная навигация.
+        delete prefetched[url];
+        document.querySelectorAll(".pagination").forEach(function (nav) {
+          nav.hidden = false;
+        });
+      }
+    );
+  }
+
+  var sentinel = document.querySelector("[data-feed-more]");
+  if (sentinel) {
+    document.querySelectorAll(".pagination").forEach(function (nav) {
+      nav.hidden = true;
+    });
+    watch(sentinel);
+  }
+})();
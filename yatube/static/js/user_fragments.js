@@ -0,0 +1,22 @@
+// Страница для анонимов может прийти из общего кеша. Если у браузера есть
+// CSRF-кука (пользователь бывал на формах и, возможно, вошёл), подгружаем
+// персональные части страницы и подставляем их на место заглушек.
+(function () {
+  var script = document.currentScript;
+  var slots = document.querySelectorAll("[data-fragment]");
+  if (!slots.length || document.cookie.indexOf("csrftoken=") === -1) {
+    return;
+  }
+  fetch(script.getAttribute("data-url"), { credentials: "same-origin" })
+    .then(function (response) {
+      return response.ok ? response.json() : {};
+    })
+    .then(function (fragments) {
+      slots.forEach(function (slot) {
+        var html = fragments[slot.getAttribute("data-fragment")];
+        if (html !== undefined) {
+          slot.outerHTML = html;
+        }
+      });
+    });
+})();
@@ -1,9 +1,12 @@
+from core.ratelimit import ratelimit
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
 from django.views.generic import CreateView
 
 from .forms import CreationForm
 
 
+@method_decorator(ratelimit("signup"), name="dispatch")
 class SignUp(CreateView):
     form_class = CreationForm
     success_url = reverse_lazy("posts:posts_index")
@@ -30,12 +30,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.metrics.MetricsMiddleware",
+    "core.middleware.ReplicaPinningMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "core.middleware.StaticFilesMiddleware",
+    "core.middleware.CompressionMiddleware",
+    "core.middleware.FastPathSessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware",
+    "core.middleware.FastPathAuthenticationMiddleware",
+    "core.profiling.ProfilingMiddleware",
+    "core.middleware.FastPathMessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
@@ -44,7 +49,8 @@ ROOT_URLCONF = "yatube.urls"
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "core.metrics.InstrumentedDjangoTemplates",
+        "NAME": "django",
         "DIRS": [TEMPLATES_DIR],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -65,8 +71,41 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
-    }
+        # Соединение переиспользуется запросами одного потока.
+        "CONN_MAX_AGE": 600,
+        # Сколько секунд ждать, пока другой писатель отпустит базу.
+        "OPTIONS": {"timeout": 20},
+    },
+    # Локальная «реплика»: по умолчанию тот же файл, в тестах — отдельная
+    # база. Используется, только если указана в YATUBE_DB_REPLICAS.
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ.get(
+            "YATUBE_REPLICA_DB", os.path.join(BASE_DIR, "db.sqlite3")
+        ),
+        "CONN_MAX_AGE": 600,
+        "OPTIONS": {"timeout": 20},
+    },
 }
+# Выполняются для каждого нового соединения с SQLite. WAL позволяет читать
+# во время записи; synchronous=NORMAL в WAL-режиме не теряет целостность.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -20000,
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+# Повтор пишущих транзакций при «database is locked».
+SQLITE_RETRY_ATTEMPTS = 5
+SQLITE_RETRY_DELAY = 0.02
+DATABASE_ROUTERS = ["core.db_router.PrimaryReplicaRouter"]
+DATABASE_REPLICAS = [
+    alias for alias in os.environ.get("YATUBE_DB_REPLICAS", "").split(",") if alias
+]
+# Сколько секунд после записи пользователь читает из основной базы.
+REPLICA_PIN_SECONDS = 5
+REPLICA_PIN_COOKIE = "pin_primary"
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -97,6 +136,10 @@ USE_TZ = True
 
 STATIC_URL = "/static/"
 STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
+STATIC_ROOT = os.path.join(BASE_DIR, "static_root")
+STATICFILES_STORAGE = "core.storage.CompressedManifestStaticFilesStorage"
+# Кеширование статики без хеша в имени (секунды).
+STATIC_MAX_AGE = 60
 LOGIN_URL = "users:login"
 LOGIN_REDIRECT_URL = "posts:posts_index"
 MEDIA_URL = "/media/"
@@ -106,11 +149,111 @@ EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
 PER_PAGE_COUNT = 10
+# Веток комментариев на странице поста и видимых уровней ответов в ветке;
+# более глубокие ответы открываются на странице ветки.
+COMMENTS_PER_PAGE = 20
+COMMENT_DISPLAY_DEPTH = 4
 
 CSRF_FAILURE_VIEW = "core.views.csrf_failure"
 
+# Страницы, которые анонимы без сессии получают без загрузки сессии и
+# пользователя и с разрешением на общий кеш.
+ANONYMOUS_FAST_PATH_VIEWS = [
+    "posts:posts_index",
+    "posts:group_posts",
+    "posts:profile",
+    "posts:post_detail",
+    "posts:index_fragment",
+    "posts:group_fragment",
+    "posts:profile_fragment",
+]
+ANONYMOUS_CACHE_MAX_AGE = 60
+# Общий для всех посетителей кеш страниц (секунды).
+PAGE_CACHE_TIMEOUT = 20
+# Сколько браузер хранит личный фрагмент ленты подписок (секунды).
+FEED_FRAGMENT_MAX_AGE = 60
+# Сколько групп возвращает поиск в форме поста.
+GROUP_AUTOCOMPLETE_LIMIT = 10
+# Сколько секунд хранится шапка профиля со счётчиками.
+PROFILE_SUMMARY_TIMEOUT = 300
+# Лимиты частоты запросов для @ratelimit(scope): «число/период»,
+# период — s, m, h, d с необязательным множителем (например, 5/10m).
+RATELIMIT_ENABLE = True
+RATELIMITS = {
+    "post_create": "10/10m",
+    "add_comment": "10/m",
+    "profile_follow": "30/m",
+    "follow_bulk": "10/h",
+    "signup": "5/h",
+}
+# Лимиты на IP-адрес для тех же действий: за одним NAT или прокси сидят
+# многие пользователи. Без отдельного лимита корзина IP берёт RATELIMITS.
+RATELIMITS_IP = {
+    "post_create": "50/10m",
+    "add_comment": "60/m",
+    "profile_follow": "150/m",
+    "follow_bulk": "50/h",
+}
+# Подписки пачками: размер одной вставки и предел авторов в запросе к API.
+FOLLOW_BATCH_SIZE = 500
+FOLLOW_BULK_MAX = 1000
+# Просмотры постов пишутся в базу пачкой: фоновым потоком раз в
+# VIEW_COUNT_FLUSH_INTERVAL секунд, а запросом — по VIEW_COUNT_FLUSH_MAX.
+VIEW_COUNT_FLUSH_INTERVAL = 10
+VIEW_COUNT_FLUSH_MAX = 1000
+# Посты старше этого срока archive_posts переносит в архивные таблицы.
+ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_COUNT_TIMEOUT = 600
+
+# Кеш в памяти процесса: для serve с несколькими воркерами нужен общий
+# (memcached, redis), иначе сбросы кеша и лимиты у воркеров разойдутся.
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "BACKEND": "core.metrics.InstrumentedLocMemCache",
     }
 }
+
+# Замеры запросов: заголовок Server-Timing и сводка по view за окно
+# METRICS_WINDOW секунд на /stats/ (персонал) и /metrics (Prometheus).
+METRICS_ENABLE = True
+METRICS_SERVER_TIMING = True
+METRICS_WINDOW = 300
+METRICS_WINDOW_SLOTS = 10
+# Без токена /metrics доступен только персоналу.
+METRICS_TOKEN = os.environ.get("YATUBE_METRICS_TOKEN", "")
+# Допустимые накладные расходы замеров на запрос (bench_metrics), мкс.
+METRICS_OVERHEAD_BUDGET_US = 150
+
+# Профили запросов (?_profile=cprofile|sample от персонала) и доля
+# запросов, которые сэмплирующий профайлер снимает сам.
+PROFILING_DIR = os.path.join(BASE_DIR, "profiles")
+PROFILING_SAMPLE_RATE = 0
+PROFILING_SAMPLE_INTERVAL = 0.005
+PROFILING_KEEP = 200
+
+# Журнал медленных запросов: порог (мс), сколько групп запросов хранит
+# каждый процесс и сколько кадров стека кода проекта запоминать.
+SLOW_QUERY_MS = 100
+SLOW_QUERY_TOP = 50
+SLOW_QUERY_STACK_DEPTH = 8
+SLOW_QUERY_DIR = os.path.join(BASE_DIR, "slow_queries")
+
+# Прогрев воркера при загрузке yatube.wsgi (core.warmup); при отладке
+# включается переменной окружения YATUBE_WARMUP=1.
+WARMUP_ON_BOOT = os.environ.get("YATUBE_WARMUP", "0" if DEBUG else "1") == "1"
+# Хост, под которым прогреваются страницы в общем кеше, и сколько лент
+# групп открыть заранее.
+WARMUP_HOST = ALLOWED_HOSTS[0]
+WARMUP_FEEDS = 5
+
+# Загрузки пишутся на диск по частям, а не накапливаются в памяти.
+FILE_UPLOAD_HANDLERS = ["posts.images.LimitedTemporaryFileUploadHandler"]
+POST_IMAGE_MAX_BYTES = 15 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 50_000_000
+POST_IMAGE_MAX_SIDE = 1920
+POST_IMAGE_QUALITY = 85
+
+# Сжатие ответов
+COMPRESSION_MIN_SIZE = 860
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 4
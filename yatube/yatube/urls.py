@@ -1,13 +1,25 @@
+from core.views import (
+    profile_download,
+    profile_list,
+    prometheus_metrics,
+    request_stats,
+    serve_media,
+    slow_query_list,
+)
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 
 urlpatterns = [
     path("", include("posts.urls", namespace="posts")),
+    path("admin/profiles/", profile_list, name="profile_list"),
+    path("admin/profiles/<str:name>", profile_download, name="profile_download"),
+    path("admin/slow-queries/", slow_query_list, name="slow_query_list"),
     path("admin/", admin.site.urls),
     path("auth/", include("users.urls", namespace="users")),
     path("about/", include("about.urls", namespace="about")),
+    path("stats/", request_stats, name="request_stats"),
+    path("metrics", prometheus_metrics, name="prometheus_metrics"),
 ]
 
 handler404 = "core.views.page_not_found"
@@ -15,4 +27,6 @@ handler500 = "core.views.server_error"
 handler403 = "core.views.permission_denied"
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    urlpatterns += [
+        re_path(r"^%s(?P<path>.*)$" % settings.MEDIA_URL.lstrip("/"), serve_media),
+    ]
@@ -1,7 +1,21 @@
+import atexit
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yatube.settings")
 
 application = get_wsgi_application()
+
+from posts import view_counts  # noqa: E402 (модели загружены выше)
+
+# Просмотры, накопленные в памяти, пишет фоновый поток, а остаток —
+# остановка сервера.
+view_counts.start_flusher()
+atexit.register(view_counts.flush)
+
+if settings.WARMUP_ON_BOOT:
+    from core.warmup import warm_up
+
+    warm_up()